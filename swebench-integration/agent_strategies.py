@@ -9,8 +9,16 @@ from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 from enum import Enum
 import asyncio
+import shlex
 from loguru import logger
 
+from chain_executor import ChainExecutor
+from impact_analysis import TestImpactAnalyzer
+from json_codec import tool_result
+from retry_policy import Deadline, RetryPolicy
+from symbol_index import SymbolIndex, SymbolIndexer
+from task_queue import TaskQueue, settle_task_refs
+
 
 class ProblemType(Enum):
     """Types of problems in SWE-bench"""
@@ -24,10 +32,17 @@ class ProblemType(Enum):
 
 @dataclass
 class ToolChain:
-    """Represents a chain of ACF tools to execute"""
+    """Represents a chain of ACF tools to execute
+
+    ``tools`` is a DAG: each step may name the step ids it runs ``after``
+    and bind params to their outputs with ``inputs`` (see chain_executor).
+    With ``parallel``, independent steps run concurrently, up to
+    ``max_parallel`` at a time.
+    """
     name: str
-    tools: List[str]
+    tools: List[Dict]
     parallel: bool = False
+    max_parallel: int = 4
     retry_on_failure: bool = True
 
 
@@ -75,19 +90,18 @@ class BasicStrategy(AgentStrategy):
         }
         
         # 1. Search for relevant code
-        search_result = await self.acf.call_tool("search_code", {
+        search_result = tool_result(await self.acf.call_tool("search_code", {
             "path": instance['repo'],
             "pattern": self._extract_search_pattern(instance),
             "maxResults": 20
-        })
+        }))
         result["steps"].append({"tool": "search_code", "status": "complete"})
         
-        # 2. Read relevant files
-        for match in search_result.get('matches', [])[:5]:
-            file_content = await self.acf.call_tool("read_file", {
-                "path": match['path']
-            })
-            result["steps"].append({"tool": "read_file", "file": match['path']})
+        # 2. Read relevant files in a single round trip
+        paths = list(dict.fromkeys(match['path'] for match in search_result.get('matches', [])[:5]))
+        if paths:
+            await self.acf.call_tool("read_multiple_files", {"paths": paths})
+            result["steps"].extend({"tool": "read_multiple_files", "file": path} for path in paths)
         
         # 3. Apply fixes (simplified)
         # This would integrate with an LLM to generate actual fixes
@@ -112,112 +126,229 @@ class BasicStrategy(AgentStrategy):
 class AdvancedStrategy(AgentStrategy):
     """Advanced strategy using full ACF capabilities"""
     
-    async def execute(self, instance: Dict) -> Dict:
+    # Tools whose params name a file they modify
+    EDIT_TOOLS = {"edit_block": "file_path", "write_file": "path", "create_file": "path"}
+    
+    def __init__(
+        self,
+        acf_client,
+        test_impact: Optional[TestImpactAnalyzer] = None,
+        symbols: Optional[SymbolIndexer] = None,
+        use_task_manager: bool = True,
+        retry: Optional[RetryPolicy] = None,
+        settings: Optional[Dict] = None
+    ):
+        super().__init__(acf_client)
+        self.test_impact = test_impact
+        self.symbols = symbols
+        self.use_task_manager = use_task_manager
+        self.settings = settings or {}
+        self.retry = retry or RetryPolicy.from_config(
+            self.settings, getattr(acf_client, "IDEMPOTENT_TOOLS", frozenset())
+        )
+        self.symbol_index: Optional[SymbolIndex] = None
+    
+    async def execute(self, instance: Dict, deadline: Optional[Deadline] = None) -> Dict:
         logger.info("Executing Advanced Strategy")
+        deadline = deadline or Deadline(self.settings.get('error_handling', {}).get('instance_deadline_seconds'))
+        
+        # Symbol index of the snapshot, when the session's workspace is local
+        workspace = getattr(self.acf, 'workspace', '')
+        if self.symbols is not None and workspace:
+            self.symbol_index = await self.symbols.load_or_build(
+                instance['repo'], instance['base_commit'], workspace
+            )
         
         problem_type = self.classify_problem(instance)
         tool_chain = self._get_tool_chain(problem_type)
         
-        result = {
+        touched_files: List[str] = []
+        # Task-manager steps are queued rather than awaited (or skipped
+        # entirely without the task manager)
+        tasks = TaskQueue.from_config(self.acf, self.settings) if self.use_task_manager else None
+        
+        async def run_step(tool_config: Dict, inputs: Dict) -> Dict:
+            if tool_config["name"] in TaskQueue.TOOLS:
+                if tasks is None:
+                    return {"tool": tool_config["name"], "status": "skipped", "reason": "task manager disabled"}
+                params = self._step_params(tool_config, instance, inputs)
+                return {
+                    "tool": tool_config["name"],
+                    "params": params,
+                    "result": tasks.submit(tool_config["name"], params),
+                    "status": "queued"
+                }
+            # Test steps depend on the edits, so every edit is known by now
+            if self._is_test_step(tool_config) and self.test_impact is not None:
+                tool_config = await self._select_impacted_tests(tool_config, instance, touched_files)
+                if tool_config is None:
+                    return {"tool": "execute_command", "status": "skipped", "reason": "no impacted tests"}
+            if tool_chain.retry_on_failure:
+                step_result = await self.retry.call(
+                    tool_config["name"],
+                    lambda: self._execute_tool_step(tool_config, instance, inputs),
+                    deadline
+                )
+            else:
+                step_result = await self._execute_tool_step(tool_config, instance, inputs)
+            edited = step_result["params"].get(self.EDIT_TOOLS.get(step_result["tool"], ""))
+            if edited and edited not in touched_files:
+                touched_files.append(edited)
+            if edited and self.symbol_index is not None:
+                self.symbol_index = self.symbol_index.updated(workspace, [edited])
+            return step_result
+        
+        # Execute the tool chain: independent steps run concurrently
+        executor = ChainExecutor(run_step, tool_chain.max_parallel if tool_chain.parallel else 1)
+        try:
+            run = await deadline.run(executor.run(tool_chain.tools))
+        finally:
+            if tasks:
+                await tasks.close()
+        if tasks:
+            # Step outputs held TaskRefs for later steps' inputs; the result
+            # keeps the task ids they resolved to
+            for step in run["steps"]:
+                settle_task_refs(step)
+        
+        return {
             "strategy": "advanced",
             "problem_type": problem_type.value,
             "tool_chain": tool_chain.name,
-            "steps": []
+            "steps": run["steps"],
+            "elapsed_seconds": run["elapsed_seconds"],
+            "critical_path": run["critical_path"],
+            "critical_path_seconds": run["critical_path_seconds"],
+            "serial_seconds": run["serial_seconds"],
+            "task_manager": tasks.stats if tasks else None,
         }
-        
-        # Execute tool chain
-        for tool_config in tool_chain.tools:
-            try:
-                step_result = await self._execute_tool_step(tool_config, instance)
-                result["steps"].append(step_result)
-            except Exception as e:
-                logger.error(f"Tool step failed: {e}")
-                if tool_chain.retry_on_failure:
-                    # Retry logic
-                    pass
-        
-        return result
+    
+    @staticmethod
+    def _is_test_step(tool_config: Dict) -> bool:
+        """Whether a chain step runs the test suite"""
+        return (
+            tool_config["name"] == "execute_command"
+            and tool_config.get("params", {}).get("command", "").split()[:1] == ["pytest"]
+        )
+    
+    async def _select_impacted_tests(self, tool_config: Dict, instance: Dict, touched_files: List[str]) -> Optional[Dict]:
+        """Narrow a pytest step to the tests impacted by the files edited so far
+        
+        Returns the rewritten step, the original step when the full suite
+        should run, or None when no test is impacted.
+        """
+        impacted = await self.test_impact.select(self.acf, instance, touched_files)
+        if impacted is None:
+            return tool_config
+        if not impacted:
+            return None
+        params = dict(tool_config.get("params", {}))
+        params["command"] = params["command"] + " " + " ".join(shlex.quote(t) for t in sorted(impacted))
+        return {**tool_config, "params": params}
     
     def _get_tool_chain(self, problem_type: ProblemType) -> ToolChain:
         """Get appropriate tool chain for problem type"""
+        # Paths of the files found by a chain's search step
+        found_paths = "search.result.matches[].path"
+        first_found = "search.result.matches[0].path"
         chains = {
             ProblemType.BUG_FIX: ToolChain(
                 name="bug_fix_chain",
+                parallel=True,
                 tools=[
-                    {"name": "initProject", "params": {"editor": "claude"}},
-                    {"name": "addTask", "params": {"title": "Locate bug", "priority": "critical"}},
-                    {"name": "search_code", "params": {"maxResults": 50}},
-                    {"name": "tree", "params": {"depth": 3}},
-                    {"name": "read_multiple_files", "params": {}},
-                    {"name": "addTask", "params": {"title": "Fix bug", "priority": "critical"}},
-                    {"name": "edit_block", "params": {"validate": True}},
-                    {"name": "execute_command", "params": {"command": "pytest"}},
-                    {"name": "updateStatus", "params": {"newStatus": "done"}}
+                    {"id": "init", "name": "initProject", "params": {"editor": "claude"}, "after": []},
+                    {"id": "locate_task", "name": "addTask", "params": {"title": "Locate bug", "priority": "critical"}, "after": ["init"]},
+                    {"id": "search", "name": "search_code", "params": {"maxResults": 50}, "after": []},
+                    {"id": "tree", "name": "tree", "params": {"depth": 3}, "after": []},
+                    {"id": "read", "name": "read_multiple_files", "params": {}, "after": ["search"], "inputs": {"paths": found_paths}},
+                    {"id": "fix_task", "name": "addTask", "params": {"title": "Fix bug", "priority": "critical"}, "after": ["locate_task"]},
+                    {"id": "edit", "name": "edit_block", "params": {"validate": True}, "after": ["read", "tree"]},
+                    {"id": "test", "name": "execute_command", "params": {"command": "pytest"}, "after": ["edit"]},
+                    {"id": "done", "name": "updateStatus", "params": {"newStatus": "done"}, "after": ["test", "fix_task"], "inputs": {"id": "fix_task.result"}}
                 ]
             ),
             ProblemType.FEATURE: ToolChain(
                 name="feature_chain",
+                parallel=True,
                 tools=[
-                    {"name": "initProject", "params": {}},
-                    {"name": "addTask", "params": {"title": "Design feature"}},
-                    {"name": "tree", "params": {"depth": 4}},
-                    {"name": "search_code", "params": {"contextLines": 5}},
-                    {"name": "addTask", "params": {"title": "Implement feature"}},
-                    {"name": "create_file", "params": {}},
-                    {"name": "edit_block", "params": {}},
-                    {"name": "addTask", "params": {"title": "Add tests"}},
-                    {"name": "execute_command", "params": {"command": "pytest"}}
+                    {"id": "init", "name": "initProject", "params": {}, "after": []},
+                    {"id": "design_task", "name": "addTask", "params": {"title": "Design feature"}, "after": ["init"]},
+                    {"id": "tree", "name": "tree", "params": {"depth": 4}, "after": []},
+                    {"id": "search", "name": "search_code", "params": {"contextLines": 5}, "after": []},
+                    {"id": "implement_task", "name": "addTask", "params": {"title": "Implement feature"}, "after": ["design_task"]},
+                    {"id": "create", "name": "create_file", "params": {}, "after": ["tree", "search"]},
+                    {"id": "edit", "name": "edit_block", "params": {}, "after": ["create"]},
+                    {"id": "tests_task", "name": "addTask", "params": {"title": "Add tests"}, "after": ["implement_task"]},
+                    {"id": "test", "name": "execute_command", "params": {"command": "pytest"}, "after": ["edit"]}
                 ]
             ),
             ProblemType.REFACTOR: ToolChain(
                 name="refactor_chain",
+                parallel=True,
                 tools=[
-                    {"name": "search_code", "params": {"includeHidden": False}},
-                    {"name": "get_file_info", "params": {}},
-                    {"name": "read_multiple_files", "params": {}},
-                    {"name": "addTask", "params": {"title": "Plan refactoring"}},
-                    {"name": "edit_block", "params": {"expected_replacements": 1}},
-                    {"name": "execute_command", "params": {"command": "pytest"}}
-                ],
-                parallel=True
+                    {"id": "search", "name": "search_code", "params": {"includeHidden": False}, "after": []},
+                    {"id": "info", "name": "get_file_info", "params": {}, "after": ["search"], "inputs": {"path": first_found}},
+                    {"id": "read", "name": "read_multiple_files", "params": {}, "after": ["search"], "inputs": {"paths": found_paths}},
+                    {"id": "plan_task", "name": "addTask", "params": {"title": "Plan refactoring"}, "after": []},
+                    {"id": "edit", "name": "edit_block", "params": {"expected_replacements": 1}, "after": ["info", "read"]},
+                    {"id": "test", "name": "execute_command", "params": {"command": "pytest"}, "after": ["edit"]}
+                ]
             ),
             ProblemType.TEST_FIX: ToolChain(
                 name="test_fix_chain",
+                parallel=True,
                 tools=[
-                    {"name": "search_code", "params": {"pattern": "def test_"}},
-                    {"name": "read_file", "params": {}},
-                    {"name": "execute_command", "params": {"command": "pytest -v"}},
-                    {"name": "edit_block", "params": {}},
-                    {"name": "execute_command", "params": {"command": "pytest"}}
+                    {"id": "search", "name": "search_code", "params": {"pattern": "def test_"}, "after": []},
+                    {"id": "read", "name": "read_file", "params": {}, "after": ["search"], "inputs": {"path": first_found}},
+                    {"id": "run", "name": "execute_command", "params": {"command": "pytest -v"}, "after": []},
+                    {"id": "edit", "name": "edit_block", "params": {}, "after": ["read", "run"]},
+                    {"id": "test", "name": "execute_command", "params": {"command": "pytest"}, "after": ["edit"]}
                 ]
             ),
             ProblemType.DOCUMENTATION: ToolChain(
                 name="doc_chain",
+                parallel=True,
                 tools=[
-                    {"name": "search_code", "params": {"pattern": "def |class "}},
-                    {"name": "read_file", "params": {}},
-                    {"name": "edit_block", "params": {}},
-                    {"name": "write_file", "params": {}}
+                    {"id": "search", "name": "search_code", "params": {"pattern": "def |class "}, "after": []},
+                    {"id": "read", "name": "read_file", "params": {}, "after": ["search"], "inputs": {"path": first_found}},
+                    {"id": "edit", "name": "edit_block", "params": {}, "after": ["read"]},
+                    {"id": "write", "name": "write_file", "params": {}, "after": ["edit"]}
                 ]
             ),
             ProblemType.PERFORMANCE: ToolChain(
                 name="performance_chain",
+                parallel=True,
                 tools=[
-                    {"name": "search_code", "params": {}},
-                    {"name": "execute_command", "params": {"command": "python -m cProfile"}},
-                    {"name": "addTask", "params": {"title": "Identify bottlenecks"}},
-                    {"name": "edit_block", "params": {}},
-                    {"name": "execute_command", "params": {"command": "pytest --benchmark"}}
+                    {"id": "search", "name": "search_code", "params": {}, "after": []},
+                    {"id": "profile", "name": "execute_command", "params": {"command": "python -m cProfile"}, "after": []},
+                    {"id": "bottleneck_task", "name": "addTask", "params": {"title": "Identify bottlenecks"}, "after": []},
+                    {"id": "edit", "name": "edit_block", "params": {}, "after": ["search", "profile"]},
+                    {"id": "benchmark", "name": "execute_command", "params": {"command": "pytest --benchmark"}, "after": ["edit"]}
                 ]
             )
         }
         
         return chains.get(problem_type, chains[ProblemType.BUG_FIX])
     
-    async def _execute_tool_step(self, tool_config: Dict, instance: Dict) -> Dict:
-        """Execute a single tool step"""
+    async def _execute_tool_step(self, tool_config: Dict, instance: Dict, inputs: Optional[Dict] = None) -> Dict:
+        """Execute a single tool step, with params bound from earlier steps' outputs"""
+        tool_name = tool_config["name"]
+        params = self._step_params(tool_config, instance, inputs)
+        
+        # Execute tool; later steps bind to the unwrapped payload
+        result = tool_result(await self.acf.call_tool(tool_name, params))
+        
+        return {
+            "tool": tool_name,
+            "params": params,
+            "result": result,
+            "status": "failed" if not result or result.get("success") is False else "success"
+        }
+    
+    def _step_params(self, tool_config: Dict, instance: Dict, inputs: Optional[Dict] = None) -> Dict:
+        """A step's params, bound inputs and instance data"""
         tool_name = tool_config["name"]
-        params = tool_config.get("params", {})
+        params = {**tool_config.get("params", {}), **(inputs or {})}
         
         # Enhance params with instance data
         if tool_name == "search_code":
@@ -233,18 +364,17 @@ class AdvancedStrategy(AgentStrategy):
             params["projectName"] = instance['instance_id']
             params["projectDescription"] = instance['problem_statement'][:1000]
         
-        # Execute tool
-        result = await self.acf.call_tool(tool_name, params)
-        
-        return {
-            "tool": tool_name,
-            "params": params,
-            "result": result,
-            "status": "success" if result else "failed"
-        }
+        return params
     
     def _extract_search_pattern(self, instance: Dict) -> str:
         """Extract intelligent search pattern"""
+        # With a symbol index, search for the definition of the best
+        # candidate named anywhere in the problem statement
+        if self.symbol_index is not None:
+            names = self.symbol_index.identifiers(instance['problem_statement'])
+            if names:
+                return rf"(def|class) {names[0].rsplit('.', 1)[-1]}\b"
+        
         # Extract from test names or problem statement
         patterns = []
         
@@ -341,10 +471,18 @@ class CustomStrategy(AgentStrategy):
 class HybridStrategy(AgentStrategy):
     """Hybrid strategy that combines multiple approaches"""
     
-    def __init__(self, acf_client):
+    def __init__(
+        self,
+        acf_client,
+        test_impact: Optional[TestImpactAnalyzer] = None,
+        symbols: Optional[SymbolIndexer] = None,
+        use_task_manager: bool = True,
+        retry: Optional[RetryPolicy] = None,
+        settings: Optional[Dict] = None
+    ):
         super().__init__(acf_client)
         self.basic = BasicStrategy(acf_client)
-        self.advanced = AdvancedStrategy(acf_client)
+        self.advanced = AdvancedStrategy(acf_client, test_impact, symbols, use_task_manager, retry, settings)
     
     async def execute(self, instance: Dict) -> Dict:
         logger.info("Executing Hybrid Strategy")
@@ -457,4 +595,13 @@ def get_strategy(strategy_name: str, acf_client, **kwargs) -> AgentStrategy:
         return CustomStrategy(acf_client, workflow)
     
     strategy_class = strategies.get(strategy_name, AdvancedStrategy)
+    if strategy_class in (AdvancedStrategy, HybridStrategy):
+        return strategy_class(
+            acf_client,
+            test_impact=kwargs.get("test_impact"),
+            symbols=kwargs.get("symbols"),
+            use_task_manager=kwargs.get("use_task_manager", True),
+            retry=kwargs.get("retry"),
+            settings=kwargs.get("settings")
+        )
     return strategy_class(acf_client)
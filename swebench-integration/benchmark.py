@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Benchmark the ACF MCP client and agent pipeline against a local stub server
+
+Runs entirely in-process: a fake ACF MCP websocket server answers tool calls
+with configurable latency and payload size per tool, and synthetic
+SWE-bench-shaped instances stand in for the dataset. Measures client call
+throughput, instance throughput at several worker counts, memory per
+in-flight instance and JSON serialization overhead, and compares the
+results against a saved baseline.
+
+Example:
+    python benchmark.py --save-baseline
+    python benchmark.py --compare --tolerance 0.15
+"""
+
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import click
+from loguru import logger
+from rich.console import Console
+from rich.table import Table
+
+sys.path.insert(0, str(Path(__file__).parent))
+from json_codec import JSONCodec, get_codec
+from mcp_pool import MCPConnectionPool
+from run_evaluation import ACFMCPClient, SWEBenchAgent
+from tool_cache import ToolResultCache
+
+console = Console()
+
+DEFAULT_BASELINE = Path(__file__).parent / "benchmark_baseline.json"
+
+# Rough shape of a local ACF server: seconds per call and response bytes
+DEFAULT_LATENCY = {
+    "search_code": 0.010,
+    "read_file": 0.001,
+    "read_multiple_files": 0.003,
+    "execute_command": 0.050,
+    "edit_block": 0.002,
+}
+DEFAULT_PAYLOAD = {
+    "search_code": 4096,
+    "read_file": 8192,
+    "read_multiple_files": 32768,
+    "execute_command": 2048,
+}
+
+# Metrics where a smaller number is an improvement
+LOWER_IS_BETTER = ("memory_per_instance_kb", "encode_us_per_kb", "decode_us_per_kb")
+
+
+class FakeACFServer:
+    """In-process stand-in for the ACF MCP websocket server
+
+    Like ACF, each connection's requests are handled one at a time unless
+    ``serial`` is False.
+    """
+
+    def __init__(
+        self,
+        latency: Optional[Dict[str, float]] = None,
+        payload: Optional[Dict[str, int]] = None,
+        default_latency: float = 0.001,
+        default_payload: int = 256,
+        jitter: float = 0.1,
+        serial: bool = True,
+    ):
+        self.latency = {**DEFAULT_LATENCY, **(latency or {})}
+        self.payload = {**DEFAULT_PAYLOAD, **(payload or {})}
+        self.default_latency = default_latency
+        self.default_payload = default_payload
+        self.jitter = jitter
+        self.serial = serial
+        self.port: Optional[int] = None
+        self.calls = 0
+        self._server = None
+        self._bodies: Dict[int, str] = {}
+
+    def _body(self, size: int) -> str:
+        if size not in self._bodies:
+            self._bodies[size] = ("x" * 79 + "\n") * (size // 80) + "x" * (size % 80)
+        return self._bodies[size]
+
+    async def _respond(self, ws, message: str):
+        request = json.loads(message)
+        tool = request.get("params", {}).get("name", request.get("method"))
+        delay = self.latency.get(tool, self.default_latency)
+        if delay:
+            await asyncio.sleep(delay * random.uniform(1 - self.jitter, 1 + self.jitter))
+        self.calls += 1
+        text = self._body(self.payload.get(tool, self.default_payload))
+        await ws.send(json.dumps({
+            "jsonrpc": "2.0",
+            "id": request["id"],
+            "result": {"content": [{"type": "text", "text": text}]},
+        }))
+
+    async def _handle(self, ws):
+        async for message in ws:
+            if self.serial:
+                await self._respond(ws, message)
+            else:
+                asyncio.create_task(self._respond(ws, message))
+
+    async def start(self) -> int:
+        import websockets
+        self._server = await websockets.serve(self._handle, "localhost", 0, max_size=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+
+def synthetic_instances(count: int, seed: int = 0) -> List[Dict]:
+    """SWE-bench-shaped instances with plausible field sizes"""
+    rng = random.Random(seed)
+    repos = ["django/django", "sympy/sympy", "astropy/astropy", "pytest-dev/pytest"]
+    instances = []
+    for i in range(count):
+        repo = repos[i % len(repos)]
+        instances.append({
+            "instance_id": f"{repo.replace('/', '__')}-{10000 + i}",
+            "repo": repo,
+            "base_commit": f"{rng.getrandbits(160):040x}",
+            "problem_statement": "Calling the method raises an error when the input is empty. " * rng.randint(5, 40),
+            "FAIL_TO_PASS": json.dumps([f"tests/test_module.py::test_case_{i}"]),
+            "PASS_TO_PASS": json.dumps([f"tests/test_module.py::test_other_{j}" for j in range(rng.randint(5, 50))]),
+            "test_patch": f"diff --git a/tests/test_module.py b/tests/test_module.py\n+def test_case_{i}():\n+    pass\n",
+            "version": "1.0",
+        })
+    return instances
+
+
+class BenchmarkRunner:
+    """Runs the benchmark scenarios against one fake server"""
+
+    def __init__(
+        self,
+        server: FakeACFServer,
+        pool_size: int = 8,
+        use_cache: bool = False,
+        codec: Optional[JSONCodec] = None,
+    ):
+        self.server = server
+        self.pool_size = pool_size
+        self.use_cache = use_cache
+        self.codec = codec or get_codec()
+
+    def _client(self, cache: Optional[ToolResultCache] = None) -> ACFMCPClient:
+        return ACFMCPClient("localhost", self.server.port, cache=cache, codec=self.codec)
+
+    def _pool(self, cache: Optional[ToolResultCache] = None) -> MCPConnectionPool:
+        return MCPConnectionPool(lambda: self._client(cache), min_size=1, max_size=self.pool_size)
+
+    async def calls_per_second(self, calls: int, concurrency: int, pooled: bool) -> float:
+        """Throughput of small get_file_info calls on one connection or through the pool"""
+        target = self._pool() if pooled else self._client()
+        await (target.start() if pooled else target.connect())
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i: int):
+            async with semaphore:
+                await target.call_tool("get_file_info", {"path": f"/tmp/file_{i}.py"})
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(calls)))
+        elapsed = time.perf_counter() - started
+        await target.close()
+        return calls / elapsed
+
+    async def solve_all(self, instances: List[Dict], workers: int) -> float:
+        """Solve instances with ``workers`` in flight; returns instances/sec"""
+        cache = ToolResultCache(max_size_mb=256) if self.use_cache else None
+        pool = self._pool(cache)
+        await pool.start()
+        semaphore = asyncio.Semaphore(workers)
+
+        async def solve(instance: Dict):
+            async with semaphore:
+                async with pool.connection() as client:
+                    await SWEBenchAgent(client, "advanced").solve_instance(instance)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(solve(instance) for instance in instances))
+        elapsed = time.perf_counter() - started
+        await pool.close()
+        return len(instances) / elapsed
+
+    async def memory_per_instance_kb(self, instances: List[Dict], workers: int) -> float:
+        """Peak traced memory above idle, divided by the number in flight"""
+        tracemalloc.start()
+        try:
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await self.solve_all(instances, workers)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return (peak - baseline) / 1024 / max(1, workers)
+
+
+def serialization_overhead(
+    codec: JSONCodec,
+    sizes: Tuple[int, ...] = (1024, 65536, 1048576),
+    rounds: int = 20,
+) -> Dict[str, float]:
+    """Microseconds per KB to encode requests and decode responses of each size"""
+    encode = decode = 0.0
+    total_kb = 0.0
+    for size in sizes:
+        response = codec.dumps({"jsonrpc": "2.0", "id": 1,
+                               "result": {"content": [{"type": "text", "text": "x" * size}]}})
+        request = {"jsonrpc": "2.0", "method": "tools/call", "id": 1,
+                   "params": {"name": "write_file", "arguments": {"path": "/tmp/f.py", "content": "x" * size}}}
+        started = time.perf_counter()
+        for _ in range(rounds):
+            codec.dumps(request)
+        encode += time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(rounds):
+            codec.loads(response)
+        decode += time.perf_counter() - started
+        total_kb += size / 1024 * rounds
+    return {"encode_us_per_kb": encode / total_kb * 1e6, "decode_us_per_kb": decode / total_kb * 1e6}
+
+
+async def run_benchmarks(
+    instances: int,
+    workers: Tuple[int, ...],
+    calls: int,
+    server: FakeACFServer,
+    pool_size: int,
+    use_cache: bool,
+    codec: JSONCodec,
+) -> Dict[str, float]:
+    await server.start()
+    runner = BenchmarkRunner(server, pool_size, use_cache, codec)
+    dataset = synthetic_instances(instances)
+    results: Dict[str, float] = {}
+    try:
+        results["client_calls_per_sec"] = await runner.calls_per_second(calls, 32, pooled=False)
+        results["pool_calls_per_sec"] = await runner.calls_per_second(calls, 32, pooled=True)
+        for count in workers:
+            results[f"instances_per_sec_{count}_workers"] = await runner.solve_all(dataset, count)
+        results["memory_per_instance_kb"] = await runner.memory_per_instance_kb(dataset, max(workers))
+    finally:
+        await server.close()
+    results.update(serialization_overhead(codec))
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """Names of metrics that regressed by more than ``tolerance`` (a fraction)"""
+    regressions = []
+    for name, value in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        change = (value - reference) / reference
+        if name in LOWER_IS_BETTER:
+            change = -change
+        if change < -tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def _parse_overrides(values: Tuple[str, ...], scale: float) -> Dict[str, float]:
+    """Parse repeated ``tool=value`` options"""
+    overrides = {}
+    for value in values:
+        tool, _, amount = value.partition('=')
+        if not amount:
+            raise click.BadParameter(f"expected tool=value, got {value!r}")
+        overrides[tool] = float(amount) * scale
+    return overrides
+
+
+@click.command()
+@click.option('--instances', default=64, help='Synthetic instances per throughput run')
+@click.option('--workers', default='1,4,16', help='Comma-separated worker counts to measure')
+@click.option('--calls', default=2000, help='Tool calls per calls/sec run')
+@click.option('--pool-size', default=8, help='Connection pool size')
+@click.option('--cache/--no-cache', default=False, help='Enable the tool result cache')
+@click.option('--latency', multiple=True, help='Per-tool latency in ms, e.g. search_code=25')
+@click.option('--payload', multiple=True, help='Per-tool response bytes, e.g. read_file=65536')
+@click.option('--codec', default='auto', type=click.Choice(['auto', 'orjson', 'json']), help='Client JSON codec')
+@click.option('--concurrent-server', is_flag=True, help='Let the fake server overlap requests on a connection')
+@click.option('--baseline', default=str(DEFAULT_BASELINE), help='Baseline file')
+@click.option('--save-baseline', is_flag=True, help='Write the results as the new baseline')
+@click.option('--compare', 'compare_baseline', is_flag=True, help='Fail if results regress against the baseline')
+@click.option('--tolerance', default=0.2, help='Allowed regression as a fraction of the baseline')
+def main(instances, workers, calls, pool_size, cache, latency, payload, codec, concurrent_server,
+         baseline, save_baseline, compare_baseline, tolerance):
+    """Benchmark ACFMCPClient and SWEBenchAgent against a local stub server"""
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    worker_counts = tuple(int(count) for count in workers.split(','))
+    server = FakeACFServer(
+        latency=_parse_overrides(latency, 0.001),
+        payload={tool: int(size) for tool, size in _parse_overrides(payload, 1).items()},
+        serial=not concurrent_server,
+    )
+    json_codec = get_codec(codec)
+    parameters = {
+        "instances": instances, "workers": list(worker_counts), "calls": calls, "pool_size": pool_size,
+        "cache": cache, "latency": server.latency, "payload": server.payload, "serial": server.serial,
+        "codec": json_codec.name,
+    }
+    results = asyncio.run(run_benchmarks(instances, worker_counts, calls, server, pool_size, cache, json_codec))
+
+    baseline_path = Path(baseline)
+    saved = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    reference = saved.get("results", {})
+
+    table = Table(title="ACF MCP benchmark")
+    table.add_column("metric")
+    table.add_column("value", justify="right")
+    table.add_column("baseline", justify="right")
+    table.add_column("change", justify="right")
+    for name, value in results.items():
+        base = reference.get(name)
+        change = f"{(value - base) / base * 100:+.1f}%" if base else ""
+        table.add_row(name, f"{value:.2f}", f"{base:.2f}" if base else "", change)
+    console.print(table)
+
+    if saved and saved.get("parameters") != parameters:
+        saved_parameters = saved.get("parameters", {})
+        differing = sorted(
+            key for key in parameters.keys() | saved_parameters.keys()
+            if parameters.get(key) != saved_parameters.get(key)
+        )
+        console.print(
+            f"[yellow]Benchmark parameters differ from the baseline's ({', '.join(differing)}); "
+            "comparison is approximate[/yellow]"
+        )
+
+    if save_baseline:
+        baseline_path.write_text(json.dumps({
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": parameters,
+            "results": results,
+        }, indent=2) + "\n")
+        console.print(f"Baseline saved to {baseline_path}")
+
+    if compare_baseline:
+        if not reference:
+            raise click.ClickException(f"No baseline at {baseline_path}; run with --save-baseline first")
+        regressions = compare(results, reference, tolerance)
+        if regressions:
+            console.print(f"[bold red]Regressed beyond {tolerance:.0%}: {', '.join(regressions)}[/bold red]")
+            sys.exit(1)
+        console.print(f"[green]No regressions beyond {tolerance:.0%}[/green]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Dependency-aware Execution of Tool Chains
+
+A tool chain is a DAG of steps. Each step names the steps it runs
+``after`` and may bind parameters to their outputs through ``inputs``
+(``{"paths": "search.result.matches[].path"}``). Steps whose dependencies
+have finished run concurrently up to a limit, so a chain takes as long as
+its longest dependency path rather than the sum of its steps; that
+critical path is recorded with every run.
+"""
+
+import asyncio
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+
+_PART = re.compile(r'^(\w+)(?:\[(\d*)\])?$')
+
+
+def _lookup(value: Any, parts: List[str]) -> Any:
+    """Follow ``key``, ``key[N]`` and ``key[]`` (map over a list) parts"""
+    if not parts or value is None:
+        return value
+    if isinstance(value, list):
+        mapped = (_lookup(item, parts) for item in value)
+        return [item for item in mapped if item is not None]
+    match = _PART.match(parts[0])
+    if match is None or not isinstance(value, dict):
+        return None
+    key, index = match.groups()
+    value = value.get(key)
+    if index is not None and isinstance(value, list):
+        if index == '':
+            return _lookup(value, parts[1:])
+        value = value[int(index)] if int(index) < len(value) else None
+    return _lookup(value, parts[1:])
+
+
+def resolve_input(outputs: Dict[str, Any], reference: str) -> Any:
+    """Value of ``"<step id>.<path>"`` in the outputs of finished steps"""
+    step_id, _, path = reference.partition('.')
+    value = _lookup(outputs.get(step_id), path.split('.') if path else [])
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        value = list(dict.fromkeys(value))
+    return value
+
+
+def normalize_steps(steps: List[Dict]) -> List[Dict]:
+    """Give every step an ``id`` and ``after`` list, and check the graph
+
+    Steps without an explicit ``after`` depend on the step before them, so
+    plain lists of steps keep running in order.
+    """
+    normalized, seen = [], set()
+    for position, step in enumerate(steps):
+        step_id = step.get("id") or step["name"]
+        if step_id in seen:
+            step_id = f"{step_id}#{position}"
+        after = step.get("after")
+        if after is None:
+            after = [normalized[-1]["id"]] if normalized else []
+        normalized.append({**step, "id": step_id, "after": list(after)})
+        seen.add(step_id)
+
+    ids = {step["id"] for step in normalized}
+    for step in normalized:
+        unknown = [dep for dep in step["after"] if dep not in ids]
+        if unknown:
+            raise ValueError(f"Step {step['id']!r} depends on unknown steps {unknown}")
+
+    # Kahn's algorithm, just to reject cycles
+    remaining = {step["id"]: set(step["after"]) for step in normalized}
+    while remaining:
+        ready = [step_id for step_id, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Tool chain has a dependency cycle among {sorted(remaining)}")
+        for step_id in ready:
+            del remaining[step_id]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return normalized
+
+
+class ChainExecutor:
+    """Run a tool chain DAG with at most ``max_parallel`` steps in flight
+
+    ``run_step(step, inputs)`` executes one step and returns its output
+    (what ``inputs`` of later steps refer to). A step that raises is
+    recorded as failed and the steps depending on it are skipped.
+    """
+
+    def __init__(
+        self,
+        run_step: Callable[[Dict, Dict[str, Any]], Awaitable[Any]],
+        max_parallel: int = 4,
+    ):
+        self.run_step = run_step
+        self.max_parallel = max(1, max_parallel)
+
+    async def run(self, steps: List[Dict]) -> Dict[str, Any]:
+        """Execute the chain; returns step outputs in chain order and timings"""
+        steps = normalize_steps(steps)
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        finished = {step["id"]: asyncio.Event() for step in steps}
+        outputs: Dict[str, Any] = {}
+        failed: Dict[str, str] = {}
+        timings: Dict[str, Dict[str, float]] = {}
+        started = time.perf_counter()
+
+        async def execute(step: Dict):
+            step_id = step["id"]
+            try:
+                for dep in step["after"]:
+                    await finished[dep].wait()
+                blocked = [dep for dep in step["after"] if dep in failed]
+                if blocked:
+                    failed[step_id] = f"dependency failed: {', '.join(blocked)}"
+                    outputs[step_id] = {"tool": step["name"], "status": "skipped", "reason": failed[step_id]}
+                    return
+                inputs = {}
+                for param, reference in step.get("inputs", {}).items():
+                    value = resolve_input(outputs, reference)
+                    if value is not None:
+                        inputs[param] = value
+                async with semaphore:
+                    step_started = time.perf_counter()
+                    try:
+                        outputs[step_id] = await self.run_step(step, inputs)
+                    except Exception as e:
+                        logger.error(f"Tool step {step_id} failed: {e}")
+                        failed[step_id] = str(e)
+                        outputs[step_id] = {"tool": step["name"], "status": "failed", "error": str(e)}
+                    step_finished = time.perf_counter()
+                timings[step_id] = {
+                    "start": step_started - started,
+                    "end": step_finished - started,
+                    "seconds": step_finished - step_started,
+                }
+            finally:
+                finished[step_id].set()
+
+        await asyncio.gather(*(execute(step) for step in steps))
+        elapsed = time.perf_counter() - started
+
+        # Longest chain of step durations through the dependency graph
+        after = {step["id"]: step["after"] for step in steps}
+        path_seconds: Dict[str, float] = {}
+        path_previous: Dict[str, Optional[str]] = {}
+
+        def longest(step_id: str) -> float:
+            if step_id not in path_seconds:
+                previous = max(after[step_id], key=longest, default=None)
+                path_previous[step_id] = previous
+                path_seconds[step_id] = (
+                    timings.get(step_id, {}).get("seconds", 0.0)
+                    + (longest(previous) if previous else 0.0)
+                )
+            return path_seconds[step_id]
+
+        for step_id in after:
+            longest(step_id)
+        critical_path: List[str] = []
+        tail = max(path_seconds, key=path_seconds.get, default=None)
+        while tail is not None:
+            critical_path.insert(0, tail)
+            tail = path_previous[tail]
+
+        return {
+            "steps": [outputs[step["id"]] for step in steps],
+            "timings": timings,
+            "elapsed_seconds": elapsed,
+            "serial_seconds": sum(timing["seconds"] for timing in timings.values()),
+            "critical_path": critical_path,
+            "critical_path_seconds": path_seconds[critical_path[-1]] if critical_path else 0.0,
+        }
@@ -0,0 +1,281 @@
+"""
+Adaptive Instance Concurrency
+
+A fixed worker count is wrong for a mixed workload: instances dominated by
+MCP round trips want many in flight, while CPU-bound test suites want few.
+``AdaptiveConcurrency`` replaces the evaluator's semaphore with a limit
+that is adjusted every ``interval`` seconds by AIMD:
+
+* decrease multiplicatively when the host or the server is overloaded:
+  recent tool-call latency well above its long-run average, per tool (a
+  latency gradient, which is how queueing in the ACF server shows up;
+  test commands are left out), long waits for a pooled MCP session, CPU
+  load above ``max_cpu_percent``, or memory pressure;
+* increase by one when the limit was actually reached during the interval
+  and none of those signals fired.
+
+Every change is logged with the signals that caused it.
+"""
+
+import asyncio
+import os
+import statistics
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from resource_governor import mem_available_mb, parse_size_mb
+
+
+def memory_pressure() -> Optional[float]:
+    """``some avg10`` of /proc/pressure/memory (PSI), if the kernel has it"""
+    try:
+        with open('/proc/pressure/memory') as f:
+            for line in f:
+                if line.startswith('some'):
+                    return float(line.split()[1].split('=')[1])
+    except (OSError, IndexError, ValueError):
+        pass
+    return None
+
+
+class AdaptiveConcurrency:
+    """Concurrency limit for instances in flight, used as ``async with``"""
+
+    # A baseline this many times the recent latency is stale (congestion
+    # that leaked into it has cleared) and decays by BASELINE_DECAY per call
+    BASELINE_RESET = 2.0
+    BASELINE_DECAY = 0.9
+
+    # Tools whose latency is the workload's, not the server's: a test run
+    # takes as long as its suite, so no baseline tells congestion apart
+    UNOBSERVED = frozenset({"execute_command"})
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        interval: float = 5.0,
+        latency_tolerance: float = 2.0,
+        max_pool_wait: float = 1.0,
+        max_cpu_percent: Optional[float] = 80,
+        min_available_mb: Optional[int] = None,
+        max_memory_pressure: float = 10.0,
+        decrease_factor: float = 0.7,
+        min_samples: int = 10,
+        short_window: int = 10,
+        long_window: int = 500,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(max(initial, self.min_limit), self.max_limit)
+        self.interval = interval
+        self.latency_tolerance = latency_tolerance
+        self.max_pool_wait = max_pool_wait
+        self.max_cpu_percent = max_cpu_percent
+        self.min_available_mb = min_available_mb
+        self.max_memory_pressure = max_memory_pressure
+        self.decrease_factor = decrease_factor
+        self.min_samples = min_samples
+        # EWMA weights of the recent and the long-run (baseline) latency,
+        # for windows of about that many calls
+        self.short_alpha = 2 / (max(1, short_window) + 1)
+        self.long_alpha = 2 / (max(short_window + 1, long_window) + 1)
+        self.pool = None
+
+        self.in_flight = 0
+        self.history: List[Dict[str, Any]] = []
+        self.stats = {"increases": 0, "decreases": 0, "min_limit": self.limit, "max_limit": self.limit}
+        self._peak_in_flight = 0
+        self._ratios: List[float] = []
+        self._latency: Dict[str, Tuple[float, float]] = {}
+        self._pool_totals = (0, 0.0)
+        self._cpu_times = (0, 0)
+        self._condition: Optional[asyncio.Condition] = None
+        self._task: Optional[asyncio.Task] = None
+        self._started = time.monotonic()
+
+    @classmethod
+    def from_config(cls, initial: int, settings: Dict) -> Optional["AdaptiveConcurrency"]:
+        """Create a controller when optimization.parallel.adaptive is enabled"""
+        optimization = settings.get('optimization', {})
+        adaptive = optimization.get('parallel', {}).get('adaptive', {})
+        if not adaptive.get('enabled', False):
+            return None
+        memory_limit = settings.get('swebench', {}).get('docker', {}).get('memory_limit')
+        return cls(
+            initial=initial,
+            min_limit=adaptive.get('min_workers', 1),
+            max_limit=adaptive.get('max_workers', 32),
+            interval=adaptive.get('interval', 5.0),
+            latency_tolerance=adaptive.get('latency_tolerance', 2.0),
+            max_pool_wait=adaptive.get('max_pool_wait', 1.0),
+            max_cpu_percent=optimization.get('resources', {}).get('max_cpu_percent'),
+            min_available_mb=adaptive.get('min_available_mb', parse_size_mb(memory_limit)),
+            max_memory_pressure=adaptive.get('max_memory_pressure', 10.0),
+            decrease_factor=adaptive.get('decrease_factor', 0.7),
+            short_window=adaptive.get('latency_short_window', 10),
+            long_window=adaptive.get('latency_long_window', 500),
+        )
+
+    # -- slots -----------------------------------------------------------------
+
+    async def __aenter__(self):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            while self.in_flight >= self.limit:
+                await self._condition.wait()
+            self.in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self.in_flight)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    # -- signals ---------------------------------------------------------------
+
+    def observe(self, tool_name: str, seconds: float):
+        """Record a tool call's latency gradient: recent over long-run latency
+
+        Both are EWMAs of the tool's latency, over ``short_window`` and
+        ``long_window`` calls. The long one is the baseline: it follows
+        workspaces that are simply bigger, but too slowly for a burst of
+        queueing to hide in it. Once recent latency drops below
+        1/``BASELINE_RESET`` of it, it decays towards the recent latency,
+        so a baseline raised by past congestion doesn't mask the next
+        one. Tools in ``UNOBSERVED`` are ignored.
+        """
+        if tool_name in self.UNOBSERVED:
+            return
+        short, long = self._latency.get(tool_name, (seconds, seconds))
+        short += (seconds - short) * self.short_alpha
+        long += (seconds - long) * self.long_alpha
+        if long > self.BASELINE_RESET * short:
+            long = max(short, long * self.BASELINE_DECAY)
+        self._latency[tool_name] = (short, long)
+        self._ratios.append(short / max(long, 1e-3))
+
+    def _pool_wait(self) -> Optional[float]:
+        """Average wait for a pooled session over the last interval"""
+        if self.pool is None:
+            return None
+        stats = self.pool.stats()
+        checkouts, waited = stats["checkouts"], stats["avg_wait_seconds"] * stats["checkouts"]
+        previous_checkouts, previous_waited = self._pool_totals
+        self._pool_totals = (checkouts, waited)
+        if checkouts == previous_checkouts:
+            return None
+        return (waited - previous_waited) / (checkouts - previous_checkouts)
+
+    def _cpu_percent(self) -> Optional[float]:
+        """Host CPU utilization since the last sample (/proc/stat), else load average"""
+        try:
+            with open('/proc/stat') as f:
+                times = [int(value) for value in f.readline().split()[1:]]
+        except (OSError, ValueError):
+            try:
+                return os.getloadavg()[0] / (os.cpu_count() or 1) * 100
+            except OSError:
+                return None
+        # idle and iowait are the 4th and 5th columns
+        idle, total = times[3] + times[4], sum(times)
+        previous_idle, previous_total = self._cpu_times
+        self._cpu_times = (idle, total)
+        if total <= previous_total or not previous_total:
+            return None
+        return 100 * (1 - (idle - previous_idle) / (total - previous_total))
+
+    def signals(self) -> Dict[str, Optional[float]]:
+        ratios, self._ratios = self._ratios, []
+        return {
+            "latency_ratio": statistics.median(ratios) if len(ratios) >= self.min_samples else None,
+            "pool_wait": self._pool_wait(),
+            "cpu_percent": self._cpu_percent(),
+            "available_mb": mem_available_mb(),
+            "memory_pressure": memory_pressure(),
+        }
+
+    def _overloaded(self, signals: Dict[str, Optional[float]]) -> Optional[str]:
+        checks = (
+            ("latency_ratio", self.latency_tolerance, "tool latency above baseline"),
+            ("pool_wait", self.max_pool_wait, "waiting for MCP sessions"),
+            ("cpu_percent", self.max_cpu_percent, "CPU load"),
+            ("memory_pressure", self.max_memory_pressure, "memory pressure"),
+        )
+        for key, threshold, reason in checks:
+            if signals[key] is not None and threshold is not None and signals[key] > threshold:
+                return reason
+        available = signals["available_mb"]
+        if available is not None and self.min_available_mb and available < self.min_available_mb:
+            return "low available memory"
+        return None
+
+    # -- control loop ----------------------------------------------------------
+
+    def adjust(self) -> int:
+        """One AIMD step from the signals gathered since the last one"""
+        signals = self.signals()
+        saturated = self._peak_in_flight >= self.limit
+        self._peak_in_flight = self.in_flight
+        previous = self.limit
+        overload = self._overloaded(signals)
+        if overload and self.limit > self.min_limit:
+            self.limit = max(self.min_limit, int(self.limit * self.decrease_factor))
+            self.stats["decreases"] += 1
+            reason = overload
+        elif not overload and saturated and self.limit < self.max_limit:
+            self.limit += 1
+            self.stats["increases"] += 1
+            reason = "limit reached, no overload"
+        else:
+            reason = overload or ("limit reached" if saturated else "below limit")
+
+        described = ", ".join(
+            f"{key} {value:.2f}" for key, value in signals.items() if value is not None
+        )
+        if self.limit != previous:
+            logger.info(f"Concurrency {previous} -> {self.limit}: {reason} ({described})")
+            self.history.append({
+                "seconds": round(time.monotonic() - self._started, 1),
+                "limit": self.limit,
+                "reason": reason,
+                **{key: value for key, value in signals.items() if value is not None},
+            })
+            self.stats["min_limit"] = min(self.stats["min_limit"], self.limit)
+            self.stats["max_limit"] = max(self.stats["max_limit"], self.limit)
+            if self._condition is not None and self.limit > previous:
+                asyncio.ensure_future(self._wake())
+        else:
+            logger.debug(f"Concurrency stays at {self.limit}: {reason} ({described})")
+        return self.limit
+
+    async def _wake(self):
+        async with self._condition:
+            self._condition.notify_all()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.adjust()
+
+    def start(self, pool=None):
+        """Start the control loop; ``pool`` supplies session wait times"""
+        self.pool = pool
+        self._started = time.monotonic()
+        self._cpu_percent()
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,196 @@
+"""
+Test Impact Analysis for Incremental Testing
+
+Builds a map from source files to the tests that execute them, once per
+repository snapshot, by running the suite under coverage with per-test
+contexts. Validation then runs only the tests impacted by the files a patch
+touches instead of the whole suite.
+"""
+
+import asyncio
+import json
+import re
+import shlex
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from loguru import logger
+
+from json_codec import tool_result
+
+
+def changed_files_from_patch(patch: str) -> List[str]:
+    """Files touched by a unified diff"""
+    files = re.findall(r'^(?:\+\+\+ b/|--- a/)(\S+)', patch or '', re.MULTILINE)
+    return list(dict.fromkeys(files))
+
+
+class TestImpactMap:
+    """Mapping of source files to the test node ids that cover them"""
+
+    def __init__(self, file_to_tests: Dict[str, Set[str]]):
+        self.file_to_tests = file_to_tests
+        self._tests_by_file: Dict[str, Set[str]] = {}
+        for tests in file_to_tests.values():
+            for test in tests:
+                self._tests_by_file.setdefault(test.split('::')[0], set()).add(test)
+
+    @classmethod
+    def from_coverage_json(cls, coverage: Dict) -> "TestImpactMap":
+        """Build a map from ``coverage json --show-contexts`` output"""
+        file_to_tests = {}
+        for path, data in coverage.get('files', {}).items():
+            tests = set()
+            for contexts in data.get('contexts', {}).values():
+                for context in contexts:
+                    # pytest-cov labels contexts "<nodeid>|run", "|setup", "|teardown"
+                    test = context.split('|')[0]
+                    if test:
+                        tests.add(test)
+            if tests:
+                file_to_tests[path] = tests
+        return cls(file_to_tests)
+
+    def to_json(self) -> Dict:
+        return {path: sorted(tests) for path, tests in self.file_to_tests.items()}
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "TestImpactMap":
+        return cls({path: set(tests) for path, tests in data.items()})
+
+    def impacted(self, changed_files: Iterable[str]) -> Optional[Set[str]]:
+        """Tests impacted by a set of changed files
+
+        Returns None when the impact cannot be determined, i.e. a changed
+        file is neither Python source nor a known test file (configuration,
+        data, extension sources), so the caller should fall back.
+        """
+        impacted: Set[str] = set()
+        for path in changed_files:
+            if path in self._tests_by_file:
+                # An edited test file impacts all of its own tests
+                impacted |= self._tests_by_file[path]
+            if path in self.file_to_tests:
+                impacted |= self.file_to_tests[path]
+            elif not path.endswith('.py'):
+                return None
+        return impacted
+
+
+class TestImpactAnalyzer:
+    """Build, cache and query test impact maps per (repo, base_commit)
+
+    One analyzer serves a whole run; the ACF session to build with is
+    passed per call, since each instance works through its own.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "./cache/test_impact",
+        timeout_ms: int = 3600000,
+        full_suite_fallback: bool = False,
+        report_dir: str = ".acf",
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.timeout_ms = timeout_ms
+        self.full_suite_fallback = full_suite_fallback
+        self.report_dir = report_dir
+        self._maps: Dict[str, Optional[TestImpactMap]] = {}
+        self._build_locks: Dict[str, asyncio.Lock] = {}
+
+    @classmethod
+    def from_config(cls, settings: Dict) -> Optional["TestImpactAnalyzer"]:
+        """Create an analyzer when agent.validation.impact_analysis is on
+
+        The build timeout is kept under error_handling.instance_deadline_seconds,
+        so a build cannot use up an instance's whole budget.
+        """
+        validation = settings.get('agent', {}).get('validation', {})
+        if not validation.get('impact_analysis', False):
+            return None
+        timeout = validation.get('impact_build_timeout_seconds', 600)
+        deadline = settings.get('error_handling', {}).get('instance_deadline_seconds')
+        if deadline:
+            timeout = min(timeout, deadline / 2)
+        return cls(
+            cache_dir=validation.get('impact_cache_dir', './cache/test_impact'),
+            timeout_ms=int(timeout * 1000),
+            full_suite_fallback=validation.get('full_suite_fallback', False),
+        )
+
+    def _map_path(self, repo: str, commit: str, suffix: str = ".json") -> Path:
+        return self.cache_dir / repo.replace('/', '__') / f"{commit}{suffix}"
+
+    async def _build(self, acf_client) -> Optional[TestImpactMap]:
+        """Run the suite at the workspace's HEAD under coverage with per-test contexts
+
+        Edits are uncommitted, so HEAD is still the base commit: the suite
+        runs in a detached worktree of it, leaving the edited files alone.
+        """
+        report = f"{self.report_dir}/coverage-contexts.json"
+        base = f"{self.report_dir}/impact-base"
+        command = (
+            f"mkdir -p {shlex.quote(self.report_dir)} && root=$(pwd) && "
+            f"git worktree add --detach -f {shlex.quote(base)} HEAD >/dev/null && "
+            f"(cd {shlex.quote(base)} && "
+            "python -m pytest -q -p no:cacheprovider --cov=. --cov-context=test --cov-report= ; "
+            f"python -m coverage json --show-contexts -o \"$root\"/{shlex.quote(report)}) ; "
+            f"git worktree remove --force {shlex.quote(base)}"
+        )
+        await acf_client.call_tool("execute_command", {"command": command, "timeout_ms": self.timeout_ms})
+        result = tool_result(await acf_client.call_tool("read_file", {"path": report}))
+        if not result.get('content'):
+            logger.warning("Coverage map unavailable (is pytest-cov installed in the workspace?)")
+            return None
+        return TestImpactMap.from_coverage_json(json.loads(result['content']))
+
+    async def load_or_build(self, acf_client, repo: str, commit: str) -> Optional[TestImpactMap]:
+        """Impact map for a repo snapshot, built on first use and cached on disk
+
+        The build runs the suite at ``commit`` in a worktree of the
+        session's workspace. A build that produced no map is recorded too
+        and not retried; delete the ``.failed`` file to try again.
+        """
+        key = f"{repo}@{commit}"
+        if key in self._maps:
+            return self._maps[key]
+
+        lock = self._build_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key in self._maps:
+                return self._maps[key]
+            path = self._map_path(repo, commit)
+            failed = self._map_path(repo, commit, ".failed")
+            impact_map = None
+            if path.exists():
+                impact_map = TestImpactMap.from_json(json.loads(path.read_text()))
+            elif not failed.exists():
+                logger.info(f"Building test impact map for {key}")
+                impact_map = await self._build(acf_client)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                if impact_map is not None:
+                    path.write_text(json.dumps(impact_map.to_json()))
+                else:
+                    failed.write_text("no coverage report\n")
+            self._maps[key] = impact_map
+        return impact_map
+
+    async def select(self, acf_client, instance: Dict, changed_files: Iterable[str]) -> Optional[Set[str]]:
+        """Tests to run for the given changes
+
+        Returns the impacted test node ids, or None when the full suite
+        should run instead (no map, or impact unknown, and the full-suite
+        fallback is enabled). Without the fallback an undeterminable impact
+        selects nothing.
+        """
+        changed_files = list(changed_files)
+        impact_map = await self.load_or_build(acf_client, instance['repo'], instance.get('base_commit', 'HEAD'))
+        impacted = impact_map.impacted(changed_files) if impact_map else None
+        if impacted is None:
+            if self.full_suite_fallback:
+                logger.info("Test impact unknown, falling back to the full suite")
+                return None
+            logger.warning(f"Test impact unknown for {changed_files}; no extra tests selected")
+            return set()
+        logger.debug(f"{len(impacted)} tests impacted by {len(changed_files)} changed files")
+        return impacted
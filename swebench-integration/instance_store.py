@@ -0,0 +1,169 @@
+"""
+Local Instance Store for SWE-bench Datasets
+
+Converts a dataset split into an indexed SQLite file once, keyed by
+instance_id and repo. Afterwards single-instance lookups are O(1), filtered
+runs only read the rows they select, and nothing needs the (slow to import)
+``datasets`` package or the network.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from loguru import logger
+
+
+class InstanceStore:
+    """Indexed on-disk copy of a SWE-bench dataset split"""
+
+    SCHEMA = """
+        CREATE TABLE instances (
+            instance_id TEXT PRIMARY KEY,
+            repo TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX idx_instances_repo ON instances (repo, position);
+        CREATE INDEX idx_instances_position ON instances (position);
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    @staticmethod
+    def store_path(dataset_name: str, split: str = 'test', store_dir: str = './cache/instances') -> Path:
+        """Location of the store file for a dataset split"""
+        return Path(store_dir) / f"{dataset_name.replace('/', '__')}-{split}.sqlite"
+
+    @classmethod
+    def open_or_build(
+        cls,
+        dataset_name: str,
+        split: str = 'test',
+        store_dir: str = './cache/instances',
+        rebuild: bool = False,
+    ) -> "InstanceStore":
+        """Open the store for a dataset split, converting the dataset on first use"""
+        path = cls.store_path(dataset_name, split, store_dir)
+        if rebuild or not path.exists():
+            cls.build(dataset_name, split, path)
+        return cls(path)
+
+    @classmethod
+    def build(cls, dataset_name: str, split: str, path: Path, batch_size: int = 500):
+        """Stream a dataset split into a new store file"""
+        from datasets import load_dataset
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # A private file next to the store, so concurrent builds never
+        # write to (or unlink) each other's
+        fd, tmp_path = tempfile.mkstemp(prefix=path.name + '.', suffix='.tmp', dir=path.parent)
+        os.close(fd)
+
+        started = time.monotonic()
+        logger.info(f"Building instance store for {dataset_name}[{split}] at {path}")
+        db = sqlite3.connect(tmp_path)
+        try:
+            db.executescript(cls.SCHEMA)
+            batch = []
+            count = 0
+            for position, instance in enumerate(load_dataset(dataset_name, split=split, streaming=True)):
+                batch.append((
+                    instance['instance_id'],
+                    instance.get('repo', ''),
+                    position,
+                    json.dumps(dict(instance), default=str),
+                ))
+                if len(batch) >= batch_size:
+                    db.executemany("INSERT OR REPLACE INTO instances VALUES (?, ?, ?, ?)", batch)
+                    count += len(batch)
+                    batch = []
+            db.executemany("INSERT OR REPLACE INTO instances VALUES (?, ?, ?, ?)", batch)
+            count += len(batch)
+            db.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ('dataset_name', dataset_name),
+                ('split', split),
+                ('count', str(count)),
+                ('built_at', str(time.time())),
+            ])
+            db.commit()
+        except BaseException:
+            db.close()
+            os.unlink(tmp_path)
+            raise
+        db.close()
+        os.replace(tmp_path, path)
+        logger.info(f"Stored {count} instances in {time.monotonic() - started:.1f}s")
+
+    def _where(
+        self,
+        repo: Optional[str] = None,
+        pattern: Optional[str] = None,
+        instance_ids: Optional[List[str]] = None,
+    ):
+        """Build a WHERE clause for the supported filters"""
+        clauses, params = [], []
+        if repo:
+            clauses.append("repo = ?")
+            params.append(repo)
+        if pattern:
+            clauses.append("instance_id GLOB ?")
+            params.append(pattern)
+        if instance_ids is not None:
+            clauses.append(f"instance_id IN ({', '.join('?' * len(instance_ids))})")
+            params.extend(instance_ids)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def get(self, instance_id: str) -> Optional[Dict]:
+        """Look up one instance by id"""
+        row = self._db.execute(
+            "SELECT data FROM instances WHERE instance_id = ?", (instance_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def ids(
+        self,
+        repo: Optional[str] = None,
+        pattern: Optional[str] = None,
+        instance_ids: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+    ) -> List[str]:
+        """Instance ids matching the filters, in dataset order"""
+        where, params = self._where(repo, pattern, instance_ids)
+        query = f"SELECT instance_id FROM instances{where} ORDER BY position"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return [row[0] for row in self._db.execute(query, params)]
+
+    def iter(
+        self,
+        repo: Optional[str] = None,
+        pattern: Optional[str] = None,
+        instance_ids: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Dict]:
+        """Stream instances matching the filters, in dataset order"""
+        where, params = self._where(repo, pattern, instance_ids)
+        query = f"SELECT data FROM instances{where} ORDER BY position"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        for (data,) in self._db.execute(query, params):
+            yield json.loads(data)
+
+    def repos(self) -> Dict[str, int]:
+        """Instance counts per repository"""
+        return dict(self._db.execute("SELECT repo, COUNT(*) FROM instances GROUP BY repo ORDER BY repo"))
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM instances").fetchone()[0]
+
+    def close(self):
+        self._db.close()
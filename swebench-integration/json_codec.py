@@ -0,0 +1,98 @@
+"""
+Pluggable JSON Codec for the ACF MCP Client
+
+Tool responses such as ``read_multiple_files`` or ``tree`` on a large
+repository run to several megabytes. ``orjson`` encodes and decodes them
+several times faster than the standard library, so it is used when it is
+installed; otherwise the client falls back to ``json``.
+"""
+
+import json
+from typing import Any, Callable, Dict, Optional, Union
+
+from loguru import logger
+
+
+class JSONCodec:
+    """Standard library codec; the fallback when no faster library is installed"""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> str:
+        return json.dumps(obj, separators=(',', ':'), default=str)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """``orjson`` codec; accepts both str and bytes frames"""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, obj: Any) -> str:
+        # Websocket text frames must be str; decoding the UTF-8 is still far
+        # cheaper than json.dumps
+        return self._orjson.dumps(obj, default=str).decode('utf-8')
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return self._orjson.loads(data)
+
+
+CODECS: Dict[str, Callable[[], JSONCodec]] = {
+    "json": JSONCodec,
+    "orjson": OrjsonCodec,
+}
+
+
+def get_codec(name: str = "auto") -> JSONCodec:
+    """Codec by name; ``auto`` picks the fastest one that is installed"""
+    if name == "auto":
+        for candidate in ("orjson", "json"):
+            try:
+                return CODECS[candidate]()
+            except ImportError:
+                continue
+    if name not in CODECS:
+        raise ValueError(f"Unknown JSON codec {name!r}; choose from auto, {', '.join(CODECS)}")
+    try:
+        return CODECS[name]()
+    except ImportError:
+        logger.warning(f"JSON codec {name!r} is not installed; falling back to the standard library")
+        return JSONCodec()
+
+
+DEFAULT_CODEC = get_codec()
+
+
+def tool_result(response: Any, codec: Optional[JSONCodec] = None) -> Dict:
+    """Payload of a tool call out of its JSON-RPC envelope
+
+    ACF answers ``tools/call`` with ``{"result": {"content": [{"type":
+    "text", "text": ...}]}}`` whose text is the tool's JSON-encoded
+    result; the client's local backends answer the same way. A JSON-RPC
+    error becomes ``{"success": False, "message": ...}``, text that is not
+    JSON becomes ``{"content": text}``.
+    """
+    if not isinstance(response, dict):
+        return {"success": False, "message": f"Unexpected tool response: {response!r}"}
+    if response.get("error"):
+        error = response["error"]
+        message = error.get("message") if isinstance(error, dict) else str(error)
+        return {"success": False, "message": message}
+    result = response.get("result", response)
+    content = result.get("content") if isinstance(result, dict) else None
+    if not isinstance(content, list):
+        return result if isinstance(result, dict) else {"content": result}
+    text = ''.join(
+        item.get("text", '') for item in content if isinstance(item, dict) and item.get("type") == "text"
+    )
+    try:
+        payload = (codec or DEFAULT_CODEC).loads(text)
+    except ValueError:
+        return {"content": text}
+    return payload if isinstance(payload, dict) else {"content": payload}
@@ -0,0 +1,168 @@
+"""
+Local Ripgrep Search Backend
+
+When the evaluation runs on the same machine as its workspaces, sending
+``search_code`` to the ACF server only adds a JSON-RPC hop and a full
+serialization of the matches. This backend runs ripgrep in-process instead
+and answers with the same response shape as ACF's ``search_code``, streaming
+matches and stopping ripgrep as soon as ``maxResults`` have been collected.
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import signal
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+
+class LocalSearch:
+    """Answer ``search_code`` calls with a local ripgrep subprocess
+
+    Mirrors the argument handling of ACF's ``searchCode``: case-insensitive
+    unless ``ignoreCase`` is False, ``*.ext`` patterns list matching files,
+    and ``contextLines``, ``includeHidden``, ``maxResults`` and
+    ``timeoutMs`` are honoured. Relative paths resolve against the session's
+    workspace. Paths that do not exist locally are left to the server.
+    """
+
+    def __init__(self, rg_path: str = "rg"):
+        self.rg_path = shutil.which(rg_path) or rg_path
+        self.stats = {"searches": 0, "fallbacks": 0, "early_stops": 0, "seconds": 0.0}
+
+    @classmethod
+    def from_config(cls, settings: Dict) -> Optional["LocalSearch"]:
+        """Create a backend when acf_mcp.search.backend is "ripgrep" and rg is installed"""
+        search = settings.get('acf_mcp', {}).get('search', {})
+        if search.get('backend', 'remote') != 'ripgrep':
+            return None
+        rg_path = search.get('rg_path', 'rg')
+        if shutil.which(rg_path) is None:
+            logger.warning(f"ripgrep ({rg_path}) not found; searching through the ACF server")
+            return None
+        return cls(rg_path)
+
+    def _resolve(self, path: str, workspace: str) -> Optional[Path]:
+        resolved = Path(path) if os.path.isabs(path) or not workspace else Path(workspace) / path
+        return resolved.resolve() if resolved.exists() else None
+
+    def _arguments(self, pattern: str, root: Path, params: Dict, max_count: int):
+        file_pattern = params.get('filePattern')
+        if pattern.startswith('*.') or '*.' in pattern:
+            file_pattern, pattern = pattern, '.'
+        args = [self.rg_path, '--json', '-n', '--max-count', str(max_count)]
+        if params.get('ignoreCase') is not False:
+            args.append('-i')
+        if file_pattern:
+            args.extend(['-g', file_pattern])
+        if params.get('contextLines'):
+            args.extend(['-C', str(int(params['contextLines']))])
+        if params.get('includeHidden'):
+            args.append('--hidden')
+        args.extend(['-e', pattern, str(root)])
+        return args, pattern, file_pattern
+
+    async def _collect(self, process, root: Path, limit: int) -> List[Dict[str, Any]]:
+        matches = []
+        async for line in process.stdout:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if event.get('type') != 'match':
+                continue
+            data = event['data']
+            match_path = data['path'].get('text', '')
+            submatch = data['submatches'][0] if data.get('submatches') else {}
+            matches.append({
+                "path": match_path,
+                "lineNumber": data.get('line_number'),
+                "line": data['lines'].get('text', '').strip(),
+                "column": submatch.get('start', 0),
+                "matchText": submatch.get('match', {}).get('text', ''),
+                "relativePath": os.path.relpath(match_path, root),
+            })
+            if len(matches) >= limit:
+                break
+        return matches
+
+    @staticmethod
+    def _stop(process):
+        """Kill ripgrep without polling it first (Process.kill would reap an
+        exited child behind asyncio's back and lose its exit status)"""
+        if process.returncode is None:
+            try:
+                os.kill(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    async def search(self, params: Dict, workspace: str = "") -> Optional[Dict[str, Any]]:
+        """Run one search; returns the ``search_code`` payload, or None to use the server"""
+        path, pattern = params.get('path'), params.get('pattern')
+        if not path or not pattern:
+            return {"success": False, "message": "Both path and pattern are required"}
+        root = self._resolve(path, workspace)
+        if root is None:
+            self.stats["fallbacks"] += 1
+            return None
+
+        max_results = int(params.get('maxResults') or 100)
+        timeout = (params.get('timeoutMs') or 30000) / 1000
+        args, search_pattern, file_pattern = self._arguments(pattern, root, params, max_results + 1)
+
+        started = time.perf_counter()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+                limit=16 * 1024 * 1024,
+            )
+        except OSError as e:
+            logger.warning(f"Local search unavailable ({e}); searching through the ACF server")
+            self.stats["fallbacks"] += 1
+            return None
+        try:
+            # One match past the limit tells us whether results were truncated
+            matches = await asyncio.wait_for(self._collect(process, root, max_results + 1), timeout)
+        except BaseException as e:
+            self._stop(process)
+            await process.wait()
+            if isinstance(e, asyncio.TimeoutError):
+                return {"success": False, "message": "Search timeout exceeded"}
+            raise
+        truncated = len(matches) > max_results
+        if truncated:
+            self._stop(process)
+            self.stats["early_stops"] += 1
+        await process.wait()
+        if not truncated and process.returncode not in (0, 1):
+            return {"success": False, "message": f"ripgrep exited with code {process.returncode}"}
+        matches = matches[:max_results]
+        elapsed = time.perf_counter() - started
+        self.stats["searches"] += 1
+        self.stats["seconds"] += elapsed
+
+        if matches:
+            content = f"Found {len(matches)}{'+' if truncated else ''} matches for pattern \"{pattern}\":\n\n"
+            content += "".join(f"{m['relativePath']}:{m['lineNumber']}: {m['line']}\n" for m in matches)
+            if truncated:
+                content += "\n... more matches (truncated)"
+        else:
+            content = f"No matches found for pattern \"{pattern}\" in {root}"
+        return {
+            "success": True,
+            "content": content,
+            "searchPath": str(root),
+            "pattern": search_pattern,
+            "filePattern": file_pattern,
+            "matchCount": len(matches),
+            "matches": matches,
+            "truncated": truncated,
+            "usingRipgrep": True,
+            "ripgrepPath": self.rg_path,
+            "backend": "local",
+            "elapsedMs": round(elapsed * 1000, 2),
+        }
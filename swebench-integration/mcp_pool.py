@@ -0,0 +1,269 @@
+"""
+Connection Pool for ACF MCP Sessions
+
+The ACF server handles the requests of one connection serially and keeps
+session state (such as the active workspace) per connection. This module
+keeps a bounded pool of client connections so concurrent solves can each
+check out their own session instead of queueing behind a single socket.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from loguru import logger
+
+
+class MCPConnectionPool:
+    """Bounded pool of ACF MCP client connections
+
+    Clients are created through ``factory`` (a zero-argument callable that
+    returns an unconnected ``ACFMCPClient``), checked for liveness before
+    reuse, pinged periodically while idle and reaped after sitting idle for
+    ``idle_timeout`` seconds, never dropping below ``min_size`` connections.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 4,
+        idle_timeout: float = 300,
+        health_check_interval: float = 30,
+    ):
+        self.factory = factory
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+        self._condition: Optional[asyncio.Condition] = None
+        self._reaper_task: Optional[asyncio.Task] = None
+
+        # Utilization counters
+        self._peak_in_use = 0
+        self._checkouts = 0
+        self._wait_time = 0.0
+        self._created = 0
+        self._discarded = 0
+        self._busy_time = 0.0
+        self._started_at = time.monotonic()
+        self._retired_client_stats: Dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, factory: Callable[[], Any], acf_config: Dict) -> "MCPConnectionPool":
+        """Build a pool from the ``acf_mcp.pool`` section of config.yaml"""
+        pool_config = acf_config.get('pool', {})
+        return cls(
+            factory,
+            min_size=pool_config.get('min_size', 1),
+            max_size=pool_config.get('max_size', 4),
+            idle_timeout=pool_config.get('idle_timeout', 300),
+            health_check_interval=pool_config.get('health_check_interval', 30),
+        )
+
+    async def start(self) -> bool:
+        """Open ``min_size`` connections and start the background reaper"""
+        self._condition = asyncio.Condition()
+        self._started_at = time.monotonic()
+        try:
+            for _ in range(self.min_size):
+                self._size += 1
+                client = await self._create()
+                self._idle.append((client, time.monotonic()))
+        except ConnectionError as e:
+            self._size -= 1
+            logger.error(f"Failed to warm up MCP connection pool: {e}")
+            await self.close()
+            return False
+
+        self._reaper_task = asyncio.create_task(self._reap_loop())
+        logger.info(f"MCP connection pool ready (min={self.min_size}, max={self.max_size})")
+        return True
+
+    async def _create(self):
+        """Create and connect a new client in a slot already counted in the pool size"""
+        client = self.factory()
+        if not await client.connect():
+            raise ConnectionError(f"Could not connect to {client.ws_url}")
+        self._created += 1
+        return client
+
+    async def _discard(self, client):
+        """Close a client and free its slot"""
+        self._size -= 1
+        self._discarded += 1
+        for key, value in getattr(client, 'stats', {}).items():
+            self._retired_client_stats[key] = self._retired_client_stats.get(key, 0) + value
+        try:
+            await client.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled MCP connection: {e}")
+
+    async def _is_healthy(self, client) -> bool:
+        """Check that a pooled client is still usable"""
+        if not client.is_connected:
+            return False
+        return await client.ping()
+
+    async def acquire(self):
+        """Check a client out of the pool, waiting while all are busy"""
+        if self._closed:
+            raise RuntimeError("MCP connection pool is closed")
+
+        started = time.monotonic()
+        client = None
+        async with self._condition:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._idle:
+                        client, _ = self._idle.pop()
+                        if client.is_connected:
+                            break
+                        await self._discard(client)
+                        client = None
+                        continue
+                    if self._size < self.max_size:
+                        # Reserve the slot now, connect outside the lock
+                        self._size += 1
+                        break
+                    await self._condition.wait()
+            finally:
+                self._waiting -= 1
+
+            self._in_use += 1
+            self._checkouts += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+
+        if client is None:
+            try:
+                client = await self._create()
+            except BaseException:
+                async with self._condition:
+                    self._size -= 1
+                    self._in_use -= 1
+                    self._condition.notify()
+                raise
+
+        self._wait_time += time.monotonic() - started
+        client._pool_checkout_at = time.monotonic()
+        return client
+
+    async def release(self, client):
+        """Return a client to the pool, discarding it if the connection died"""
+        async with self._condition:
+            self._in_use -= 1
+            self._busy_time += time.monotonic() - getattr(client, '_pool_checkout_at', time.monotonic())
+            if self._closed or not client.is_connected:
+                await self._discard(client)
+            else:
+                self._idle.append((client, time.monotonic()))
+            self._condition.notify()
+
+    @asynccontextmanager
+    async def connection(self):
+        """Context manager that checks a client out for the duration of a block"""
+        client = await self.acquire()
+        try:
+            yield client
+        finally:
+            await self.release(client)
+
+    async def call_tool(self, tool_name: str, params: Dict) -> Dict:
+        """Run a single stateless tool call on any available connection"""
+        async with self.connection() as client:
+            return await client.call_tool(tool_name, params)
+
+    async def _reap_loop(self):
+        """Periodically health-check idle clients and close stale ones"""
+        while not self._closed:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self._reap()
+            except Exception as e:
+                logger.warning(f"MCP pool maintenance failed: {e}")
+
+    async def _reap(self):
+        """Close expired or unhealthy idle clients, then refill to ``min_size``"""
+        now = time.monotonic()
+        async with self._condition:
+            candidates = list(self._idle)
+            self._idle.clear()
+
+        keep = []
+        for client, last_used in candidates:
+            expired = now - last_used > self.idle_timeout
+            if expired and self._size > self.min_size:
+                logger.debug("Reaping idle MCP connection")
+                await self._discard(client)
+            elif not await self._is_healthy(client):
+                logger.warning("Dropping unhealthy MCP connection")
+                await self._discard(client)
+            else:
+                keep.append((client, last_used))
+
+        async with self._condition:
+            # Preserve most-recently-used ordering; checkouts pop from the right
+            self._idle.extendleft(reversed(keep))
+            self._condition.notify_all()
+
+        # Top the pool back up to its floor
+        while not self._closed and self._size < self.min_size:
+            self._size += 1
+            try:
+                client = await self._create()
+            except ConnectionError as e:
+                self._size -= 1
+                logger.warning(f"Could not replenish MCP connection pool: {e}")
+                break
+            async with self._condition:
+                self._idle.append((client, time.monotonic()))
+                self._condition.notify()
+
+    def client_stats(self) -> Dict[str, int]:
+        """Sum the call/timeout/retry counters of every client the pool has held"""
+        totals = dict(self._retired_client_stats)
+        for client, _ in self._idle:
+            for key, value in getattr(client, 'stats', {}).items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def stats(self) -> Dict[str, Any]:
+        """Report pool size and utilization"""
+        elapsed = max(time.monotonic() - self._started_at, 1e-9)
+        return {
+            "size": self._size,
+            "in_use": self._in_use,
+            "idle": len(self._idle),
+            "waiting": self._waiting,
+            "max_size": self.max_size,
+            "peak_in_use": self._peak_in_use,
+            "checkouts": self._checkouts,
+            "created": self._created,
+            "discarded": self._discarded,
+            "avg_wait_seconds": self._wait_time / self._checkouts if self._checkouts else 0.0,
+            "utilization": self._busy_time / (elapsed * self.max_size),
+        }
+
+    async def close(self):
+        """Close every pooled connection and stop the reaper"""
+        self._closed = True
+        if self._reaper_task:
+            self._reaper_task.cancel()
+            try:
+                await self._reaper_task
+            except asyncio.CancelledError:
+                pass
+            self._reaper_task = None
+
+        while self._idle:
+            client, _ = self._idle.pop()
+            await self._discard(client)
@@ -0,0 +1,310 @@
+"""
+Latency Instrumentation for SWE-bench Evaluations
+
+Records where an evaluation spends its time: every ACF tool call (latency,
+bytes on the wire, errors), every ``solve_instance`` phase and every
+instance end to end. Latencies go into fixed log-spaced histograms, so
+p50/p95/p99 are available at any point of a long run in constant memory.
+Snapshots are exported as JSON, CSV and Prometheus text, and a live
+Prometheus endpoint can be served while the run is in progress.
+"""
+
+import asyncio
+import bisect
+import csv
+import json
+import math
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+
+# 1ms .. ~1h in steps of 2**0.25 (~19%), so quantiles are within a few percent
+BUCKET_BOUNDS = tuple(0.001 * 2 ** (i / 4) for i in range(88))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram with count, sum, min and max"""
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating inside its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = BUCKET_BOUNDS[index - 1] if index else 0.0
+                upper = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+                estimate = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(max(estimate, self.min), self.max)
+            seen += bucket_count
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            **{f"p{int(q * 100)}": self.quantile(q) for q in QUANTILES},
+        }
+
+
+class ToolStats:
+    """Latency histogram and I/O counters for one tool"""
+
+    __slots__ = ("latency", "bytes_sent", "bytes_received", "errors", "cache_hits")
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.errors = 0
+        self.cache_hits = 0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            **self.latency.summary(),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+        }
+
+
+class InstanceTimer:
+    """Phase timings of one instance, fed into the recorder's histograms"""
+
+    def __init__(self, recorder: "MetricsRecorder", instance_id: str):
+        self.recorder = recorder
+        self.instance_id = instance_id
+        self.phases: Dict[str, float] = {}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            self.recorder.phase_latency(name).observe(elapsed)
+
+    def finish(self, error: bool = False):
+        """Record the instance's end-to-end time and phase breakdown"""
+        self.recorder.finish_instance(self, time.perf_counter() - self.started, error)
+
+
+class MetricsRecorder:
+    """Collects tool, phase and instance latencies for one evaluation run"""
+
+    def __init__(
+        self,
+        export_path: str = "./metrics",
+        formats: Iterable[str] = ("json", "csv", "prometheus"),
+        prometheus_port: Optional[int] = None,
+        prometheus_host: str = "127.0.0.1",
+    ):
+        self.export_path = Path(export_path)
+        self.formats = tuple(formats)
+        self.prometheus_port = prometheus_port
+        self.prometheus_host = prometheus_host
+        self.tools: Dict[str, ToolStats] = {}
+        self.phases: Dict[str, LatencyHistogram] = {}
+        self.instance_latency = LatencyHistogram()
+        self.instances: List[Dict[str, Any]] = []
+        self.started = time.time()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @classmethod
+    def from_config(cls, settings: Dict) -> Optional["MetricsRecorder"]:
+        """Create a recorder from logging.metrics, or None when metrics are disabled"""
+        metrics = settings.get('logging', {}).get('metrics', {})
+        if not metrics.get('enabled', False):
+            return None
+        return cls(
+            export_path=metrics.get('export_path', './metrics'),
+            formats=metrics.get('formats', ['json', 'csv', 'prometheus']),
+            prometheus_port=metrics.get('prometheus_port'),
+            prometheus_host=metrics.get('prometheus_host', '127.0.0.1'),
+        )
+
+    # -- recording ------------------------------------------------------------
+
+    def record_tool(
+        self,
+        tool_name: str,
+        seconds: float,
+        bytes_sent: int = 0,
+        bytes_received: int = 0,
+        error: bool = False,
+    ):
+        stats = self.tools.get(tool_name)
+        if stats is None:
+            stats = self.tools[tool_name] = ToolStats()
+        stats.latency.observe(seconds)
+        stats.bytes_sent += bytes_sent
+        stats.bytes_received += bytes_received
+        stats.errors += error
+
+    def record_cache_hit(self, tool_name: str):
+        stats = self.tools.get(tool_name)
+        if stats is None:
+            stats = self.tools[tool_name] = ToolStats()
+        stats.cache_hits += 1
+
+    def phase_latency(self, name: str) -> LatencyHistogram:
+        histogram = self.phases.get(name)
+        if histogram is None:
+            histogram = self.phases[name] = LatencyHistogram()
+        return histogram
+
+    def instance(self, instance_id: str) -> InstanceTimer:
+        """Start timing one instance"""
+        return InstanceTimer(self, instance_id)
+
+    def finish_instance(self, timer: InstanceTimer, seconds: float, error: bool = False):
+        self.instance_latency.observe(seconds)
+        self.instances.append({
+            "instance_id": timer.instance_id,
+            "total": seconds,
+            "error": error,
+            **timer.phases,
+        })
+
+    # -- export ---------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "started_at": self.started,
+            "elapsed_seconds": time.time() - self.started,
+            "instances": self.instance_latency.summary(),
+            "phases": {name: histogram.summary() for name, histogram in sorted(self.phases.items())},
+            "tools": {name: stats.summary() for name, stats in sorted(self.tools.items())},
+        }
+
+    def prometheus_text(self) -> str:
+        """Render the current metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+
+        def histogram(name: str, help_text: str, series: Dict[str, LatencyHistogram], label: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for value, hist in series.items():
+                labels = f'{label}="{value}",' if label else ""
+                cumulative = 0
+                # Every bucket, every scrape: series that come and go break
+                # rate() and histogram_quantile() across scrapes
+                for bound, bucket_count in zip(BUCKET_BOUNDS, hist.counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{{{labels}le="{bound:.6g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {hist.count}')
+                series_labels = f"{{{labels.rstrip(',')}}}" if labels else ""
+                lines.append(f"{name}_sum{series_labels} {hist.total:.6f}")
+                lines.append(f"{name}_count{series_labels} {hist.count}")
+
+        def counter(name: str, help_text: str, attribute: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for tool_name, stats in sorted(self.tools.items()):
+                lines.append(f'{name}{{tool="{tool_name}"}} {getattr(stats, attribute)}')
+
+        histogram("acf_tool_call_seconds", "ACF tool call latency",
+                  {name: stats.latency for name, stats in sorted(self.tools.items())}, "tool")
+        counter("acf_tool_bytes_sent_total", "Request bytes sent per tool", "bytes_sent")
+        counter("acf_tool_bytes_received_total", "Response bytes received per tool", "bytes_received")
+        counter("acf_tool_errors_total", "Failed tool calls", "errors")
+        counter("acf_tool_cache_hits_total", "Tool calls answered from the local cache", "cache_hits")
+        histogram("swebench_phase_seconds", "Time spent per solve phase", dict(sorted(self.phases.items())), "phase")
+        histogram("swebench_instance_seconds", "End-to-end time per instance", {"": self.instance_latency}, "")
+        return "\n".join(lines) + "\n"
+
+    def _write_csv(self, path: Path):
+        phases = sorted(self.phases)
+        with open(path / "instance_latency.csv", 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=["instance_id", "total", "error", *phases], restval=0.0)
+            writer.writeheader()
+            writer.writerows(self.instances)
+
+        columns = ["count", "sum", "mean", "min", "max", "p50", "p95", "p99"]
+        with open(path / "tool_latency.csv", 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["tool", *columns, "bytes_sent", "bytes_received", "errors", "cache_hits"])
+            for name, stats in sorted(self.tools.items()):
+                summary = stats.summary()
+                writer.writerow([name, *(summary[column] for column in columns),
+                                 stats.bytes_sent, stats.bytes_received, stats.errors, stats.cache_hits])
+
+        with open(path / "phase_latency.csv", 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["phase", *columns])
+            for name, histogram in sorted(self.phases.items()):
+                summary = histogram.summary()
+                writer.writerow([name, *(summary[column] for column in columns)])
+
+    def export(self, path: Optional[Path] = None) -> Path:
+        """Write the configured formats into ``path`` (default: export_path)"""
+        path = Path(path or self.export_path)
+        path.mkdir(parents=True, exist_ok=True)
+        if "json" in self.formats:
+            (path / "latency.json").write_text(json.dumps(self.snapshot(), indent=2))
+        if "csv" in self.formats:
+            self._write_csv(path)
+        if "prometheus" in self.formats:
+            (path / "metrics.prom").write_text(self.prometheus_text())
+        return path
+
+    # -- live endpoint --------------------------------------------------------
+
+    async def _handle_scrape(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            body = self.prometheus_text().encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                b"Connection: close\r\n\r\n" + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        """Serve live Prometheus metrics on ``prometheus_port`` (if configured)"""
+        if self.prometheus_port is None or self._server is not None:
+            return
+        self._server = await asyncio.start_server(self._handle_scrape, self.prometheus_host, self.prometheus_port)
+        logger.info(f"Serving live metrics on http://{self.prometheus_host}:{self.prometheus_port}/metrics")
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
@@ -0,0 +1,123 @@
+"""
+Streaming Patch Builder for Instance Results
+
+Builds an instance's unified diff without holding the files it touches:
+for a local git workspace the diff comes from ``git diff`` against the
+base commit, and otherwise each file's hunks are produced as soon as it is
+edited. Either way the patch is spooled (in memory up to a bound, then in a
+temporary file) and streamed into the results journal in chunks, so the
+memory an instance needs for its patch does not grow with file or patch
+size.
+"""
+
+import asyncio
+import codecs
+import difflib
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from loguru import logger
+
+
+class PatchBuilder:
+    """Unified diff of the files an instance edited
+
+    Call ``add`` after every edit and ``finish`` once all edits are done.
+    The result can be streamed with ``chunks``; ``files`` lists the
+    repo-relative paths it touches.
+    """
+
+    def __init__(self, workspace: str = "", spool_bytes: int = 1024 * 1024):
+        self.workspace = workspace
+        # With a local git checkout the diff is taken from git at the end,
+        # so file contents never need to be kept around
+        self.local = bool(workspace) and (Path(workspace) / ".git").exists()
+        self.files: List[str] = []
+        self._spool = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+
+    @classmethod
+    def from_config(cls, workspace: str, settings: Dict) -> "PatchBuilder":
+        """Create a builder with swebench.evaluation.patch_spool_kb"""
+        evaluation = settings.get('swebench', {}).get('evaluation', {})
+        return cls(workspace, spool_bytes=evaluation.get('patch_spool_kb', 1024) * 1024)
+
+    def _relative(self, path: str) -> str:
+        if self.workspace and os.path.isabs(path):
+            return os.path.relpath(path, self.workspace)
+        return path
+
+    def add(self, path: str, original: Optional[str] = None, modified: Optional[str] = None):
+        """Record an edited file; without git, diff it right away"""
+        relative = self._relative(path)
+        if relative not in self.files:
+            self.files.append(relative)
+        if self.local or original is None or modified is None:
+            return
+        self._spool.seek(0, os.SEEK_END)
+        for line in difflib.unified_diff(
+            original.splitlines(keepends=True),
+            modified.splitlines(keepends=True),
+            fromfile=f"a/{relative}",
+            tofile=f"b/{relative}",
+        ):
+            self._spool.write(line.encode('utf-8'))
+
+    async def _git(self, *args: str, output=None) -> int:
+        process = await asyncio.create_subprocess_exec(
+            "git", *args,
+            cwd=self.workspace,
+            stdout=asyncio.subprocess.PIPE if output else asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        if output:
+            while True:
+                chunk = await process.stdout.read(64 * 1024)
+                if not chunk:
+                    break
+                output.write(chunk)
+        return await process.wait()
+
+    async def finish(self) -> "PatchBuilder":
+        """Stream ``git diff`` of the edited files into the spool (local workspaces)"""
+        if not self.local or not self.files:
+            return self
+        # Intent-to-add makes files the instance created show up as new files
+        existing = [path for path in self.files if (Path(self.workspace) / path).exists()]
+        if existing:
+            await self._git("add", "--intent-to-add", "--", *existing)
+        self._spool.seek(0, os.SEEK_END)
+        returncode = await self._git(
+            "diff", "--no-color", "--no-ext-diff", "HEAD", "--", *self.files, output=self._spool
+        )
+        if returncode != 0:
+            logger.error(f"git diff failed in {self.workspace} (exit {returncode}); patch may be incomplete")
+        return self
+
+    @property
+    def size(self) -> int:
+        """Patch size in bytes"""
+        return self._spool.seek(0, os.SEEK_END)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def chunks(self, size: int = 64 * 1024) -> Iterator[str]:
+        """Stream the patch as text"""
+        self._spool.seek(0)
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        while True:
+            data = self._spool.read(size)
+            text = decoder.decode(data, final=not data)
+            if text:
+                yield text
+            if not data:
+                break
+
+    def read(self) -> str:
+        """The whole patch as one string (for small, single-instance use)"""
+        return "".join(self.chunks())
+
+    def close(self):
+        self._spool.close()
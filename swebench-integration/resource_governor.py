@@ -0,0 +1,447 @@
+"""
+Local Resource Governor for Instance Commands
+
+Test suites run through ``execute_command`` are arbitrary code: one that
+leaks memory or forks a pool can push the host into swap and slow every
+other worker. When workspaces are local, the governor runs those commands
+itself, in their own session, under limits taken from config.yaml:
+
+* memory (``swebench.docker.memory_limit``): a cgroup v2 ``memory.max``
+  when a delegated cgroup root is configured, otherwise the RSS of the
+  whole process tree is polled and the tree killed once it exceeds the
+  limit;
+* CPU (``swebench.docker.cpu_limit`` cores): ``cpu.max`` with cgroups,
+  otherwise an ``RLIMIT_CPU`` of cores x wall-clock timeout;
+* wall clock (``swebench.docker.timeout_seconds``, or the call's
+  ``timeout_ms`` if shorter) and open files
+  (``optimization.resources.max_open_files``).
+
+It also admits new instances only while the host has memory headroom for
+one more command, and reports peak RSS and CPU time per instance.
+"""
+
+import asyncio
+import math
+import os
+import re
+import signal
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+# Joins the command's cgroup and sets its rlimits, then execs the command.
+# A preexec_fn would do this between fork and exec, which is unsafe in a
+# process with threads (the event loop's executors, sqlite, websockets).
+# Arguments: cgroup.procs path or "", max open files, CPU seconds (0: no
+# limit), then the command's argv.
+_LIMITS_WRAPPER = """
+import os, resource, sys
+procs, max_open_files, cpu_seconds = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+if procs:
+    with open(procs, "w") as f:
+        f.write(str(os.getpid()))
+if max_open_files:
+    hard = resource.getrlimit(resource.RLIMIT_NOFILE)[1]
+    limit = max_open_files if hard == resource.RLIM_INFINITY else min(max_open_files, hard)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+if cpu_seconds:
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 5))
+resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+os.execvp(sys.argv[4], sys.argv[4:])
+"""
+
+
+def parse_size_mb(value) -> Optional[int]:
+    """``"4g"``, ``"512m"``, ``"2048"`` (MB) -> megabytes"""
+    if value is None:
+        return None
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([kmgt]?)b?\s*', str(value).lower())
+    if not match:
+        raise ValueError(f"Invalid memory size: {value!r}")
+    number, unit = float(match.group(1)), match.group(2) or 'm'
+    return int(number * {'k': 1 / 1024, 'm': 1, 'g': 1024, 't': 1024 ** 2}[unit])
+
+
+def _proc_stats() -> Iterator[Tuple[int, int, int, int]]:
+    """(pid, session, rss bytes, cpu ticks incl. reaped children) of every process"""
+    for entry in os.scandir('/proc'):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry.name}/stat', 'rb') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        fields = stat[stat.rfind(b')') + 2:].split()
+        # Fields from state (3rd in proc(5)): session is 6th, utime..cstime 14th-17th, rss 24th
+        yield (
+            int(entry.name),
+            int(fields[3]),
+            int(fields[21]) * _PAGE_SIZE,
+            sum(int(field) for field in fields[11:15]),
+        )
+
+
+def mem_available_mb() -> Optional[int]:
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+
+class _Tree:
+    """Resource usage of the processes in one command's session"""
+
+    def __init__(self, session: int):
+        self.session = session
+        self.pids: List[int] = []
+        self.rss = 0
+        self.peak_rss = 0
+        self.cpu_seconds = 0.0
+
+    def sample(self, processes: List[Tuple[int, int, int, int]]):
+        pids, rss, ticks = [], 0, 0
+        for pid, session, pid_rss, pid_ticks in processes:
+            if session == self.session:
+                pids.append(pid)
+                rss += pid_rss
+                ticks += pid_ticks
+        self.pids = pids
+        self.rss = rss
+        self.peak_rss = max(self.peak_rss, rss)
+        # Exited children move into their parent's cutime/cstime, so the sum
+        # only drops when the session leader itself exits
+        self.cpu_seconds = max(self.cpu_seconds, ticks / _CLOCK_TICKS)
+
+    def kill(self):
+        for pid in [self.session] + self.pids:
+            try:
+                os.killpg(pid, signal.SIGKILL) if pid == self.session else os.kill(pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+
+class ResourceGovernor:
+    """Run ``execute_command`` locally under per-command limits
+
+    Attach to ``ACFMCPClient``; commands for workspaces that are not on
+    this machine (and ``waitForCompletion: false`` sessions) are left to
+    the server. Usage is accumulated per workspace until ``pop_usage``.
+    """
+
+    def __init__(
+        self,
+        memory_limit_mb: Optional[int] = 4096,
+        cpu_limit: Optional[float] = 2,
+        timeout_seconds: float = 600,
+        max_open_files: Optional[int] = 1000,
+        max_memory_mb: Optional[int] = None,
+        cgroup_root: Optional[str] = None,
+        poll_interval: float = 0.2,
+        admission_timeout: float = 600,
+        shell: str = "/bin/sh",
+    ):
+        self.memory_limit_mb = memory_limit_mb
+        self.cpu_limit = cpu_limit
+        self.timeout_seconds = timeout_seconds
+        self.max_open_files = max_open_files
+        self.max_memory_mb = max_memory_mb
+        self.cgroup_root = Path(cgroup_root) if cgroup_root else None
+        self.poll_interval = poll_interval
+        self.admission_timeout = admission_timeout
+        self.shell = shell
+        self.usage: Dict[str, Dict] = {}
+        self.stats = {
+            "commands": 0, "killed_memory": 0, "killed_timeout": 0, "killed_cpu": 0, "peak_rss_mb": 0.0,
+            "cpu_seconds": 0.0, "admission_waits": 0, "admission_wait_seconds": 0.0,
+        }
+        self._running: Dict[int, _Tree] = {}
+        self._processes: Tuple[float, List[Tuple[int, int, int, int]]] = (0.0, [])
+        self._admitted = 0
+        self._admission: Optional[asyncio.Condition] = None
+        if self.cgroup_root is not None and not self._cgroup_usable():
+            logger.warning(f"cgroup root {self.cgroup_root} is not a writable cgroup v2 directory; using rlimits")
+            self.cgroup_root = None
+
+    @classmethod
+    def from_config(cls, settings: Dict) -> Optional["ResourceGovernor"]:
+        """Create a governor when optimization.resources.governor is enabled (Linux only)"""
+        resources = settings.get('optimization', {}).get('resources', {})
+        governor = resources.get('governor', {})
+        if not governor.get('enabled', False):
+            return None
+        if not sys.platform.startswith('linux'):
+            logger.warning("The resource governor needs /proc; running commands through the ACF server")
+            return None
+        docker = settings.get('swebench', {}).get('docker', {})
+        return cls(
+            memory_limit_mb=parse_size_mb(docker.get('memory_limit')),
+            cpu_limit=docker.get('cpu_limit'),
+            timeout_seconds=docker.get('timeout_seconds', 600),
+            max_open_files=resources.get('max_open_files'),
+            max_memory_mb=resources.get('max_memory_mb'),
+            cgroup_root=governor.get('cgroup_root'),
+            poll_interval=governor.get('poll_interval', 0.2),
+            admission_timeout=governor.get('admission_timeout', 600),
+        )
+
+    # Admission control
+
+    def _headroom(self) -> bool:
+        needed = self.memory_limit_mb or 0
+        available = mem_available_mb()
+        if available is not None and available < needed:
+            return False
+        if self.max_memory_mb:
+            governed = sum(tree.rss for tree in self._running.values()) / (1024 * 1024)
+            return governed + needed <= self.max_memory_mb
+        return True
+
+    @asynccontextmanager
+    async def admission(self):
+        """Hold an instance back until there is memory headroom for it
+
+        An instance is always admitted when none is running, and waiting is
+        bounded by ``admission_timeout`` so a misjudged host cannot stall
+        the run.
+        """
+        if self._admission is None:
+            self._admission = asyncio.Condition()
+        started = time.monotonic()
+        async with self._admission:
+            if self._admitted and not self._headroom():
+                self.stats["admission_waits"] += 1
+                while self._admitted and not self._headroom():
+                    if time.monotonic() - started > self.admission_timeout:
+                        logger.warning("Admitting instance without memory headroom after waiting "
+                                       f"{self.admission_timeout}s")
+                        break
+                    try:
+                        # Re-check on release, and periodically as memory frees up
+                        await asyncio.wait_for(self._admission.wait(), 1.0)
+                    except asyncio.TimeoutError:
+                        pass
+                self.stats["admission_wait_seconds"] += time.monotonic() - started
+            self._admitted += 1
+        try:
+            yield
+        finally:
+            async with self._admission:
+                self._admitted -= 1
+                self._admission.notify_all()
+
+    # cgroup v2
+
+    def _cgroup_usable(self) -> bool:
+        return (
+            (self.cgroup_root / "cgroup.controllers").exists()
+            and os.access(self.cgroup_root, os.W_OK)
+        )
+
+    def _make_cgroup(self) -> Optional[Path]:
+        cgroup = self.cgroup_root / f"acf-{uuid.uuid4().hex[:12]}"
+        try:
+            cgroup.mkdir()
+            if self.memory_limit_mb:
+                (cgroup / "memory.max").write_text(str(self.memory_limit_mb * 1024 * 1024))
+                # Without this an over-limit suite swaps instead of being killed
+                if (cgroup / "memory.swap.max").exists():
+                    (cgroup / "memory.swap.max").write_text("0")
+            if self.cpu_limit:
+                (cgroup / "cpu.max").write_text(f"{int(self.cpu_limit * 100000)} 100000")
+        except OSError as e:
+            logger.warning(f"Could not set up cgroup {cgroup}: {e}; using rlimits")
+            self._remove_cgroup(cgroup)
+            return None
+        return cgroup
+
+    @staticmethod
+    def _cgroup_usage(cgroup: Path) -> Tuple[Optional[int], Optional[float], bool]:
+        """Peak memory bytes, CPU seconds and whether the OOM killer fired"""
+        peak = cpu = None
+        oom = False
+        try:
+            peak = int((cgroup / "memory.peak").read_text())
+        except (OSError, ValueError):
+            pass
+        try:
+            for line in (cgroup / "cpu.stat").read_text().splitlines():
+                if line.startswith("usage_usec"):
+                    cpu = int(line.split()[1]) / 1e6
+            for line in (cgroup / "memory.events").read_text().splitlines():
+                if line.startswith("oom_kill"):
+                    oom = int(line.split()[1]) > 0
+        except (OSError, ValueError):
+            pass
+        return peak, cpu, oom
+
+    @staticmethod
+    def _kill_cgroup(cgroup: Path):
+        try:
+            (cgroup / "cgroup.kill").write_text("1")
+        except OSError:
+            pass
+
+    @classmethod
+    def _remove_cgroup(cls, cgroup: Path):
+        cls._kill_cgroup(cgroup)
+        try:
+            cgroup.rmdir()
+        except OSError:
+            pass
+
+    # Execution
+
+    def _sample(self, tree: _Tree):
+        """Sample a tree from a /proc scan shared by concurrent commands"""
+        taken, processes = self._processes
+        now = time.monotonic()
+        if now - taken > self.poll_interval / 2:
+            processes = list(_proc_stats())
+            self._processes = (now, processes)
+        tree.sample(processes)
+
+    def _argv(self, command: str, timeout: float, cgroup: Optional[Path]) -> List[str]:
+        """Command line that runs ``command`` through the limits wrapper
+
+        The wrapper execs the shell in place, so the limits and the cgroup
+        apply before the command starts and the pid stays the same.
+        """
+        cpu_seconds = math.ceil(timeout * self.cpu_limit) if self.cpu_limit and cgroup is None else 0
+        return [
+            sys.executable, "-S", "-c", _LIMITS_WRAPPER,
+            str(cgroup / "cgroup.procs") if cgroup is not None else "",
+            str(self.max_open_files or 0),
+            str(cpu_seconds),
+            self.shell, "-c", command,
+        ]
+
+    async def execute(self, params: Dict, workspace: str) -> Optional[Dict]:
+        """Run an ``execute_command`` call locally, or None to leave it to the server
+
+        Returns the fields ACF's ``executeCommand`` returns, plus
+        ``resources``: peak RSS, CPU and wall-clock seconds, and the limit
+        that killed the command, if any.
+        """
+        if not workspace or not os.path.isdir(workspace) or params.get('waitForCompletion') is False:
+            return None
+        command = params['command']
+        timeout = self.timeout_seconds
+        if params.get('timeout_ms'):
+            timeout = min(params['timeout_ms'] / 1000, timeout)
+        cgroup = self._make_cgroup() if self.cgroup_root is not None else None
+
+        started = time.monotonic()
+        process = await asyncio.create_subprocess_exec(
+            *self._argv(command, timeout, cgroup),
+            cwd=workspace,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+        tree = _Tree(process.pid)
+        self._running[process.pid] = tree
+        output = asyncio.ensure_future(process.communicate())
+        killed = None
+        try:
+            while not output.done():
+                self._sample(tree)
+                if cgroup is None and self.memory_limit_mb and tree.rss > self.memory_limit_mb * 1024 * 1024:
+                    killed = "memory"
+                elif time.monotonic() - started > timeout:
+                    killed = "timeout"
+                if killed:
+                    tree.kill()
+                    if cgroup is not None:
+                        self._kill_cgroup(cgroup)
+                    break
+                await asyncio.wait([output], timeout=self.poll_interval)
+            try:
+                # A killed tree's pipes close at once, unless something
+                # outside its session still holds them
+                stdout, stderr = await asyncio.wait_for(asyncio.shield(output), 5 if killed else None)
+            except asyncio.TimeoutError:
+                stdout, stderr = b"", b""
+        finally:
+            if not output.done():
+                tree.kill()
+                output.cancel()
+            del self._running[process.pid]
+        wall = time.monotonic() - started
+
+        peak_rss, cpu_seconds = tree.peak_rss, tree.cpu_seconds
+        if cgroup is not None:
+            cgroup_peak, cgroup_cpu, oom = self._cgroup_usage(cgroup)
+            peak_rss = cgroup_peak or peak_rss
+            cpu_seconds = cgroup_cpu if cgroup_cpu is not None else cpu_seconds
+            if oom and not killed:
+                killed = "memory"
+            self._remove_cgroup(cgroup)
+        if process.returncode == -signal.SIGXCPU and not killed:
+            killed = "cpu"
+        usage = {
+            "peak_rss_mb": round(peak_rss / (1024 * 1024), 1),
+            "cpu_seconds": round(cpu_seconds, 2),
+            "wall_seconds": round(wall, 2),
+            "killed": killed,
+        }
+        self._record(workspace, usage)
+
+        stdout = stdout.decode('utf-8', errors='replace')
+        stderr = stderr.decode('utf-8', errors='replace')
+        success = process.returncode == 0 and not killed
+        if killed == "timeout":
+            message = f"Command timed out after {int(timeout * 1000)}ms"
+        elif killed == "memory":
+            message = f"Command killed: memory limit of {self.memory_limit_mb} MB exceeded"
+        elif killed == "cpu":
+            message = "Command killed: CPU time limit exceeded"
+        else:
+            message = ("Command completed successfully" if success
+                       else f"Command failed with exit code {process.returncode}")
+        if killed:
+            logger.warning(f"{message} in {workspace}: {command[:200]}")
+        return {
+            "success": success,
+            "content": stdout or stderr or message,
+            "command": command,
+            "shell": self.shell,
+            "exitCode": process.returncode,
+            "stdout": stdout,
+            "stderr": stderr,
+            "message": message,
+            "resources": usage,
+        }
+
+    def _record(self, workspace: str, usage: Dict):
+        self.stats["commands"] += 1
+        self.stats["cpu_seconds"] += usage["cpu_seconds"]
+        self.stats["peak_rss_mb"] = max(self.stats["peak_rss_mb"], usage["peak_rss_mb"])
+        if usage["killed"]:
+            self.stats[f"killed_{usage['killed']}"] += 1
+        totals = self.usage.setdefault(workspace, {
+            "commands": 0, "peak_rss_mb": 0.0, "cpu_seconds": 0.0, "wall_seconds": 0.0, "killed": [],
+        })
+        totals["commands"] += 1
+        totals["peak_rss_mb"] = max(totals["peak_rss_mb"], usage["peak_rss_mb"])
+        totals["cpu_seconds"] = round(totals["cpu_seconds"] + usage["cpu_seconds"], 2)
+        totals["wall_seconds"] = round(totals["wall_seconds"] + usage["wall_seconds"], 2)
+        if usage["killed"]:
+            totals["killed"].append(usage["killed"])
+
+    def pop_usage(self, workspace: str) -> Optional[Dict]:
+        """Usage of the commands run in ``workspace`` since the last call"""
+        return self.usage.pop(workspace, None)
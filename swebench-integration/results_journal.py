@@ -0,0 +1,329 @@
+"""
+Append-only Results Journal for SWE-bench Evaluations
+
+Each instance result is written as one JSON line the moment it completes,
+so a crashed or interrupted run keeps everything finished so far and can be
+resumed by skipping the instance ids already present in the journal.
+
+Journal lines are compact ``ResultRecord`` columns plus the patch. Bulky
+artifacts (analysis, plan, per-test outcomes and output, strategy steps) go
+to a sidecar file next to the journal, referenced by byte offset and read
+back only on request.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from impact_analysis import changed_files_from_patch
+
+
+class ResultRecord:
+    """Compact columns of one instance result
+
+    ``artifacts`` is the ``[offset, length]`` of the instance's sidecar
+    line. ``model_patch`` may be a string or a streamable ``PatchBuilder``.
+    """
+
+    __slots__ = (
+        "instance_id", "model_patch", "error", "tests_pass", "tests_total",
+        "tests_passed", "test_seconds", "files_changed", "artifacts",
+    )
+
+    # Keys of a solve_instance result that are kept as columns; everything
+    # else is an artifact
+    COLUMN_KEYS = ("instance_id", "model_patch", "error")
+
+    def __init__(
+        self,
+        instance_id: str,
+        model_patch: Any = "",
+        error: Optional[str] = None,
+        tests_pass: bool = False,
+        tests_total: int = 0,
+        tests_passed: int = 0,
+        test_seconds: float = 0.0,
+        files_changed: int = 0,
+        artifacts: Optional[List[int]] = None,
+    ):
+        self.instance_id = instance_id
+        self.model_patch = model_patch
+        self.error = error
+        self.tests_pass = tests_pass
+        self.tests_total = tests_total
+        self.tests_passed = tests_passed
+        self.test_seconds = test_seconds
+        self.files_changed = files_changed
+        self.artifacts = artifacts
+
+    @classmethod
+    def split(cls, result: Dict) -> Tuple["ResultRecord", Dict]:
+        """Compact record and bulky artifacts of a solve_instance result"""
+        validation = result.get('validation') or {}
+        outcomes = validation.get('summary') or {}
+        patch = result.get('model_patch') or ""
+        files = getattr(patch, 'files', None)
+        if files is None:
+            files = changed_files_from_patch(patch) if isinstance(patch, str) else []
+        record = cls(
+            instance_id=result.get('instance_id', ''),
+            model_patch=patch,
+            error=result.get('error'),
+            tests_pass=bool(validation.get('tests_pass', False)),
+            tests_total=sum(outcomes.values()),
+            tests_passed=outcomes.get('passed', 0),
+            test_seconds=validation.get('duration', 0.0),
+            files_changed=len(files),
+        )
+        artifacts = {key: value for key, value in result.items() if key not in cls.COLUMN_KEYS}
+        return record, artifacts
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "ResultRecord":
+        """Read a journal line; lines written before records were compact
+        carry the full result and are split on the fly"""
+        if 'tests_pass' not in data:
+            return cls.split(data)[0]
+        return cls(**{key: data[key] for key in cls.__slots__ if key in data})
+
+    def to_json(self) -> Dict[str, Any]:
+        data = {key: getattr(self, key) for key in self.__slots__ if key != "model_patch"}
+        if self.error is None:
+            del data["error"]
+        # The patch goes last so a streamed patch does not split the columns
+        data["model_patch"] = self.model_patch
+        return data
+
+
+class ResultsJournal:
+    """Append-only JSONL journal of instance results
+
+    Lines are flushed on every append and fsynced in batches: after
+    ``fsync_every`` records or ``fsync_interval`` seconds, whichever comes
+    first. A torn final line left by a crash is ignored when reading.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        fsync_every: int = 10,
+        fsync_interval: float = 300,
+        durable: bool = True,
+    ):
+        self.path = Path(path)
+        self.artifacts_path = self.path.with_name(self.path.stem + '.artifacts.jsonl')
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_interval = fsync_interval
+        self.durable = durable
+        self._file = None
+        self._artifacts = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    @classmethod
+    def from_config(cls, path: Path, settings: Dict) -> "ResultsJournal":
+        """Create a journal from the error_handling.recovery section of config.yaml"""
+        recovery = settings.get('error_handling', {}).get('recovery', {})
+        return cls(
+            path,
+            fsync_every=recovery.get('checkpoint_batch_size', 10),
+            fsync_interval=recovery.get('checkpoint_interval', 300),
+            durable=recovery.get('checkpoint_enabled', True),
+        )
+
+    def reset(self):
+        """Start a fresh journal, keeping any previous one as ``<name>.prev``"""
+        self.close()
+        if self.path.exists() and self.path.stat().st_size:
+            previous = self.path.with_name(self.path.name + '.prev')
+            os.replace(self.path, previous)
+            logger.info(f"Moved previous results journal to {previous}")
+            if self.artifacts_path.exists():
+                os.replace(self.artifacts_path, self.artifacts_path.with_name(self.artifacts_path.name + '.prev'))
+
+    @staticmethod
+    def _open_append(path: Path):
+        handle = open(path, 'a+b')
+        handle.seek(0, os.SEEK_END)
+        if handle.tell() > 0:
+            handle.seek(-1, os.SEEK_END)
+            if handle.read(1) != b'\n':
+                handle.write(b'\n')
+        return handle
+
+    def open(self):
+        """Open the journal and its sidecar for appending, repairing torn trailing lines"""
+        if self._file:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self._open_append(self.path)
+        self._artifacts = self._open_append(self.artifacts_path)
+        self._last_sync = time.monotonic()
+
+    def _write_artifacts(self, artifacts: Dict) -> Optional[List[int]]:
+        if not artifacts:
+            return None
+        line = json.dumps(artifacts, default=str).encode('utf-8') + b'\n'
+        offset = self._artifacts.seek(0, os.SEEK_END)
+        self._artifacts.write(line)
+        return [offset, len(line)]
+
+    def append(self, result: Dict):
+        """Append one instance result
+
+        The result is split into a ``ResultRecord`` for the journal and its
+        artifacts for the sidecar. Values with a ``chunks()`` method (such
+        as a ``PatchBuilder``) are streamed into the line as JSON strings
+        rather than materialized.
+        """
+        if not self._file:
+            self.open()
+        record, artifacts = ResultRecord.split(result)
+        record.artifacts = self._write_artifacts(artifacts)
+        # The journal line must not reference sidecar bytes still in a buffer
+        self._artifacts.flush()
+        self._write_line(record.to_json())
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def _write_line(self, result: Dict):
+        streamed = {key: value for key, value in result.items() if callable(getattr(value, 'chunks', None))}
+        if not streamed:
+            self._file.write(json.dumps(result, default=str).encode('utf-8') + b'\n')
+        else:
+            plain = {key: value for key, value in result.items() if key not in streamed}
+            self._file.write(json.dumps(plain, default=str).encode('utf-8')[:-1])
+            separator = b', ' if plain else b''
+            for key, value in streamed.items():
+                self._file.write(separator + json.dumps(key).encode('utf-8') + b': "')
+                for chunk in value.chunks():
+                    self._file.write(json.dumps(chunk)[1:-1].encode('utf-8'))
+                self._file.write(b'"')
+                separator = b', '
+            self._file.write(b'}\n')
+        self._file.flush()
+
+    def sync(self):
+        """Force buffered records to stable storage"""
+        if self._file and self._unsynced:
+            self._artifacts.flush()
+            self._file.flush()
+            if self.durable:
+                # Sidecar first: a synced record always finds its artifacts
+                os.fsync(self._artifacts.fileno())
+                os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def close(self):
+        """Sync and close the journal"""
+        if self._file:
+            self.sync()
+            self._file.close()
+            self._artifacts.close()
+            self._file = None
+            self._artifacts = None
+
+    def _iter_lines(self) -> Iterator[tuple]:
+        """Yield ``(offset, record)`` for every intact line in the journal"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'rb') as f:
+            offset = 0
+            for line in f:
+                start, offset = offset, offset + len(line)
+                if not line.strip():
+                    continue
+                try:
+                    yield start, json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping corrupt journal line at byte {start} in {self.path}")
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Stream the recorded results in completion order"""
+        for _, record in self._iter_lines():
+            yield record
+
+    def records(self) -> Iterator[ResultRecord]:
+        """Stream the recorded results as compact records"""
+        for data in self:
+            yield ResultRecord.from_json(data)
+
+    def artifacts(self, record: ResultRecord) -> Dict:
+        """Read a record's artifacts back from the sidecar"""
+        if not record.artifacts:
+            return {}
+        offset, length = record.artifacts
+        with open(self.artifacts_path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def full_result(self, data: Dict) -> Dict:
+        """A journal line with its artifacts merged back in"""
+        if 'tests_pass' not in data:
+            return data
+        record = ResultRecord.from_json(data)
+        result = {key: getattr(record, key) for key in ResultRecord.COLUMN_KEYS if getattr(record, key) is not None}
+        result.update(self.artifacts(record))
+        return result
+
+    def summary(self) -> Dict[str, int]:
+        """Count processed, failed and validated instances from the compact columns"""
+        total = successful = validated = tests = tests_passed = files_changed = 0
+        for record in self.records():
+            total += 1
+            successful += record.error is None
+            validated += record.tests_pass
+            tests += record.tests_total
+            tests_passed += record.tests_passed
+            files_changed += record.files_changed
+        return {
+            "total": total,
+            "successful": successful,
+            "validated": validated,
+            "tests": tests,
+            "tests_passed": tests_passed,
+            "files_changed": files_changed,
+        }
+
+    def completed_ids(self) -> Set[str]:
+        """Instance ids that already have a result in the journal"""
+        return {record['instance_id'] for record in self if 'instance_id' in record}
+
+    def write_predictions(self, output_file: Path, order: Optional[Iterable[str]] = None) -> int:
+        """Build a predictions JSON array from the journal without loading it
+
+        Only byte offsets are indexed in memory; records are read back one at
+        a time. When ``order`` is given, predictions follow it (e.g. dataset
+        order) and any journaled ids not in it are appended at the end. The
+        latest record wins if an instance was journaled more than once.
+        """
+        self.sync()
+        offsets: Dict[str, int] = {}
+        for offset, record in self._iter_lines():
+            offsets[record.get('instance_id', f'@{offset}')] = offset
+
+        ids = []
+        if order is not None:
+            ids = [instance_id for instance_id in order if instance_id in offsets]
+        seen = set(ids)
+        ids.extend(instance_id for instance_id in offsets if instance_id not in seen)
+
+        output_file = Path(output_file)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = output_file.with_name(output_file.name + '.tmp')
+        with open(self.path, 'rb') as journal, open(tmp_file, 'w') as out:
+            out.write('[')
+            for i, instance_id in enumerate(ids):
+                journal.seek(offsets[instance_id])
+                record = json.loads(journal.readline())
+                out.write(',\n' if i else '\n')
+                out.write(json.dumps(record, indent=2))
+            out.write('\n]\n')
+        os.replace(tmp_file, output_file)
+        return len(ids)
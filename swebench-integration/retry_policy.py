@@ -0,0 +1,243 @@
+"""
+Step Retries, Fallback Ladder and Instance Deadlines
+
+Three layers of recovery, from cheapest to most drastic:
+
+* ``RetryPolicy`` retries a failed tool call or tool-chain step in place,
+  within a per-tool attempt budget and with exponential backoff, so a
+  transient failure does not throw away the instance's setup.
+  ``RetryingClient`` applies it to every call an agent makes.
+* ``FallbackLadder`` records an instance that still failed as skipped
+  rather than failed (``error_handling.fallback.strategies``).
+* ``Deadline`` bounds the wall-clock time of an instance across all of
+  that, so a slow instance cannot hold a worker indefinitely.
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+
+class DeadlineExceeded(TimeoutError):
+    """The instance ran out of its wall-clock budget"""
+
+
+class ToolError(RuntimeError):
+    """The server answered a tool call with a JSON-RPC error"""
+
+
+class FallbackExhausted(RuntimeError):
+    """Every rung of the ladder failed and skipping is not configured"""
+
+    def __init__(self, failures: List[Dict]):
+        super().__init__(failures[-1]["error"])
+        self.failures = failures
+
+
+class Deadline:
+    """Wall-clock budget of one instance; ``seconds=None`` never expires"""
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = seconds
+        self.started = time.monotonic()
+
+    def remaining(self) -> float:
+        if self.seconds is None:
+            return float("inf")
+        return self.seconds - (time.monotonic() - self.started)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    async def run(self, awaitable: Awaitable) -> Any:
+        """Await within the remaining budget, raising DeadlineExceeded"""
+        remaining = self.remaining()
+        if remaining == float("inf"):
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, max(remaining, 0))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"instance deadline of {self.seconds}s exceeded") from None
+
+
+class RetryPolicy:
+    """Step-level retries with per-tool attempt budgets
+
+    These sit on top of the client's transport retries of idempotent
+    tools: they cover any step that raises, including tool errors the
+    server reports. Given an ``idempotent`` allowlist, every other tool
+    gets a single attempt, since a call that timed out may still have
+    applied its edit.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 2,
+        tool_attempts: Optional[Dict[str, int]] = None,
+        base_delay: float = 0.5,
+        backoff_factor: float = 2,
+        max_delay: float = 60,
+        idempotent: Optional[Iterable[str]] = None,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.tool_attempts = tool_attempts or {}
+        self.idempotent = frozenset(idempotent) if idempotent is not None else None
+        self.base_delay = base_delay
+        self.backoff_factor = backoff_factor
+        self.max_delay = max_delay
+        self.stats = {"retries": 0, "recovered": 0, "exhausted": 0}
+
+    @classmethod
+    def from_config(cls, settings: Dict, idempotent: Optional[Iterable[str]] = None) -> "RetryPolicy":
+        """Build from error_handling.retry (backoff) and its ``steps`` budgets"""
+        retry = settings.get('error_handling', {}).get('retry', {})
+        steps = retry.get('steps', {})
+        return cls(
+            max_attempts=steps.get('max_attempts', 2),
+            tool_attempts=steps.get('tools', {}),
+            base_delay=steps.get('base_delay', 0.5),
+            backoff_factor=retry.get('backoff_factor', 2),
+            max_delay=retry.get('max_delay', 60),
+            idempotent=idempotent,
+        )
+
+    def attempts(self, tool: str) -> int:
+        if self.idempotent is not None and tool not in self.idempotent:
+            return 1
+        return max(1, self.tool_attempts.get(tool, self.max_attempts))
+
+    def delay(self, attempt: int) -> float:
+        """Backoff before retry number ``attempt`` (1-based), with full jitter"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * self.backoff_factor ** (attempt - 1)))
+
+    async def call(
+        self,
+        tool: str,
+        step: Callable[[], Awaitable[Any]],
+        deadline: Optional[Deadline] = None,
+    ) -> Any:
+        """Run ``step`` until it succeeds or the tool's budget is spent
+
+        No retry is started that could not finish its backoff before the
+        deadline; the last error is raised instead.
+        """
+        attempts = self.attempts(tool)
+        for attempt in range(1, attempts + 1):
+            try:
+                result = await step()
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                delay = self.delay(attempt)
+                if attempt == attempts or (deadline is not None and deadline.remaining() <= delay):
+                    self.stats["exhausted"] += 1
+                    raise
+                self.stats["retries"] += 1
+                logger.warning(f"Retrying {tool} after {e} (attempt {attempt}/{attempts}, backoff {delay:.2f}s)")
+                await asyncio.sleep(delay)
+                continue
+            if attempt > 1:
+                self.stats["recovered"] += 1
+            return result
+
+
+class RetryingClient:
+    """ACF client whose tool calls go through a RetryPolicy within a Deadline
+
+    JSON-RPC errors are raised as ``ToolError`` so they are retried like
+    transport failures. Everything else is delegated to the wrapped
+    client, so this stands in for it wherever a client is expected.
+    """
+
+    def __init__(self, client, policy: RetryPolicy, deadline: Optional[Deadline] = None):
+        self.client = client
+        self.policy = policy
+        self.deadline = deadline
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    async def call_tool(self, tool_name: str, params: Dict, timeout: Optional[float] = None) -> Dict:
+        options = {"timeout": timeout} if timeout is not None else {}
+
+        async def step():
+            response = await self.client.call_tool(tool_name, params, **options)
+            error = response.get("error") if isinstance(response, dict) else None
+            if error:
+                raise ToolError(f"{tool_name}: {error.get('message') if isinstance(error, dict) else error}")
+            return response
+
+        return await self.policy.call(tool_name, step, self.deadline)
+
+
+class FallbackLadder:
+    """Strategies to try in turn for an instance that keeps failing
+
+    ``skip_instance`` turns a final failure into a skipped result instead
+    of an error. ``simplify_approach`` is ignored: the evaluator's basic
+    strategy only analyzes an instance and plans no edits, so re-running
+    with it can't produce a patch. ``manual_intervention`` needs a human
+    and is ignored in unattended runs too.
+    """
+
+    def __init__(self, strategy: str, fallbacks: Optional[List[str]] = None, enabled: bool = True):
+        fallbacks = fallbacks if enabled and fallbacks else []
+        self.rungs = [strategy]
+        self.skip = "skip_instance" in fallbacks
+        self.stats: Dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, strategy: str, settings: Dict) -> "FallbackLadder":
+        fallback = settings.get('error_handling', {}).get('fallback', {})
+        return cls(strategy, fallback.get('strategies', []), fallback.get('enabled', True))
+
+    async def run(
+        self,
+        instance_id: str,
+        attempt: Callable[[str], Awaitable[Dict]],
+        deadline: Optional[Deadline] = None,
+    ) -> Dict:
+        """Run ``attempt(strategy)`` down the ladder
+
+        The result carries a ``fallback`` record: the strategy that
+        produced it (or ``skipped``) and every failed attempt before it.
+        Without ``skip_instance`` the last error is raised.
+        """
+        failures: List[Dict] = []
+        for strategy in self.rungs:
+            if deadline is not None and deadline.expired:
+                break
+            started = time.monotonic()
+            try:
+                result = await attempt(strategy)
+            except Exception as e:
+                failures.append({
+                    "strategy": strategy,
+                    "error": f"{type(e).__name__}: {e}",
+                    "seconds": round(time.monotonic() - started, 3),
+                })
+                logger.warning(f"{instance_id}: {strategy} strategy failed: {e}")
+                if isinstance(e, DeadlineExceeded):
+                    break
+                continue
+            result["fallback"] = {"taken": strategy, "failures": failures}
+            self.stats[strategy] = self.stats.get(strategy, 0) + 1
+            return result
+
+        if not failures:
+            failures.append({"strategy": self.rungs[0], "error": "DeadlineExceeded: no time left", "seconds": 0.0})
+        if not self.skip:
+            self.stats["failed"] = self.stats.get("failed", 0) + 1
+            raise FallbackExhausted(failures)
+        self.stats["skipped"] = self.stats.get("skipped", 0) + 1
+        logger.warning(f"{instance_id}: skipped after {len(failures)} failed attempt(s)")
+        return {
+            "instance_id": instance_id,
+            "error": failures[-1]["error"],
+            "model_patch": "",
+            "fallback": {"taken": "skipped", "failures": failures},
+        }
@@ -7,26 +7,47 @@ for enhanced code editing and task management capabilities.
 """
 
 import asyncio
-import json
+import io
+import itertools
 import logging
 import os
+import random
 import sys
 import time
-from dataclasses import dataclass
+from contextlib import AsyncExitStack, nullcontext
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 
 import click
 import yaml
-from datasets import load_dataset
 from loguru import logger
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from tenacity import retry, stop_after_attempt, wait_exponential
+from rich.progress import BarColumn, MofNCompleteColumn, Progress, SpinnerColumn, TextColumn
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 
 # Add parent directory to path for ACF imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from concurrency import AdaptiveConcurrency
+from impact_analysis import TestImpactAnalyzer
+from instance_store import InstanceStore
+from json_codec import JSONCodec, get_codec, tool_result
+from local_search import LocalSearch
+from mcp_pool import MCPConnectionPool
+from patch_builder import PatchBuilder
+from metrics import MetricsRecorder
+from resource_governor import ResourceGovernor
+from results_journal import ResultsJournal
+from retry_policy import Deadline, FallbackExhausted, FallbackLadder, RetryingClient, RetryPolicy
+from server_manager import ACFServerManager, ServerStartError
+from sharding import merge_shards, parse_shard, run_shards, shard_config, shard_counts, shard_of
+from symbol_index import SymbolIndex, SymbolIndexer
+from task_queue import TaskQueue
+from tool_cache import ToolResultCache
+from validation_engine import TestValidator, instance_tests
+from workspace_cache import WorkspaceProvisioner
+
 console = Console()
 
 @dataclass
@@ -39,6 +60,14 @@ class EvaluationConfig:
     use_task_manager: bool
     output_dir: Path
     verbose: bool
+    resume: bool = False
+    repo: Optional[str] = None
+    instance_pattern: Optional[str] = None
+    instance_ids: Optional[List[str]] = None
+    store_dir: str = "./cache/instances"
+    shard_index: int = 0
+    shard_count: int = 1
+    settings: Dict[str, Any] = field(default_factory=dict)
     
     @classmethod
     def from_yaml(cls, config_path: str = "config.yaml") -> "EvaluationConfig":
@@ -53,61 +82,489 @@ class EvaluationConfig:
             agent_strategy=config['agent']['strategy'],
             use_task_manager=config['task_management']['enabled'],
             output_dir=Path(config['swebench']['evaluation']['output_dir']),
-            verbose=config['agent']['behavior']['verbose']
+            verbose=config['agent']['behavior']['verbose'],
+            resume=config.get('error_handling', {}).get('recovery', {}).get('resume_from_checkpoint', False),
+            store_dir=config['swebench']['datasets'].get('store_dir', './cache/instances'),
+            settings=config
         )
 
 
 class ACFMCPClient:
-    """Client for interacting with ACF MCP Server"""
+    """Client for interacting with ACF MCP Server
+    
+    Requests are multiplexed over a single websocket: every call gets a
+    monotonic integer id and a future, and a background reader task routes
+    each response to the caller that issued the matching request. Many tool
+    calls can therefore be in flight on one connection at once.
+    
+    Every call is bounded by a timeout (per call, per tool, or the client
+    default). A timed-out or dropped connection is torn down and reopened
+    with jittered exponential backoff; only idempotent tools are replayed
+    transparently, mutating calls surface the error to the caller.
+    
+    Messages are encoded and decoded with a pluggable ``JSONCodec``
+    (orjson when installed). Responses larger than ``offload_decode_bytes``
+    are decoded in a worker thread so multi-megabyte results do not stall
+    the event loop.
+    
+    With a ``ToolResultCache`` attached, repeated read-only calls against
+    the current workspace are answered locally until a mutating call. With
+    a ``MetricsRecorder`` attached, every call's latency, request and
+    response bytes and outcome are recorded per tool. With a
+    ``LocalSearch`` attached, ``search_code`` on a local workspace runs
+    ripgrep in-process instead of going through the server; with a
+    ``ResourceGovernor``, ``execute_command`` on a local workspace runs
+    locally under the configured resource limits. An
+    ``AdaptiveConcurrency`` controller is fed every server call's latency.
+    """
+    
+    # Read-only tools that are safe to replay after a timeout or reconnect
+    IDEMPOTENT_TOOLS = frozenset({
+        "read_file", "read_multiple_files", "search_code", "tree",
+        "get_file_info", "list_directory", "list_allowed_directories",
+        "search_files", "listTasks", "getContext", "getNextTask",
+    })
     
-    def __init__(self, host: str = "localhost", port: int = 3000):
+    # Tools that establish per-session server state, restored after a reconnect
+    SESSION_TOOLS = frozenset({"setWorkspace"})
+    
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 3000,
+        timeout: float = 30,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+        reconnect_attempts: int = 5,
+        retry_attempts: int = 3,
+        backoff_factor: float = 2,
+        max_delay: float = 60,
+        cache: Optional[ToolResultCache] = None,
+        metrics: Optional[MetricsRecorder] = None,
+        codec: Optional[JSONCodec] = None,
+        offload_decode_bytes: int = 256 * 1024,
+        max_message_size: Optional[int] = 64 * 1024 * 1024,
+        local_search: Optional[LocalSearch] = None,
+        governor: Optional[ResourceGovernor] = None,
+        concurrency: Optional[AdaptiveConcurrency] = None,
+    ):
         self.host = host
         self.port = port
         self.ws_url = f"ws://{host}:{port}"
         self.connection = None
+        self.timeout = timeout
+        self.tool_timeouts = tool_timeouts or {}
+        self.reconnect_attempts = max(1, reconnect_attempts)
+        self.retry_attempts = max(1, retry_attempts)
+        self.backoff_factor = backoff_factor
+        self.max_delay = max_delay
+        self.cache = cache
+        self.metrics = metrics
+        self.codec = codec or get_codec()
+        self.offload_decode_bytes = offload_decode_bytes
+        self.max_message_size = max_message_size
+        self.local_search = local_search
+        self.governor = governor
+        self.concurrency = concurrency
+        self.stats = {"calls": 0, "timeouts": 0, "retries": 0, "reconnects": 0, "failures": 0}
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._reader_task: Optional[asyncio.Task] = None
+        self._decode_tasks: set = set()
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._session_state: Dict[str, Dict] = {}
+        self._ever_connected = False
+    
+    @classmethod
+    def from_config(
+        cls,
+        settings: Dict,
+        cache: Optional[ToolResultCache] = None,
+        endpoint: Optional[Tuple[str, int]] = None,
+        metrics: Optional[MetricsRecorder] = None,
+        local_search: Optional[LocalSearch] = None,
+        governor: Optional[ResourceGovernor] = None,
+        concurrency: Optional[AdaptiveConcurrency] = None,
+    ) -> "ACFMCPClient":
+        """Create a client from the acf_mcp and error_handling sections of config.yaml
+        
+        ``endpoint`` overrides the configured host and port, e.g. to point
+        the client at a managed server.
+        """
+        acf_settings = settings.get('acf_mcp', {})
+        retry_settings = settings.get('error_handling', {}).get('retry', {})
+        host, port = endpoint or (acf_settings.get('host', 'localhost'), acf_settings.get('port', 3000))
+        max_message_mb = acf_settings.get('max_message_size_mb', 64)
+        return cls(
+            host=host,
+            port=port,
+            timeout=acf_settings.get('timeout', 30),
+            tool_timeouts=acf_settings.get('tool_timeouts', {}),
+            reconnect_attempts=acf_settings.get('reconnect_attempts', 5),
+            retry_attempts=retry_settings.get('max_attempts', 3),
+            backoff_factor=retry_settings.get('backoff_factor', 2),
+            max_delay=retry_settings.get('max_delay', 60),
+            cache=cache,
+            metrics=metrics,
+            codec=get_codec(acf_settings.get('json_codec', 'auto')),
+            offload_decode_bytes=int(acf_settings.get('offload_decode_kb', 256) * 1024),
+            max_message_size=int(max_message_mb * 1024 * 1024) if max_message_mb else None,
+            local_search=local_search,
+            governor=governor,
+            concurrency=concurrency,
+        )
         
     async def connect(self):
         """Establish connection to ACF MCP server"""
         import websockets
         try:
-            self.connection = await websockets.connect(self.ws_url)
+            self.connection = await websockets.connect(self.ws_url, max_size=self.max_message_size)
+            self._reader_task = asyncio.create_task(self._read_responses(self.connection))
+            self._ever_connected = True
             logger.info(f"Connected to ACF MCP server at {self.ws_url}")
             return True
         except Exception as e:
             logger.error(f"Failed to connect to ACF MCP server: {e}")
             return False
     
-    async def call_tool(self, tool_name: str, params: Dict) -> Dict:
-        """Call an ACF tool via MCP protocol"""
-        if not self.connection:
-            await self.connect()
+    def _backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given (1-based) attempt"""
+        return random.uniform(0, min(self.max_delay, self.backoff_factor ** attempt))
+    
+    async def _ensure_connected(self):
+        """Connect lazily, making sure concurrent callers open only one socket
         
+        A lost connection is reopened up to ``reconnect_attempts`` times with
+        backoff, and session state such as the workspace is restored on it.
+        """
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.is_connected:
+                return
+            reconnecting = self._ever_connected
+            attempts = self.reconnect_attempts if reconnecting else 1
+            for attempt in range(1, attempts + 1):
+                if reconnecting:
+                    self.stats["reconnects"] += 1
+                    logger.warning(f"Reconnecting to ACF MCP server (attempt {attempt}/{attempts})")
+                if await self.connect():
+                    break
+                if attempt < attempts:
+                    await asyncio.sleep(self._backoff_delay(attempt))
+            else:
+                raise ConnectionError(f"Could not connect to ACF MCP server at {self.ws_url}")
+            
+            if reconnecting:
+                for tool_name, params in self._session_state.items():
+                    await self._send_tool_call(tool_name, params, self._call_timeout(tool_name, params))
+    
+    async def _drop_connection(self, reason: str):
+        """Tear down the current socket so the next call reconnects"""
+        connection, self.connection = self.connection, None
+        if connection:
+            logger.warning(f"Dropping ACF MCP connection: {reason}")
+            try:
+                await connection.close()
+            except Exception as e:
+                logger.debug(f"Error closing MCP connection: {e}")
+        self._fail_pending(ConnectionError(f"ACF MCP connection dropped: {reason}"))
+    
+    def _route(self, message, response: Dict):
+        """Resolve the pending request a decoded response belongs to"""
+        future = self._pending.pop(response.get("id"), None)
+        if future is None:
+            logger.debug(f"Ignoring unsolicited MCP message: {str(message)[:200]}")
+        elif not future.done():
+            future.set_result((response, len(message)))
+    
+    async def _decode_large(self, message):
+        """Decode a large response in a worker thread, then route it"""
+        try:
+            response = await asyncio.get_running_loop().run_in_executor(None, self.codec.loads, message)
+        except ValueError:
+            logger.warning(f"Discarding malformed MCP message: {str(message)[:200]}")
+            return
+        self._route(message, response)
+    
+    async def _read_responses(self, connection):
+        """Route incoming responses to the futures of their pending requests"""
+        error: Exception = ConnectionError("ACF MCP connection closed")
+        try:
+            async for message in connection:
+                if len(message) >= self.offload_decode_bytes:
+                    # Keep reading (and routing small responses) meanwhile
+                    task = asyncio.create_task(self._decode_large(message))
+                    self._decode_tasks.add(task)
+                    task.add_done_callback(self._decode_tasks.discard)
+                    continue
+                try:
+                    response = self.codec.loads(message)
+                except ValueError:
+                    logger.warning(f"Discarding malformed MCP message: {str(message)[:200]}")
+                    continue
+                self._route(message, response)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"ACF MCP reader stopped: {e}")
+            error = ConnectionError(f"ACF MCP connection lost: {e}")
+        finally:
+            if self.connection is connection:
+                self.connection = None
+            self._fail_pending(error)
+    
+    def _fail_pending(self, error: Exception):
+        """Fail every outstanding request, e.g. after the socket dropped"""
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+    
+    @property
+    def workspace(self) -> str:
+        """Workspace path set on this session, if any"""
+        return self._session_state.get("setWorkspace", {}).get("workspacePath", "")
+    
+    @property
+    def is_connected(self) -> bool:
+        """Whether the websocket is open and its reader task is alive"""
+        return (
+            self.connection is not None
+            and self._reader_task is not None
+            and not self._reader_task.done()
+        )
+    
+    async def _request(self, method: str, params: Dict, io: Optional[Dict[str, int]] = None) -> Dict:
+        """Send a JSON-RPC request and wait for its correlated response
+        
+        Request and response sizes are added to ``io`` when given.
+        """
+        request_id = next(self._ids)
         request = {
             "jsonrpc": "2.0",
-            "method": "tools/call",
-            "params": {
+            "method": method,
+            "params": params,
+            "id": request_id
+        }
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            payload = self.codec.dumps(request)
+            try:
+                await self.connection.send(payload)
+            except Exception as e:
+                raise ConnectionError(f"Failed to send MCP request: {e}") from e
+            response, size = await future
+            if io is not None:
+                io["sent"] += len(payload)
+                io["received"] += size
+            return response
+        finally:
+            self._pending.pop(request_id, None)
+    
+    def _call_timeout(self, tool_name: str, params: Dict) -> float:
+        """Timeout for a tool call, leaving room for the command's own timeout"""
+        timeout = self.tool_timeouts.get(tool_name, self.timeout)
+        if params.get("timeout_ms"):
+            timeout = max(timeout, params["timeout_ms"] / 1000 + 5)
+        return timeout
+    
+    async def _send_tool_call(
+        self,
+        tool_name: str,
+        params: Dict,
+        timeout: float,
+        io: Optional[Dict[str, int]] = None,
+    ) -> Dict:
+        """Issue one tools/call on the current connection within ``timeout``"""
+        try:
+            return await asyncio.wait_for(self._request("tools/call", {
                 "name": tool_name,
                 "arguments": params
-            },
-            "id": str(time.time())
-        }
+            }, io), timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            # The server handles a connection's requests serially, so a stuck
+            # call blocks everything queued behind it on this socket
+            await self._drop_connection(f"{tool_name} timed out after {timeout}s")
+            raise TimeoutError(f"{tool_name} timed out after {timeout}s")
+    
+    async def call_tool(self, tool_name: str, params: Dict, timeout: Optional[float] = None) -> Dict:
+        """Call an ACF tool via MCP protocol
         
-        await self.connection.send(json.dumps(request))
-        response = await self.connection.recv()
-        return json.loads(response)
+        Args:
+            tool_name: Name of the ACF tool
+            params: Tool arguments
+            timeout: Seconds to wait for the response; defaults to the
+                per-tool timeout from config, then the client default
+        """
+        self.stats["calls"] += 1
+        
+        workspace = self.workspace
+        cacheable = self.cache is not None and self.cache.is_cacheable(tool_name)
+        if cacheable:
+            hit, cached = self.cache.get(workspace, tool_name, params)
+            if hit:
+                if self.metrics is not None:
+                    self.metrics.record_cache_hit(tool_name)
+                return cached
+            generation = self.cache.generation(workspace)
+        elif self.cache is not None and self.cache.is_mutating(tool_name):
+            self.cache.invalidate(workspace)
+        
+        if tool_name == "search_code" and self.local_search is not None:
+            response = await self._search_locally(params, workspace)
+            if response is not None:
+                if cacheable:
+                    self.cache.put(workspace, tool_name, params, response, generation)
+                return response
+        
+        if tool_name == "execute_command" and self.governor is not None:
+            response = await self._execute_locally(params, workspace)
+            if response is not None:
+                return response
+        
+        call_timeout = timeout if timeout is not None else self._call_timeout(tool_name, params)
+        attempts = self.retry_attempts if tool_name in self.IDEMPOTENT_TOOLS else 1
+        
+        def _count_retry(retry_state):
+            self.stats["retries"] += 1
+            logger.warning(
+                f"Retrying {tool_name} after {retry_state.outcome.exception()} "
+                f"(attempt {retry_state.attempt_number}/{attempts})"
+            )
+        
+        io = {"sent": 0, "received": 0}
+        started = time.perf_counter()
+        failed = True
+        try:
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(attempts),
+                wait=wait_random_exponential(exp_base=self.backoff_factor, max=self.max_delay),
+                retry=retry_if_exception_type((ConnectionError, TimeoutError)),
+                before_sleep=_count_retry,
+                reraise=True,
+            ):
+                with attempt:
+                    await self._ensure_connected()
+                    response = await self._send_tool_call(tool_name, params, call_timeout, io)
+            failed = False
+        except Exception:
+            self.stats["failures"] += 1
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_tool(
+                    tool_name, time.perf_counter() - started, io["sent"], io["received"],
+                    error=failed or bool(response.get("error")),
+                )
+            if self.concurrency is not None and not failed:
+                self.concurrency.observe(tool_name, time.perf_counter() - started)
+            # Bump again once the mutation has landed, so reads issued while it
+            # was in flight are not cached either
+            if self.cache is not None and not cacheable and self.cache.is_mutating(tool_name):
+                self.cache.invalidate(workspace)
+        
+        if tool_name in self.SESSION_TOOLS:
+            self._session_state[tool_name] = params
+        if cacheable:
+            self.cache.put(workspace, tool_name, params, response, generation, io["received"])
+        return response
+    
+    async def _search_locally(self, params: Dict, workspace: str) -> Optional[Dict]:
+        """Answer search_code with local ripgrep, wrapped like a server response"""
+        started = time.perf_counter()
+        result = await self.local_search.search(params, workspace)
+        if result is None:
+            return None
+        if self.metrics is not None:
+            self.metrics.record_tool(
+                "search_code:local", time.perf_counter() - started, error=not result.get("success", False)
+            )
+        return {
+            "jsonrpc": "2.0",
+            "id": None,
+            "result": {"content": [{"type": "text", "text": self.codec.dumps(result)}]},
+        }
+    
+    async def _execute_locally(self, params: Dict, workspace: str) -> Optional[Dict]:
+        """Run execute_command under the resource governor, wrapped like a server response"""
+        started = time.perf_counter()
+        result = await self.governor.execute(params, workspace)
+        if result is None:
+            return None
+        if self.metrics is not None:
+            self.metrics.record_tool(
+                "execute_command:local", time.perf_counter() - started, error=not result["success"]
+            )
+        return {
+            "jsonrpc": "2.0",
+            "id": None,
+            "result": {"content": [{"type": "text", "text": self.codec.dumps(result)}]},
+        }
+    
+    async def ping(self, timeout: float = 5) -> bool:
+        """Health-check the connection with an MCP ping round trip"""
+        if not self.is_connected:
+            return False
+        try:
+            await asyncio.wait_for(self._request("ping", {}), timeout)
+            return True
+        except Exception as e:
+            logger.debug(f"MCP ping failed: {e}")
+            return False
     
     async def close(self):
         """Close connection to MCP server"""
-        if self.connection:
-            await self.connection.close()
+        connection, self.connection = self.connection, None
+        if connection:
+            await connection.close()
+        if self._reader_task:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+        for task in list(self._decode_tasks):
+            task.cancel()
+        self._fail_pending(ConnectionError("ACF MCP client closed"))
 
 
 class SWEBenchAgent:
     """Agent for solving SWE-bench instances using ACF tools"""
     
-    def __init__(self, acf_client: ACFMCPClient, strategy: str = "advanced"):
-        self.acf = acf_client
+    def __init__(
+        self,
+        acf_client: ACFMCPClient,
+        strategy: str = "advanced",
+        workspaces: Optional[WorkspaceProvisioner] = None,
+        max_parallel_calls: int = 8,
+        settings: Optional[Dict] = None,
+        metrics: Optional[MetricsRecorder] = None,
+        symbols: Optional[SymbolIndexer] = None,
+        use_task_manager: bool = True,
+        impact: Optional[TestImpactAnalyzer] = None,
+        retry: Optional[RetryPolicy] = None,
+        deadline: Optional[Deadline] = None
+    ):
+        # Tool calls are retried within the instance's deadline; task-manager
+        # bookkeeping goes straight to the session
+        self.session = acf_client
+        self.acf = RetryingClient(acf_client, retry, deadline) if retry else acf_client
         self.strategy = strategy
+        self.workspaces = workspaces
+        self.max_parallel_calls = max(1, max_parallel_calls)
+        self.settings = settings or {}
+        self.metrics = metrics
+        self.symbols = symbols
+        self.workspace_path = ""
+        self.symbol_index: Optional[SymbolIndex] = None
+        self.impact = impact
+        # Task-manager writes are bookkeeping: queued and sent in the background
+        self.use_task_manager = use_task_manager
+        self.tasks: Optional[TaskQueue] = None
         
     async def solve_instance(self, instance: Dict) -> Dict:
         """
@@ -120,41 +577,76 @@ class SWEBenchAgent:
             Dictionary containing the predicted patch
         """
         logger.info(f"Solving instance: {instance['instance_id']}")
-        
-        # 1. Set up workspace
-        workspace_path = f"/tmp/swebench/{instance['instance_id']}"
-        await self.acf.call_tool("setWorkspace", {"workspacePath": workspace_path})
-        
-        # 2. Initialize project and task management
-        if self.strategy in ["advanced", "custom"]:
-            await self.acf.call_tool("initProject", {
-                "projectName": instance['instance_id'],
-                "projectDescription": instance['problem_statement']
-            })
-        
-        # 3. Analyze the problem
-        analysis = await self._analyze_problem(instance)
-        
-        # 4. Locate relevant code
-        code_locations = await self._locate_code(instance, analysis)
-        
-        # 5. Generate solution plan
-        plan = await self._generate_plan(instance, analysis, code_locations)
-        
-        # 6. Implement the fix
-        patch = await self._implement_solution(instance, plan)
-        
-        # 7. Validate with tests
-        validation = await self._validate_solution(instance, patch)
+        timer = self.metrics.instance(instance['instance_id']) if self.metrics else None
+        phase = timer.phase if timer else (lambda name: nullcontext())
+        failed = True
+        if self.use_task_manager and self.strategy in ["advanced", "custom"]:
+            self.tasks = TaskQueue.from_config(self.session, self.settings)
+        try:
+            with phase("setup"):
+                # 1. Set up workspace (checked out at base_commit from the repo cache, if enabled)
+                if self.workspaces:
+                    workspace_path = await self.workspaces.provision(instance)
+                else:
+                    workspace_path = f"/tmp/swebench/{instance['instance_id']}"
+                await self.acf.call_tool("setWorkspace", {"workspacePath": workspace_path})
+                self.workspace_path = workspace_path
+                
+                # 2. Initialize project and task management
+                if self.tasks:
+                    self.tasks.submit("initProject", {
+                        "projectName": instance['instance_id'],
+                        "projectDescription": instance['problem_statement']
+                    })
+            
+            # Symbol index of the snapshot (shared across instances of the same
+            # repo and commit); None when the workspace is not on this machine
+            if self.symbols:
+                with phase("index"):
+                    self.symbol_index = await self.symbols.load_or_build(
+                        instance['repo'], instance['base_commit'], workspace_path
+                    )
+            
+            # 3. Analyze the problem
+            with phase("analyze"):
+                analysis = await self._analyze_problem(instance)
+            
+            # 4. Locate relevant code
+            with phase("locate"):
+                code_locations = await self._locate_code(instance, analysis)
+            
+            # 5. Generate solution plan
+            with phase("plan"):
+                plan = await self._generate_plan(instance, analysis, code_locations)
+            
+            # 6. Implement the fix
+            with phase("implement"):
+                patch = await self._implement_solution(instance, plan)
+            
+            # 7. Validate with tests
+            with phase("validate"):
+                validation = await self._validate_solution(instance, patch)
+            failed = False
+        finally:
+            # Drain the queue before the session goes back to the pool
+            if self.tasks:
+                with phase("bookkeeping"):
+                    await self.tasks.close()
+            governor = getattr(self.acf, 'governor', None)
+            resources = governor.pop_usage(self.workspace_path) if governor else None
+            if timer:
+                timer.finish(error=failed)
         
         return {
             "instance_id": instance['instance_id'],
             "model_patch": patch,
             "validation": validation,
+            "resources": resources,
             "metadata": {
                 "strategy": self.strategy,
                 "analysis": analysis,
-                "plan": plan
+                "plan": plan,
+                "task_manager": self.tasks.stats if self.tasks else None
             }
         }
     
@@ -162,16 +654,19 @@ class SWEBenchAgent:
         """Analyze the problem statement and test failures"""
         logger.debug("Analyzing problem statement...")
         
-        # Search for relevant code patterns
-        search_results = await self.acf.call_tool("search_code", {
-            "path": instance['repo'],
-            "pattern": instance.get('fail_to_pass', ['test_'])[0] if instance.get('fail_to_pass') else 'def test_',
-            "maxResults": 50
-        })
+        # Find the failing tests: in the symbol index, or by searching
+        if self.symbol_index is not None:
+            search_results = {"matches": self._index_test_files(instance)}
+        else:
+            search_results = tool_result(await self.acf.call_tool("search_code", {
+                "path": instance['repo'],
+                "pattern": instance.get('fail_to_pass', ['test_'])[0] if instance.get('fail_to_pass') else 'def test_',
+                "maxResults": 50
+            }))
         
         # Create task for problem analysis
-        if self.strategy == "advanced":
-            await self.acf.call_tool("addTask", {
+        if self.tasks and self.strategy == "advanced":
+            self.tasks.submit("addTask", {
                 "title": "Understand the problem",
                 "description": f"Analyze: {instance['problem_statement'][:500]}...",
                 "priority": "critical"
@@ -182,29 +677,78 @@ class SWEBenchAgent:
             "problem_type": self._classify_problem(instance['problem_statement'])
         }
     
+    def _symbol_location(self, path: str, line: int, end_line: int, **extra) -> Dict:
+        """A location in the ``search_code`` match shape for an indexed file"""
+        return {
+            "path": os.path.join(self.workspace_path, path),
+            "relativePath": path,
+            "lineNumber": line,
+            "line_range": [line, end_line],
+            **extra,
+        }
+    
+    def _index_test_files(self, instance: Dict) -> List[Dict]:
+        """Files and definitions of the FAIL_TO_PASS tests, from the symbol index"""
+        matches = []
+        for test_id in instance_tests(instance, 'fail_to_pass'):
+            path, symbol = self.symbol_index.test_location(test_id)
+            if path is None:
+                continue
+            line, end_line = (symbol.line, symbol.end_line) if symbol else (1, 1)
+            matches.append(self._symbol_location(path, line, end_line, test=test_id))
+        return matches
+    
     async def _locate_code(self, instance: Dict, analysis: Dict) -> List[Dict]:
         """Locate relevant code sections"""
         logger.debug("Locating relevant code...")
         
-        locations = []
+        # Index lookups: definitions named in the problem statement and the
+        # failing tests, ranked by the modules those tests import
+        if self.symbol_index is not None:
+            located = self.symbol_index.locate(
+                instance_tests(instance, 'fail_to_pass'), instance['problem_statement']
+            )
+            return [
+                self._symbol_location(s.path, s.line, s.end_line, symbol=s.name, kind=s.kind)
+                for s in located
+            ]
         
-        # Search for implementation files
+        # Derive one implementation pattern per distinct test file
+        impl_patterns = []
         for test_file in analysis.get('test_files', []):
-            # Extract function/class names from test file
-            content = await self.acf.call_tool("read_file", {"path": test_file['path']})
-            
-            # Search for corresponding implementation
             if 'test_' in test_file['path']:
                 impl_pattern = test_file['path'].replace('test_', '').replace('_test', '')
-                impl_search = await self.acf.call_tool("search_code", {
+                if impl_pattern not in impl_patterns:
+                    impl_patterns.append(impl_pattern)
+        
+        # Search for the corresponding implementations concurrently
+        semaphore = asyncio.Semaphore(self.max_parallel_calls)
+        
+        async def search(impl_pattern: str) -> Dict:
+            async with semaphore:
+                return tool_result(await self.acf.call_tool("search_code", {
                     "path": instance['repo'],
                     "pattern": impl_pattern,
                     "maxResults": 10
-                })
-                locations.extend(impl_search.get('matches', []))
+                }))
+        
+        locations = []
+        for impl_search in await asyncio.gather(*(search(p) for p in impl_patterns)):
+            locations.extend(impl_search.get('matches', []))
         
         return locations
     
+    async def _read_files(self, paths: List[str]) -> Dict[str, str]:
+        """Read several files in a single read_multiple_files round trip"""
+        if not paths:
+            return {}
+        response = tool_result(await self.acf.call_tool("read_multiple_files", {"paths": paths}))
+        return {
+            item['path']: item['content']
+            for item in response.get('results') or []
+            if item.get('content') is not None
+        }
+    
     async def _generate_plan(self, instance: Dict, analysis: Dict, locations: List[Dict]) -> Dict:
         """Generate a solution plan"""
         logger.debug("Generating solution plan...")
@@ -216,20 +760,20 @@ class SWEBenchAgent:
         }
         
         if self.strategy == "advanced":
-            # Create subtasks for each step
-            main_task = await self.acf.call_tool("addTask", {
+            # Create subtasks for each step; they refer to the queued main task
+            main_task = self.tasks.submit("addTask", {
                 "title": f"Fix: {instance['instance_id']}",
                 "description": instance['problem_statement'][:1000],
                 "priority": "critical"
-            })
+            }) if self.tasks else None
             
-            # Add subtasks
-            for i, location in enumerate(locations):
-                await self.acf.call_tool("addSubtask", {
-                    "parentId": main_task['id'],
-                    "title": f"Modify {location['path']}",
-                    "relatedFiles": location['path']
-                })
+            for location in locations:
+                if main_task:
+                    self.tasks.submit("addSubtask", {
+                        "parentId": main_task,
+                        "title": f"Modify {location['path']}",
+                        "relatedFiles": location['path']
+                    })
                 
                 plan["steps"].append({
                     "file": location['path'],
@@ -239,73 +783,75 @@ class SWEBenchAgent:
         
         return plan
     
-    async def _implement_solution(self, instance: Dict, plan: Dict) -> str:
-        """Implement the solution based on the plan"""
+    async def _implement_solution(self, instance: Dict, plan: Dict) -> PatchBuilder:
+        """Implement the solution based on the plan
+        
+        Returns the patch as a ``PatchBuilder``: diffed by git for a local
+        workspace, otherwise file by file as edits are made, so no original
+        file content outlives its step.
+        """
         logger.debug("Implementing solution...")
         
-        patches = []
+        patch = PatchBuilder.from_config(self.workspace_path, self.settings)
         
-        for step in plan.get("steps", []):
+        # Read every file the plan touches up front in one round trip
+        steps = plan.get("steps", [])
+        contents = await self._read_files(list(dict.fromkeys(step["file"] for step in steps)))
+        remaining_steps = {}
+        for step in steps:
+            remaining_steps[step["file"]] = remaining_steps.get(step["file"], 0) + 1
+        
+        for step in steps:
             file_path = step["file"]
+            remaining_steps[file_path] -= 1
             
-            # Read current file content
-            current_content = await self.acf.call_tool("read_file", {"path": file_path})
+            # Read current file content (again, if an earlier step edited it);
+            # it is dropped after the file's last step
+            if file_path not in contents:
+                read = tool_result(await self.acf.call_tool("read_file", {"path": file_path}))
+                if read.get('content') is None:
+                    logger.warning(f"Could not read {file_path}: {read.get('message', 'no content')}")
+                    continue
+                contents[file_path] = read['content']
+            current_content = contents[file_path] if remaining_steps[file_path] else contents.pop(file_path)
             
             # Apply modifications based on problem analysis
             # This is where you'd integrate with an LLM or use pattern-based fixes
             modified_content = await self._apply_fix_to_content(
-                current_content['content'],
+                current_content,
                 instance,
                 step
             )
             
             # Use edit_block for surgical changes
-            if modified_content != current_content['content']:
+            if modified_content != current_content:
                 result = await self.acf.call_tool("edit_block", {
                     "file_path": file_path,
-                    "old_string": self._extract_relevant_section(current_content['content'], step),
+                    "old_string": self._extract_relevant_section(current_content, step),
                     "new_string": self._extract_relevant_section(modified_content, step),
                     "expected_replacements": 1
                 })
                 
-                patches.append({
-                    "file": file_path,
-                    "original": current_content['content'],
-                    "modified": modified_content
-                })
+                contents.pop(file_path, None)
+                if self.symbol_index is not None:
+                    self.symbol_index = self.symbol_index.updated(self.workspace_path, [file_path])
+                patch.add(file_path, current_content, modified_content)
         
         # Generate unified diff
-        return self._generate_patch(patches)
+        return await patch.finish()
     
-    async def _validate_solution(self, instance: Dict, patch: str) -> Dict:
-        """Validate the solution by running tests"""
-        logger.debug("Validating solution...")
-        
-        validation_results = {
-            "tests_pass": False,
-            "error": None,
-            "output": ""
-        }
+    async def _validate_solution(self, instance: Dict, patch: PatchBuilder) -> Dict:
+        """Validate the solution by running tests
         
-        try:
-            # Run the failing tests
-            for test in instance.get('fail_to_pass', []):
-                result = await self.acf.call_tool("execute_command", {
-                    "command": f"python -m pytest {test} -xvs",
-                    "timeout_ms": 30000
-                })
-                
-                validation_results["output"] += result.get('output', '')
-                validation_results["tests_pass"] = result.get('exitCode', 1) == 0
-                
-                if not validation_results["tests_pass"]:
-                    break
-            
-        except Exception as e:
-            validation_results["error"] = str(e)
-            logger.error(f"Validation failed: {e}")
+        All target tests run in one pytest session; the result holds an
+        outcome and duration per test alongside the overall verdict. With
+        incremental testing, regression tests are limited to those impacted
+        by the files the patch touches.
+        """
+        logger.debug("Validating solution...")
         
-        return validation_results
+        validator = TestValidator.from_config(self.acf, self.settings, self.impact)
+        return await validator.validate(instance, patch.files)
     
     def _classify_problem(self, problem_statement: str) -> str:
         """Classify the type of problem"""
@@ -331,27 +877,12 @@ class SWEBenchAgent:
     
     def _extract_relevant_section(self, content: str, step: Dict) -> str:
         """Extract relevant section of code"""
-        lines = content.split('\n')
         if step.get('line_range'):
+            # Walk the lines up to the section instead of splitting the whole file
             start, end = step['line_range']
-            return '\n'.join(lines[start-1:end])
+            section = ''.join(itertools.islice(io.StringIO(content, newline='\n'), start - 1, end))
+            return section[:-1] if section.endswith('\n') else section
         return content[:1000]  # First 1000 chars as fallback
-    
-    def _generate_patch(self, patches: List[Dict]) -> str:
-        """Generate unified diff patch"""
-        import difflib
-        
-        full_patch = ""
-        for patch in patches:
-            diff = difflib.unified_diff(
-                patch['original'].splitlines(keepends=True),
-                patch['modified'].splitlines(keepends=True),
-                fromfile=f"a/{patch['file']}",
-                tofile=f"b/{patch['file']}"
-            )
-            full_patch += ''.join(diff)
-        
-        return full_patch
 
 
 class SWEBenchEvaluator:
@@ -359,89 +890,334 @@ class SWEBenchEvaluator:
     
     def __init__(self, config: EvaluationConfig):
         self.config = config
-        self.acf_client = ACFMCPClient()
-        self.agent = SWEBenchAgent(self.acf_client, config.agent_strategy)
-        self.results = []
+        acf_settings = config.settings.get('acf_mcp', {})
+        self.tool_cache = ToolResultCache.from_config(config.settings)
+        self.metrics = MetricsRecorder.from_config(config.settings)
+        self.local_search = LocalSearch.from_config(config.settings)
+        self.governor = ResourceGovernor.from_config(config.settings)
+        self.symbols = SymbolIndexer.from_config(config.settings)
+        self.impact = TestImpactAnalyzer.from_config(config.settings)
+        self.servers = ACFServerManager.from_config(config.settings)
+        self.pool = MCPConnectionPool.from_config(self._new_client, acf_settings)
+        self.journal = ResultsJournal.from_config(config.output_dir / "results.jsonl", config.settings)
+        docker_settings = config.settings.get('swebench', {}).get('docker', {})
+        self.workspaces = (
+            WorkspaceProvisioner.from_config(config.settings)
+            if docker_settings.get('use_cache', False) else None
+        )
+        self.cleanup_workspaces = docker_settings.get('cleanup_after', True)
+        self.max_parallel_calls = config.settings.get('optimization', {}).get('parallel', {}).get('max_workers', 8)
+        # Strategies to fall back to, and the wall-clock budget of an instance
+        self.fallback = FallbackLadder.from_config(config.agent_strategy, config.settings)
+        self.instance_deadline = config.settings.get('error_handling', {}).get('instance_deadline_seconds')
+        # Only read-only tools are retried: a mutating call that timed out
+        # may have been applied
+        self.retry = RetryPolicy.from_config(config.settings, ACFMCPClient.IDEMPOTENT_TOOLS)
+        # Instances in flight: adapted to latency and host load, or fixed
+        self.concurrency = AdaptiveConcurrency.from_config(max(1, config.num_workers), config.settings)
+    
+    def _new_client(self) -> ACFMCPClient:
+        """Pool factory: clients are spread across managed servers when there are any"""
+        endpoint = self.servers.next_endpoint() if self.servers else None
+        return ACFMCPClient.from_config(
+            self.config.settings, cache=self.tool_cache, endpoint=endpoint, metrics=self.metrics,
+            local_search=self.local_search, governor=self.governor, concurrency=self.concurrency
+        )
         
     async def run(self):
         """Run the evaluation"""
         console.print("[bold green]Starting SWE-bench Evaluation with ACF MCP[/bold green]")
         
-        # Connect to ACF MCP server
-        connected = await self.acf_client.connect()
+        # Spawn local ACF servers if the runner manages them
+        if self.servers:
+            console.print(f"Starting {self.servers.count} managed ACF MCP server(s)...")
+            try:
+                await self.servers.start()
+            except ServerStartError as e:
+                console.print(f"[bold red]Failed to start ACF MCP server: {e}[/bold red]")
+                return
+            server_stats = self.servers.stats()
+            console.print(
+                f"ACF servers ready on ports {', '.join(str(port) for _, port in self.servers.endpoints())} "
+                f"(slowest start {server_stats['max_startup_seconds']:.2f}s)"
+            )
+        
+        # Open the pool of ACF MCP server connections
+        connected = await self.pool.start()
         if not connected:
             console.print("[bold red]Failed to connect to ACF MCP server![/bold red]")
-            console.print("Please ensure the server is running: npm run start:mcp")
+            if self.servers:
+                await self.servers.close()
+            else:
+                console.print("Please ensure the server is running: npm run start:mcp, or enable acf_mcp.managed")
             return
         
-        # Load dataset
+        # Expose live latency metrics for long runs
+        if self.metrics:
+            await self.metrics.serve()
+        
+        # Open the local instance store (converting the dataset on first use)
         console.print(f"Loading dataset: {self.config.dataset_name}")
-        dataset = load_dataset(self.config.dataset_name, split='test')
+        store = InstanceStore.open_or_build(self.config.dataset_name, 'test', self.config.store_dir)
         
-        # Limit instances if specified
-        if self.config.max_instances:
-            dataset = dataset.select(range(min(self.config.max_instances, len(dataset))))
+        # Select instances, limiting them if specified
+        instance_ids = store.ids(
+            repo=self.config.repo,
+            pattern=self.config.instance_pattern,
+            instance_ids=self.config.instance_ids,
+            limit=self.config.max_instances
+        )
+        if self.config.shard_count > 1:
+            instance_ids = [
+                instance_id for instance_id in instance_ids
+                if shard_of(instance_id, self.config.shard_count) == self.config.shard_index
+            ]
+            console.print(
+                f"Shard {self.config.shard_index}/{self.config.shard_count}: "
+                f"{len(instance_ids)} instances, MCP port {self.config.settings.get('acf_mcp', {}).get('port', 3000)}"
+            )
+        
+        # Resume from the journal, or start a fresh one
+        if self.config.resume:
+            completed = self.journal.completed_ids()
+            if completed:
+                console.print(f"Resuming: skipping {len(completed)} instances already in {self.journal.path}")
+        else:
+            completed = set()
+            self.journal.reset()
+        self.journal.open()
+        pending = [instance_id for instance_id in instance_ids if instance_id not in completed]
+        
+        console.print(
+            f"Processing {len(pending)} instances with {self.config.num_workers} workers"
+            f"{' (adaptive)' if self.concurrency else ''}..."
+        )
         
-        console.print(f"Processing {len(dataset)} instances...")
+        # Process instances with a bounded number in flight; each result is
+        # journaled as soon as it completes
+        if self.concurrency:
+            semaphore = self.concurrency
+            self.concurrency.start(self.pool)
+        else:
+            semaphore = asyncio.Semaphore(max(1, self.config.num_workers))
+        counts = {"in_flight": 0, "finished": 0, "failed": 0}
         
-        # Process instances
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            MofNCompleteColumn(),
+            TextColumn("in-flight: {task.fields[in_flight]} | finished: {task.fields[finished]} | failed: {task.fields[failed]}"),
             console=console,
         ) as progress:
             
-            task = progress.add_task("Evaluating instances...", total=len(dataset))
+            task = progress.add_task("Evaluating instances...", total=len(pending), **counts)
             
-            for instance in dataset:
-                try:
-                    result = await self.agent.solve_instance(instance)
-                    self.results.append(result)
-                    progress.update(task, advance=1, description=f"Completed: {instance['instance_id']}")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to process {instance['instance_id']}: {e}")
-                    self.results.append({
-                        "instance_id": instance['instance_id'],
-                        "error": str(e),
-                        "model_patch": ""
-                    })
-                    progress.update(task, advance=1)
+            async def solve(instance: Dict, strategy: str, deadline: Deadline) -> Dict:
+                # Each attempt checks out its own session: the server keeps
+                # the active workspace per connection
+                async with self.pool.connection() as client:
+                    agent = SWEBenchAgent(
+                        client,
+                        strategy,
+                        self.workspaces,
+                        self.max_parallel_calls,
+                        self.config.settings,
+                        self.metrics,
+                        self.symbols,
+                        self.config.use_task_manager,
+                        self.impact,
+                        self.retry,
+                        deadline
+                    )
+                    return await deadline.run(agent.solve_instance(instance))
+            
+            async def worker(instance_id: str):
+                async with semaphore, AsyncExitStack() as admission:
+                    # Wait for memory headroom before starting another instance
+                    if self.governor:
+                        await admission.enter_async_context(self.governor.admission())
+                    counts["in_flight"] += 1
+                    progress.update(task, description=f"Started: {instance_id}", **counts)
+                    try:
+                        # Instances are read from the store only once their turn comes
+                        instance = store.get(instance_id)
+                        deadline = Deadline(self.instance_deadline)
+                        result = await self.fallback.run(
+                            instance_id, lambda strategy: solve(instance, strategy, deadline), deadline
+                        )
+                        if result.get("error"):
+                            counts["failed"] += 1
+                            description = f"Skipped: {instance_id}"
+                        else:
+                            counts["finished"] += 1
+                            description = f"Completed: {instance_id}"
+                    except Exception as e:
+                        logger.error(f"Failed to process {instance_id}: {e}")
+                        result = {
+                            "instance_id": instance_id,
+                            "error": str(e),
+                            "model_patch": ""
+                        }
+                        if isinstance(e, FallbackExhausted):
+                            result["fallback"] = {"taken": None, "failures": e.failures}
+                        counts["failed"] += 1
+                        description = f"Failed: {instance_id}"
+                    finally:
+                        counts["in_flight"] -= 1
+                        if self.workspaces:
+                            await self.workspaces.release(instance_id, remove=self.cleanup_workspaces)
+                    # The patch is streamed into the journal, then its spool released
+                    self.journal.append(result)
+                    if isinstance(result.get("model_patch"), PatchBuilder):
+                        result["model_patch"].close()
+                    progress.update(task, advance=1, description=description, **counts)
+            
+            try:
+                await asyncio.gather(*(worker(instance_id) for instance_id in pending))
+            finally:
+                self.journal.close()
+                store.close()
+                if self.concurrency:
+                    await self.concurrency.close()
+        
+        # Save results in dataset order
+        await self._save_results(instance_ids)
         
-        # Save results
-        await self._save_results()
+        pool_stats = self.pool.stats()
+        client_stats = self.pool.client_stats()
         
-        # Close connection
-        await self.acf_client.close()
+        # Close connections, then any managed servers
+        await self.pool.close()
+        server_stats = None
+        if self.servers:
+            server_stats = self.servers.stats()
+            await self.servers.close()
+        if self.metrics:
+            await self.metrics.close()
+            metrics_path = self.metrics.export()
         
         console.print("[bold green]Evaluation complete![/bold green]")
         self._print_summary()
+        console.print(
+            f"MCP pool: peak {pool_stats['peak_in_use']}/{pool_stats['max_size']} connections, "
+            f"utilization {pool_stats['utilization']*100:.1f}%, "
+            f"avg checkout wait {pool_stats['avg_wait_seconds']:.3f}s"
+        )
+        console.print(
+            f"MCP calls: {client_stats.get('calls', 0)}, timeouts: {client_stats.get('timeouts', 0)}, "
+            f"retries: {client_stats.get('retries', 0)}, reconnects: {client_stats.get('reconnects', 0)}"
+        )
+        if server_stats:
+            console.print(
+                f"ACF servers: {server_stats['startups']} starts, "
+                f"avg startup {server_stats['avg_startup_seconds']:.2f}s, "
+                f"max {server_stats['max_startup_seconds']:.2f}s, restarts: {server_stats['restarts']}"
+            )
+        if self.tool_cache is not None:
+            cache_stats = self.tool_cache.report()
+            console.print(
+                f"Tool cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                f"({cache_stats['hit_rate']*100:.1f}% hit rate), {cache_stats['invalidations']} invalidations, "
+                f"{cache_stats['evictions']} evictions"
+            )
+        if self.symbols is not None:
+            symbol_stats = self.symbols.stats
+            console.print(
+                f"Symbol index: {symbol_stats['builds']} built, {symbol_stats['loads']} loaded, "
+                f"{symbol_stats['hits']} reused; {symbol_stats['files_parsed']} files parsed, "
+                f"{symbol_stats['files_reused']} reused from earlier commits"
+            )
+        if self.governor is not None:
+            governor_stats = self.governor.stats
+            console.print(
+                f"Resource governor: {governor_stats['commands']} commands, "
+                f"peak RSS {governor_stats['peak_rss_mb']:.0f} MB, CPU {governor_stats['cpu_seconds']:.1f}s, "
+                f"killed {governor_stats['killed_memory']} (memory) / {governor_stats['killed_timeout']} (timeout) / "
+                f"{governor_stats['killed_cpu']} (cpu), admission waits {governor_stats['admission_waits']} "
+                f"({governor_stats['admission_wait_seconds']:.1f}s)"
+            )
+        if self.concurrency is not None:
+            concurrency_stats = self.concurrency.stats
+            console.print(
+                f"Adaptive concurrency: limit {self.config.num_workers} -> {self.concurrency.limit} "
+                f"(range {concurrency_stats['min_limit']}-{concurrency_stats['max_limit']}), "
+                f"{concurrency_stats['increases']} increases, {concurrency_stats['decreases']} decreases"
+            )
+        retry_stats = self.retry.stats
+        if retry_stats["retries"] or retry_stats["exhausted"]:
+            console.print(
+                f"Tool retries: {retry_stats['retries']}, recovered {retry_stats['recovered']}, "
+                f"exhausted {retry_stats['exhausted']}"
+            )
+        if self.fallback.skip:
+            console.print("Fallbacks: " + ", ".join(
+                f"{taken}: {count}" for taken, count in sorted(self.fallback.stats.items())
+            ))
+        if self.metrics:
+            self._print_latency()
+            console.print(f"Latency metrics written to: {metrics_path}")
     
-    async def _save_results(self):
-        """Save evaluation results"""
+    async def _save_results(self, order: Optional[List[str]] = None):
+        """Save evaluation results
+        
+        predictions.json is rebuilt from the results journal one record at a
+        time, so patches are never all held in memory.
+        """
         self.config.output_dir.mkdir(parents=True, exist_ok=True)
         
         # Save predictions
         predictions_file = self.config.output_dir / "predictions.json"
-        with open(predictions_file, 'w') as f:
-            json.dump(self.results, f, indent=2)
+        self.journal.write_predictions(predictions_file, order)
         
         console.print(f"Results saved to: {predictions_file}")
     
     def _print_summary(self):
         """Print evaluation summary"""
-        total = len(self.results)
-        successful = sum(1 for r in self.results if 'error' not in r)
-        validated = sum(1 for r in self.results if r.get('validation', {}).get('tests_pass', False))
-        
-        console.print("\n[bold]Evaluation Summary:[/bold]")
-        console.print(f"Total instances: {total}")
-        console.print(f"Successfully processed: {successful}")
-        console.print(f"Tests passing: {validated}")
-        console.print(f"Success rate: {validated/total*100:.1f}%")
+        print_summary(self.journal.summary())
+    
+    def _print_latency(self, top_tools: int = 5):
+        """Print where the time went: per-phase percentiles and the slowest tools"""
+        snapshot = self.metrics.snapshot()
+        console.print("\n[bold]Latency (p50 / p95 / p99):[/bold]")
+        for name, phase in snapshot['phases'].items():
+            console.print(
+                f"  {name:<10} {phase['p50']:8.2f}s {phase['p95']:8.2f}s {phase['p99']:8.2f}s  "
+                f"total {phase['sum']:.1f}s"
+            )
+        tools = sorted(snapshot['tools'].items(), key=lambda item: item[1]['sum'], reverse=True)
+        for name, tool in tools[:top_tools]:
+            console.print(
+                f"  {name:<20} {tool['count']:6d} calls {tool['p50']:7.3f}s {tool['p95']:7.3f}s "
+                f"{tool['p99']:7.3f}s  {tool['bytes_received'] / 1e6:.1f} MB in, {tool['errors']} errors"
+            )
+
+
+def print_summary(summary: Dict[str, int]):
+    """Print an evaluation summary computed from a results journal"""
+    total = summary['total']
+    
+    console.print("\n[bold]Evaluation Summary:[/bold]")
+    console.print(f"Total instances: {total}")
+    console.print(f"Successfully processed: {summary['successful']}")
+    console.print(f"Tests passing: {summary['validated']}")
+    if summary.get('tests'):
+        console.print(f"Target tests passed: {summary['tests_passed']}/{summary['tests']}")
+    console.print(f"Success rate: {summary['validated']/total*100 if total else 0:.1f}%")
+
+
+def dataset_order(dataset_name: str, store_dir: str) -> Optional[List[str]]:
+    """Instance ids in dataset order, if the dataset's instance store exists"""
+    if not InstanceStore.store_path(dataset_name, 'test', store_dir).exists():
+        return None
+    store = InstanceStore.open_or_build(dataset_name, 'test', store_dir)
+    try:
+        return store.ids()
+    finally:
+        store.close()
 
 
-@click.command()
+@click.group(invoke_without_command=True)
 @click.option('--dataset-name', default='princeton-nlp/SWE-bench_Lite', help='Dataset to evaluate')
 @click.option('--num-workers', default=4, help='Number of parallel workers')
 @click.option('--max-instances', type=int, help='Maximum number of instances to process')
@@ -450,8 +1226,19 @@ class SWEBenchEvaluator:
 @click.option('--output-dir', default='./results', help='Output directory for results')
 @click.option('--verbose', is_flag=True, help='Enable verbose logging')
 @click.option('--config', default='config.yaml', help='Path to configuration file')
-def main(dataset_name, num_workers, max_instances, agent_strategy, use_task_manager, output_dir, verbose, config):
+@click.option('--resume/--no-resume', default=None, help='Skip instances already in the results journal')
+@click.option('--repo', help='Only evaluate instances from this repository (e.g. django/django)')
+@click.option('--instance-pattern', help='Only evaluate instance ids matching this glob (e.g. "sympy__*")')
+@click.option('--instance-ids', help='Comma-separated list of instance ids to evaluate')
+@click.option('--shard', help='Only evaluate shard i/N of the instances (e.g. 0/4)')
+@click.option('--shards', type=int, default=1, help='Run N shards as local processes and merge them')
+@click.option('--servers', type=int, help='Spawn and supervise N local ACF MCP servers on free ports')
+@click.pass_context
+def main(ctx, dataset_name, num_workers, max_instances, agent_strategy, use_task_manager, output_dir, verbose, config,
+         resume, repo, instance_pattern, instance_ids, shard, shards, servers):
     """Run SWE-bench evaluation with ACF MCP integration"""
+    if ctx.invoked_subcommand is not None:
+        return
     
     # Setup logging
     if verbose:
@@ -470,6 +1257,8 @@ def main(dataset_name, num_workers, max_instances, agent_strategy, use_task_mana
         eval_config.use_task_manager = use_task_manager
         eval_config.output_dir = Path(output_dir)
         eval_config.verbose = verbose
+        if resume is not None:
+            eval_config.resume = resume
     else:
         eval_config = EvaluationConfig(
             dataset_name=dataset_name,
@@ -478,13 +1267,64 @@ def main(dataset_name, num_workers, max_instances, agent_strategy, use_task_mana
             agent_strategy=agent_strategy,
             use_task_manager=use_task_manager,
             output_dir=Path(output_dir),
-            verbose=verbose
+            verbose=verbose,
+            resume=bool(resume)
+        )
+    
+    eval_config.repo = repo
+    eval_config.instance_pattern = instance_pattern
+    eval_config.instance_ids = instance_ids.split(',') if instance_ids else None
+    if servers:
+        managed = eval_config.settings.setdefault('acf_mcp', {}).setdefault('managed', {})
+        managed.update(enabled=True, count=servers)
+    
+    if shard:
+        try:
+            index, count = parse_shard(shard)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--shard')
+        eval_config = shard_config(eval_config, index, count)
+    elif shards > 1:
+        # Supervise N local shard processes, then merge their journals
+        console.print(f"[bold green]Running {shards} shards as local processes[/bold green]")
+        for shard_summary in run_shards(eval_config, shards):
+            if 'error' in shard_summary:
+                console.print(f"[red]Shard {shard_summary['shard']} failed: {shard_summary['error']}[/red]")
+        summary = merge_shards(
+            eval_config.output_dir, shards, dataset_order(eval_config.dataset_name, eval_config.store_dir)
         )
+        console.print(f"Merged {len(summary['shards'])} shards into {eval_config.output_dir}")
+        print_summary(summary)
+        return
     
     # Run evaluation
     evaluator = SWEBenchEvaluator(eval_config)
     asyncio.run(evaluator.run())
 
 
+@main.command()
+@click.option('--output-dir', default='./results', help='Output directory containing shard-*-of-* results')
+@click.option('--dataset-name', default='princeton-nlp/SWE-bench_Lite', help='Dataset, for ordering predictions')
+@click.option('--store-dir', default='./cache/instances', help='Instance store directory')
+@click.option('--shards', type=int, help='Shard count N to merge; required if several runs share the directory')
+def merge(output_dir, dataset_name, store_dir, shards):
+    """Merge shard journals into one predictions.json and summary.json"""
+    if shards is None:
+        counts = shard_counts(Path(output_dir))
+        if len(counts) > 1:
+            raise click.UsageError(
+                f"Shards of several runs ({', '.join(f'N={n}' for n in counts)}) in {output_dir}; pick one with --shards"
+            )
+        if not counts:
+            raise click.ClickException(f"No shard journals found under {output_dir}")
+        shards = counts[0]
+    try:
+        summary = merge_shards(Path(output_dir), shards, dataset_order(dataset_name, store_dir))
+    except FileNotFoundError as e:
+        raise click.ClickException(str(e))
+    console.print(f"Merged {len(summary['shards'])} shards into {output_dir}")
+    print_summary(summary)
+
+
 if __name__ == "__main__":
     main()
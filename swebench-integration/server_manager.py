@@ -0,0 +1,281 @@
+"""
+Managed Local ACF MCP Servers
+
+Instead of relying on someone having run ``npm run start:mcp`` on port 3000,
+the runner can spawn its own ACF servers on free ports, wait until each one
+answers an MCP ping over its websocket, restart any that crash and shut them
+all down when the evaluation ends. How long every (re)start took is recorded
+so cold-start cost is visible.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import signal
+import socket
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+DEFAULT_COMMAND = ["npm", "run", "--silent", "start:mcp"]
+
+
+class ServerStartError(RuntimeError):
+    """Raised when a managed ACF server does not become ready"""
+
+
+@dataclass
+class ManagedServer:
+    """One supervised ACF server process"""
+    index: int
+    port: int
+    process: Optional[asyncio.subprocess.Process] = None
+    startup_seconds: List[float] = field(default_factory=list)
+    restarts: int = 0
+    failed: bool = False
+    monitor: Optional[asyncio.Task] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+
+class ACFServerManager:
+    """Spawn and supervise ``count`` ACF MCP servers on free local ports
+
+    ``command`` is run from the ACF project root with ``{port}`` substituted
+    in its arguments and ``PORT``/``ACF_MCP_PORT`` exported. Each server runs
+    in its own process group so npm and node children are stopped together.
+    """
+
+    def __init__(
+        self,
+        command: Optional[List[str]] = None,
+        count: int = 1,
+        host: str = "localhost",
+        cwd: Optional[str] = None,
+        startup_timeout: float = 60,
+        restart_attempts: int = 3,
+        shutdown_timeout: float = 10,
+        log_dir: Optional[str] = None,
+    ):
+        self.command = list(command or DEFAULT_COMMAND)
+        self.count = max(1, count)
+        self.host = host
+        self.cwd = Path(cwd) if cwd else Path(__file__).resolve().parent.parent
+        self.startup_timeout = startup_timeout
+        self.restart_attempts = max(0, restart_attempts)
+        self.shutdown_timeout = shutdown_timeout
+        self.log_dir = Path(log_dir) if log_dir else None
+        self.servers: List[ManagedServer] = []
+        self._closing = False
+        self._round_robin = itertools.count()
+
+    @classmethod
+    def from_config(cls, settings: Dict) -> Optional["ACFServerManager"]:
+        """Create a manager from acf_mcp.managed, or None when servers are external"""
+        acf_settings = settings.get('acf_mcp', {})
+        managed = acf_settings.get('managed', {})
+        if not managed.get('enabled', False):
+            return None
+        return cls(
+            command=managed.get('command'),
+            count=managed.get('count', 1),
+            host=acf_settings.get('host', 'localhost'),
+            startup_timeout=managed.get('startup_timeout', 60),
+            restart_attempts=managed.get('restart_attempts', 3),
+            shutdown_timeout=managed.get('shutdown_timeout', 10),
+            log_dir=managed.get('log_dir'),
+        )
+
+    # -- ports and readiness --------------------------------------------------
+
+    def _free_port(self) -> int:
+        """Ask the OS for a currently unused TCP port"""
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind((self.host, 0))
+            return sock.getsockname()[1]
+
+    async def _handshake(self, port: int, timeout: float) -> bool:
+        """True once the server completes a websocket MCP ping round trip"""
+        import websockets
+        try:
+            async with websockets.connect(f"ws://{self.host}:{port}", open_timeout=timeout) as ws:
+                await ws.send(json.dumps({"jsonrpc": "2.0", "id": 0, "method": "ping", "params": {}}))
+                reply = json.loads(await asyncio.wait_for(ws.recv(), timeout))
+                return reply.get("id") == 0
+        except (OSError, asyncio.TimeoutError, ValueError, websockets.exceptions.WebSocketException):
+            return False
+
+    # -- process lifecycle ------------------------------------------------------
+
+    async def _spawn(self, server: ManagedServer):
+        command = [arg.replace("{port}", str(server.port)) for arg in self.command]
+        env = {**os.environ, "PORT": str(server.port), "ACF_MCP_PORT": str(server.port)}
+        if self.log_dir:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            output = open(self.log_dir / f"acf-server-{server.index}.log", 'ab')
+        else:
+            output = asyncio.subprocess.DEVNULL
+        try:
+            server.process = await asyncio.create_subprocess_exec(
+                *command,
+                cwd=str(self.cwd),
+                env=env,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=output,
+                stderr=asyncio.subprocess.STDOUT,
+                start_new_session=True,
+            )
+        except OSError as e:
+            raise ServerStartError(f"Could not launch {' '.join(command)}: {e}")
+        finally:
+            if output is not asyncio.subprocess.DEVNULL:
+                output.close()
+
+    async def _start(self, server: ManagedServer):
+        """Launch a server and wait until it answers, timing the cold start"""
+        started = time.monotonic()
+        deadline = started + self.startup_timeout
+        await self._spawn(server)
+        delay = 0.05
+        while True:
+            if not server.alive:
+                raise ServerStartError(
+                    f"ACF server {server.index} exited with code {server.process.returncode} during startup"
+                )
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                await self._stop(server)
+                raise ServerStartError(
+                    f"ACF server {server.index} not ready on port {server.port} after {self.startup_timeout}s"
+                )
+            if await self._handshake(server.port, min(5.0, remaining)):
+                break
+            await asyncio.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+            delay = min(delay * 2, 1.0)
+
+        elapsed = time.monotonic() - started
+        server.startup_seconds.append(elapsed)
+        logger.info(f"ACF server {server.index} ready on port {server.port} in {elapsed:.2f}s")
+        server.monitor = asyncio.create_task(self._supervise(server))
+
+    async def _start_on_free_port(self, server: ManagedServer, attempts: int = 3):
+        """Start a server, moving to a fresh port if the first one was taken meanwhile"""
+        for attempt in range(1, attempts + 1):
+            try:
+                await self._start(server)
+                return
+            except ServerStartError as e:
+                if attempt == attempts:
+                    raise
+                logger.warning(f"{e}; retrying on a new port")
+                server.port = self._free_port()
+
+    async def _supervise(self, server: ManagedServer):
+        """Restart the server if it exits while the manager is running
+
+        Restarts stay on the server's port: pooled clients hold that
+        endpoint and reconnect to it in place. A server that cannot get its
+        port back is marked failed rather than moved, so no client is left
+        pointing at a port nobody listens on.
+        """
+        returncode = await server.process.wait()
+        if self._closing:
+            return
+        delay = 0.5
+        while server.restarts < self.restart_attempts and not self._closing:
+            server.restarts += 1
+            logger.warning(
+                f"ACF server {server.index} on port {server.port} exited with code {returncode}; "
+                f"restart {server.restarts}/{self.restart_attempts}"
+            )
+            try:
+                await self._start(server)
+                return
+            except ServerStartError as e:
+                logger.error(str(e))
+                returncode = server.process.returncode if server.process else None
+            if server.restarts < self.restart_attempts:
+                # The old socket may take a moment to release the port
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5.0)
+        if not self._closing:
+            server.failed = True
+            logger.error(f"ACF server {server.index} failed permanently after {server.restarts} restarts")
+
+    async def _stop(self, server: ManagedServer):
+        """SIGTERM the server's process group, escalating to SIGKILL"""
+        process = server.process
+        if process is None or process.returncode is not None:
+            return
+        for sig, wait in ((signal.SIGTERM, self.shutdown_timeout), (signal.SIGKILL, None)):
+            try:
+                os.killpg(process.pid, sig)
+            except ProcessLookupError:
+                return
+            try:
+                await asyncio.wait_for(process.wait(), wait)
+                return
+            except asyncio.TimeoutError:
+                logger.warning(f"ACF server {server.index} ignored SIGTERM; killing it")
+
+    # -- public API -----------------------------------------------------------
+
+    async def start(self):
+        """Start every server concurrently; raises ServerStartError if any fails"""
+        self._closing = False
+        self.servers = [ManagedServer(index, self._free_port()) for index in range(self.count)]
+        results = await asyncio.gather(
+            *(self._start_on_free_port(server) for server in self.servers), return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            await self.close()
+            raise ServerStartError("; ".join(str(error) for error in errors))
+
+    def endpoints(self) -> List[Tuple[str, int]]:
+        """(host, port) of every server that has not permanently failed"""
+        return [(self.host, server.port) for server in self.servers if not server.failed]
+
+    def next_endpoint(self) -> Tuple[str, int]:
+        """Spread new connections across the servers round-robin"""
+        endpoints = self.endpoints()
+        if not endpoints:
+            raise ServerStartError("No managed ACF servers are running")
+        return endpoints[next(self._round_robin) % len(endpoints)]
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-server ports, startup timings and restart counts"""
+        startups = [seconds for server in self.servers for seconds in server.startup_seconds]
+        return {
+            "servers": [
+                {
+                    "index": server.index,
+                    "port": server.port,
+                    "pid": server.process.pid if server.process else None,
+                    "alive": server.alive,
+                    "restarts": server.restarts,
+                    "startup_seconds": server.startup_seconds,
+                }
+                for server in self.servers
+            ],
+            "startups": len(startups),
+            "avg_startup_seconds": sum(startups) / len(startups) if startups else 0.0,
+            "max_startup_seconds": max(startups, default=0.0),
+            "restarts": sum(server.restarts for server in self.servers),
+        }
+
+    async def close(self):
+        """Stop supervising and shut every server down"""
+        self._closing = True
+        monitors = [server.monitor for server in self.servers if server.monitor]
+        await asyncio.gather(*(self._stop(server) for server in self.servers))
+        for monitor in monitors:
+            monitor.cancel()
+        await asyncio.gather(*monitors, return_exceptions=True)
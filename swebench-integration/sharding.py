@@ -0,0 +1,155 @@
+"""
+Sharded Evaluation Across Processes and Machines
+
+Instances are partitioned deterministically by a hash of their instance_id,
+so any process (on any machine sharing the output filesystem) can run
+``--shard i/N`` independently. Each shard writes its own results journal;
+``merge`` combines the N shard journals into one predictions.json and
+summary.
+"""
+
+import copy
+import dataclasses
+import hashlib
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from instance_store import InstanceStore
+from results_journal import ResultsJournal
+
+
+def shard_of(instance_id: str, shard_count: int) -> int:
+    """Shard that owns an instance; stable across processes and machines"""
+    digest = hashlib.sha1(instance_id.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Parse an ``i/N`` shard spec (0-based index)"""
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard spec {spec!r}, expected i/N (e.g. 0/4)")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard spec {spec!r}, need 0 <= i < N")
+    return index, count
+
+
+def shard_dir(output_dir: Path, index: int, count: int) -> Path:
+    return Path(output_dir) / f"shard-{index}-of-{count}"
+
+
+def shard_config(config, index: int, count: int):
+    """Copy of an EvaluationConfig for one shard
+
+    The shard gets its own output and metrics directories and live metrics
+    port. It keeps ``acf_mcp.port``: shards share an external server (which
+    keeps a workspace per connection), and managed servers pick free ports
+    of their own.
+    """
+    settings = copy.deepcopy(config.settings)
+    metrics_settings = settings.get('logging', {}).get('metrics')
+    if metrics_settings:
+        metrics_settings['export_path'] = str(
+            shard_dir(metrics_settings.get('export_path', './metrics'), index, count)
+        )
+        if metrics_settings.get('prometheus_port'):
+            metrics_settings['prometheus_port'] += index
+    return dataclasses.replace(
+        config,
+        shard_index=index,
+        shard_count=count,
+        output_dir=shard_dir(config.output_dir, index, count),
+        settings=settings,
+    )
+
+
+def _run_shard(config) -> Dict[str, Any]:
+    """Process-pool entry point: evaluate one shard and summarize it"""
+    import asyncio
+    from run_evaluation import SWEBenchEvaluator
+
+    evaluator = SWEBenchEvaluator(config)
+    asyncio.run(evaluator.run())
+    return {"shard": config.shard_index, **evaluator.journal.summary()}
+
+
+def run_shards(config, shard_count: int) -> List[Dict[str, Any]]:
+    """Run every shard of an evaluation in its own local process
+
+    The instance store is built here first, so the shards only open it
+    instead of racing to convert the dataset.
+    """
+    InstanceStore.open_or_build(config.dataset_name, 'test', config.store_dir).close()
+    configs = [shard_config(config, index, shard_count) for index in range(shard_count)]
+    summaries = []
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=shard_count, mp_context=context) as executor:
+        futures = {executor.submit(_run_shard, shard): shard.shard_index for shard in configs}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                summaries.append(future.result())
+                logger.info(f"Shard {index}/{shard_count} finished")
+            except Exception as e:
+                logger.error(f"Shard {index}/{shard_count} failed: {e}")
+                summaries.append({"shard": index, "error": str(e)})
+    return sorted(summaries, key=lambda summary: summary["shard"])
+
+
+def shard_counts(output_dir: Path) -> List[int]:
+    """Shard counts N that have ``shard-i-of-N`` directories under output_dir"""
+    counts = set()
+    for path in Path(output_dir).glob("shard-*-of-*"):
+        count = path.name.rsplit('-', 1)[-1]
+        if count.isdigit():
+            counts.add(int(count))
+    return sorted(counts)
+
+
+def merge_shards(
+    output_dir: Path,
+    shard_count: int,
+    order: Optional[Iterable[str]] = None,
+) -> Dict[str, Any]:
+    """Combine the journals of an N-shard run into results.jsonl, predictions.json and summary.json
+
+    Only ``shard-i-of-N`` directories of the given N are merged, so
+    leftovers of an earlier run with a different shard count are not
+    counted twice. Records are streamed one at a time, so merging never
+    holds more than a single result in memory.
+    """
+    output_dir = Path(output_dir)
+    shard_journals = []
+    for index in range(shard_count):
+        path = shard_dir(output_dir, index, shard_count) / "results.jsonl"
+        if path.exists():
+            shard_journals.append(path)
+        else:
+            logger.warning(f"Shard {index}/{shard_count} has no journal at {path}")
+    if not shard_journals:
+        raise FileNotFoundError(f"No shard-*-of-{shard_count} journals found under {output_dir}")
+
+    merged = ResultsJournal(output_dir / "results.jsonl")
+    merged.reset()
+    merged.open()
+    per_shard = {}
+    for path in shard_journals:
+        count = 0
+        shard = ResultsJournal(path)
+        for record in shard:
+            # Artifacts move into the merged sidecar at new offsets
+            merged.append(shard.full_result(record))
+            count += 1
+        per_shard[path.parent.name] = count
+    merged.close()
+
+    written = merged.write_predictions(output_dir / "predictions.json", order)
+    summary = {**merged.summary(), "predictions": written, "shards": per_shard}
+    (output_dir / "summary.json").write_text(json.dumps(summary, indent=2))
+    return summary
@@ -0,0 +1,469 @@
+"""
+Persistent Symbol Index for Code Localization
+
+Parses every Python file of a repository snapshot once with ``ast`` and maps
+functions, classes, methods and imports to file:line, so localization becomes
+dictionary lookups instead of repeated ``search_code`` calls. Indexes are
+stored per (repo, base_commit) and shared by every instance of the same
+snapshot; an index for a new commit reuses the records of unchanged files
+from an earlier one, and edits during an instance only reparse the edited
+files.
+"""
+
+import ast
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import subprocess
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from loguru import logger
+
+
+INDEX_VERSION = 1
+
+IDENTIFIER = re.compile(r'`?([A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*)(`|\()?')
+
+# Django-style test ids: "test_name (package.module.TestCase)"
+UNITTEST_ID = re.compile(r'^(\w+) \(([\w.]+)\)')
+
+
+class Symbol(NamedTuple):
+    """A definition in the index; ``name`` is qualified (``Class.method``)"""
+    name: str
+    kind: str
+    path: str
+    line: int
+    end_line: int
+
+
+def is_test_file(path: str) -> bool:
+    parts = path.split('/')
+    name = parts[-1]
+    return (
+        name.startswith('test_') or name.endswith('_test.py') or name == 'tests.py'
+        or any(part in ('test', 'tests', 'testing') for part in parts[:-1])
+    )
+
+
+def _dotted(path: str) -> List[str]:
+    parts = path[:-3].split('/')
+    return parts[:-1] if parts[-1] == '__init__' else parts
+
+
+def _content_hash(data: bytes) -> str:
+    # Same digest as ``git hash-object`` so records stay comparable with git's
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def parse_source(source: bytes, path: str, digest: str) -> Dict:
+    """Index record of one file: definitions and absolute imported names"""
+    record = {"hash": digest, "defs": [], "imports": []}
+    try:
+        tree = ast.parse(source, filename=path)
+    except (SyntaxError, ValueError):
+        return record
+    package = _dotted(path) if path.endswith('__init__.py') else _dotted(path)[:-1]
+
+    def visit(nodes, prefix: str, in_class: bool):
+        for node in nodes:
+            if isinstance(node, ast.ClassDef):
+                name = prefix + node.name
+                record["defs"].append([name, "class", node.lineno, getattr(node, 'end_lineno', node.lineno)])
+                visit(node.body, name + '.', True)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                record["defs"].append([prefix + node.name, "method" if in_class else "function",
+                                       node.lineno, getattr(node, 'end_lineno', node.lineno)])
+            elif isinstance(node, ast.Import):
+                record["imports"].extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                base = node.module or ''
+                if node.level:
+                    parent = package[:len(package) - node.level + 1] if node.level > 1 else package
+                    base = '.'.join(filter(None, ['.'.join(parent), base]))
+                record["imports"].extend(f"{base}.{alias.name}" if base else alias.name for alias in node.names)
+            elif isinstance(node, (ast.If, ast.Try)):
+                # Conditional definitions and imports (TYPE_CHECKING, fallbacks)
+                branches = [node.body, node.orelse, getattr(node, 'finalbody', [])]
+                branches.extend(handler.body for handler in getattr(node, 'handlers', []))
+                for branch in branches:
+                    visit(branch, prefix, in_class)
+
+    visit(tree.body, '', False)
+    return record
+
+
+def _parse_batch(root: str, items: List[Tuple[str, str]]) -> List[Tuple[str, Dict]]:
+    """Process-pool entry point: parse a batch of (path, hash) pairs"""
+    records = []
+    for path, digest in items:
+        try:
+            source = (Path(root) / path).read_bytes()
+        except OSError:
+            continue
+        records.append((path, parse_source(source, path, digest)))
+    return records
+
+
+class SymbolIndex:
+    """Symbols of one repository snapshot, with dictionary lookups
+
+    ``files`` maps repo-relative paths to their records. Records are never
+    mutated, so indexes derived with ``updated`` or for later commits share
+    the records of unchanged files.
+    """
+
+    def __init__(self, repo: str, commit: str, files: Dict[str, Dict]):
+        self.repo = repo
+        self.commit = commit
+        self.files = files
+        self._modules: Dict[str, str] = {}
+        definitions: Dict[str, List[Symbol]] = {}
+        for path, record in files.items():
+            for name, kind, line, end_line in record["defs"]:
+                symbol = Symbol(name, kind, path, line, end_line)
+                for key in {name, name.rsplit('.', 1)[-1]}:
+                    definitions.setdefault(key, []).append(symbol)
+            for module in self._module_names(path):
+                self._modules.setdefault(module, path)
+        self._definitions: Dict[str, Tuple[Symbol, ...]] = {
+            key: tuple(symbols) for key, symbols in definitions.items()
+        }
+
+    def _module_names(self, path: str) -> List[str]:
+        """Dotted names a file is importable as: from the repo root, and from
+        its top-most package (skipping source roots such as ``src/``)"""
+        parts = _dotted(path)
+        names = ['.'.join(parts)]
+        start = 0
+        while start < len(parts) - 1 and '/'.join(parts[:start + 1]) + '/__init__.py' not in self.files:
+            start += 1
+            names.append('.'.join(parts[start:]))
+        return [name for name in names if name]
+
+    def _add(self, path: str, record: Dict):
+        for name, kind, line, end_line in record["defs"]:
+            symbol = Symbol(name, kind, path, line, end_line)
+            for key in {name, name.rsplit('.', 1)[-1]}:
+                # Tuples are replaced, never extended, so derived indexes can share them
+                self._definitions[key] = self._definitions.get(key, ()) + (symbol,)
+        for module in self._module_names(path):
+            self._modules.setdefault(module, path)
+
+    def _remove(self, path: str, record: Dict):
+        for name, *_ in record["defs"]:
+            for key in {name, name.rsplit('.', 1)[-1]}:
+                remaining = tuple(s for s in self._definitions.get(key, ()) if s.path != path)
+                if remaining:
+                    self._definitions[key] = remaining
+                else:
+                    self._definitions.pop(key, None)
+        for module in self._module_names(path):
+            if self._modules.get(module) == path:
+                del self._modules[module]
+
+    # -- lookups --------------------------------------------------------------
+
+    def find(self, name: str) -> Tuple[Symbol, ...]:
+        """Definitions of ``name``, given plain (``method``) or qualified
+        (``Class.method``, ``package.module.func``)"""
+        found = self._definitions.get(name)
+        if found is None and '.' in name:
+            parts = name.split('.')
+            found = self._definitions.get('.'.join(parts[-2:]))
+            if found is None:
+                # ``module.func``: only definitions from that module
+                module = self.module_path('.'.join(parts[:-1]))
+                found = tuple(s for s in self._definitions.get(parts[-1], ()) if s.path == module)
+        return found or ()
+
+    def module_path(self, module: str) -> Optional[str]:
+        """File of a dotted module name, if it belongs to the repository"""
+        return self._modules.get(module)
+
+    def resolve_import(self, name: str) -> Optional[str]:
+        """File providing an imported name (``pkg.mod`` or ``pkg.mod.attr``)"""
+        while name:
+            path = self._modules.get(name)
+            if path is not None:
+                return path
+            name = name.rpartition('.')[0]
+        return None
+
+    def imports_of(self, path: str) -> List[str]:
+        """Repository files imported by ``path``"""
+        record = self.files.get(path)
+        if record is None:
+            return []
+        resolved = (self.resolve_import(name) for name in record["imports"])
+        return list(dict.fromkeys(p for p in resolved if p is not None and p != path))
+
+    def test_location(self, test_id: str) -> Tuple[Optional[str], Optional[Symbol]]:
+        """File and definition of a FAIL_TO_PASS / PASS_TO_PASS test id"""
+        if '::' in test_id:
+            parts = test_id.split('::')
+            name = re.sub(r'\[.*$', '', parts[-1])
+            path = parts[0] if parts[0] in self.files else None
+            candidates = self.find('.'.join(parts[1:-1] + [name]) if len(parts) > 2 else name)
+        else:
+            match = UNITTEST_ID.match(test_id)
+            name, dotted = (match.group(1), match.group(2)) if match else (test_id.strip(), '')
+            path = None
+            while dotted and path is None:
+                path = self.module_path(dotted)
+                dotted = dotted.rpartition('.')[0]
+            candidates = self.find(name)
+        if path is not None:
+            candidates = tuple(s for s in candidates if s.path == path)
+        else:
+            candidates = tuple(s for s in candidates if is_test_file(s.path))
+        symbol = candidates[0] if candidates else None
+        return (path or (symbol.path if symbol else None)), symbol
+
+    def identifiers(self, text: str, max_definitions: int = 3) -> List[str]:
+        """Names in free text that are defined in this repository
+
+        Every word of the text is looked up; names with more than
+        ``max_definitions`` non-test definitions (``__init__``, ``get``) are
+        too ambiguous to localize and dropped. Code-like mentions (in
+        backticks, called, dotted or snake_case) rank first, then by count.
+        """
+        counts: Counter = Counter()
+        code_like = set()
+        for match in IDENTIFIER.finditer(text or ''):
+            name = match.group(1).strip('.')
+            if len(name) < 3:
+                continue
+            if '.' in name and not self.find(name):
+                # ``obj.method`` on an instance: look the method up on its own
+                name = name.rsplit('.', 1)[-1]
+            counts[name] += 1
+            if match.group(2) or match.group(0).startswith('`') or '.' in match.group(1) or '_' in name.strip('_'):
+                code_like.add(name)
+        found = []
+        for name, count in counts.items():
+            definitions = [s for s in self.find(name) if not is_test_file(s.path)]
+            if 0 < len(definitions) <= max_definitions:
+                found.append((name not in code_like, -count, name))
+        return [name for *_, name in sorted(found)]
+
+    def locate(self, test_ids: Iterable[str], text: str = "", limit: int = 10) -> List[Symbol]:
+        """Likely implementation sites for failing tests and a problem statement
+
+        Definitions named in the text come first, preferring those in modules
+        the failing tests import; names of the failing tests minus their
+        ``test_`` prefix are tried next. When nothing is named, the imported
+        modules themselves are returned.
+        """
+        test_paths = []
+        names = self.identifiers(text)
+        for test_id in test_ids:
+            path, symbol = self.test_location(test_id)
+            if path is not None and path not in test_paths:
+                test_paths.append(path)
+            if symbol is not None:
+                stem = symbol.name.rsplit('.', 1)[-1]
+                stem = stem[5:] if stem.startswith('test_') else stem
+                if stem and stem not in names:
+                    names.append(stem)
+        imported = [p for t in test_paths for p in self.imports_of(t) if not is_test_file(p)]
+        rank = {path: index for index, path in enumerate(dict.fromkeys(imported))}
+
+        located: List[Symbol] = []
+        for name in names:
+            definitions = [s for s in self.find(name) if not is_test_file(s.path)]
+            definitions.sort(key=lambda s: rank.get(s.path, len(rank)))
+            located.extend(s for s in definitions if s not in located)
+        if not located:
+            located = [Symbol(path, "module", path, 1, 1) for path in rank]
+        return located[:limit]
+
+    # -- incremental updates --------------------------------------------------
+
+    def updated(self, workspace: str, paths: Iterable[str]) -> "SymbolIndex":
+        """A copy of the index with ``paths`` reparsed from the workspace
+
+        The shared snapshot index stays untouched; only the lookup entries
+        of the edited files are rebuilt.
+        """
+        derived = SymbolIndex.__new__(SymbolIndex)
+        derived.repo, derived.commit = self.repo, self.commit
+        derived.files = dict(self.files)
+        derived._definitions = dict(self._definitions)
+        derived._modules = dict(self._modules)
+        root = Path(workspace)
+        for path in paths:
+            path = os.path.relpath(path, root) if os.path.isabs(path) else path
+            if not path.endswith('.py'):
+                continue
+            old = derived.files.pop(path, None)
+            if old is not None:
+                derived._remove(path, old)
+            try:
+                source = (root / path).read_bytes()
+            except OSError:
+                continue
+            record = parse_source(source, path, _content_hash(source))
+            derived.files[path] = record
+            derived._add(path, record)
+        return derived
+
+    # -- persistence ----------------------------------------------------------
+
+    def to_json(self) -> Dict:
+        return {"version": INDEX_VERSION, "repo": self.repo, "commit": self.commit, "files": self.files}
+
+    @classmethod
+    def from_json(cls, data: Dict) -> Optional["SymbolIndex"]:
+        if data.get("version") != INDEX_VERSION:
+            return None
+        return cls(data["repo"], data["commit"], data["files"])
+
+
+class SymbolIndexer:
+    """Build, cache and share symbol indexes per (repo, base_commit)
+
+    Indexes are built from a local checkout of the snapshot (the instance's
+    workspace) and kept on disk under ``cache_dir``; the ``max_in_memory``
+    most recently used ones stay loaded for the instances that follow.
+    """
+
+    def __init__(self, cache_dir: str = "./cache/symbols", max_in_memory: int = 8, build_workers: int = 0):
+        self.cache_dir = Path(cache_dir)
+        self.max_in_memory = max(1, max_in_memory)
+        self.build_workers = build_workers or os.cpu_count() or 1
+        self._indexes: "OrderedDict[str, SymbolIndex]" = OrderedDict()
+        self._build_locks: Dict[str, asyncio.Lock] = {}
+        self.stats = {"builds": 0, "loads": 0, "hits": 0, "files_parsed": 0, "files_reused": 0}
+
+    @classmethod
+    def from_config(cls, settings: Dict) -> Optional["SymbolIndexer"]:
+        """Create an indexer when agent.tools.symbol_index is enabled"""
+        symbol_index = settings.get('agent', {}).get('tools', {}).get('symbol_index', {})
+        if not symbol_index.get('enabled', False):
+            return None
+        return cls(
+            cache_dir=symbol_index.get('cache_dir', './cache/symbols'),
+            max_in_memory=symbol_index.get('max_in_memory', 8),
+            build_workers=symbol_index.get('build_workers', 0),
+        )
+
+    def _index_path(self, repo: str, commit: str) -> Path:
+        return self.cache_dir / repo.replace('/', '__') / f"{commit}.json"
+
+    @staticmethod
+    def _file_hashes(root: Path) -> Dict[str, str]:
+        """Blob hash of every Python file, from git's index when available"""
+        try:
+            listing = subprocess.run(
+                ["git", "ls-files", "-s", "-z", "--", "*.py"],
+                cwd=root, capture_output=True, check=True,
+            ).stdout.decode('utf-8', errors='surrogateescape')
+            hashes = {}
+            for entry in filter(None, listing.split('\0')):
+                meta, path = entry.split('\t', 1)
+                hashes[path] = meta.split()[1]
+            return hashes
+        except (OSError, subprocess.CalledProcessError):
+            pass
+        hashes = {}
+        for directory, subdirs, names in os.walk(root):
+            subdirs[:] = [d for d in subdirs if not d.startswith('.')]
+            for name in names:
+                if name.endswith('.py'):
+                    full = Path(directory) / name
+                    hashes[full.relative_to(root).as_posix()] = _content_hash(full.read_bytes())
+        return hashes
+
+    def _parse(self, root: Path, pending: List[Tuple[str, str]]) -> List[Tuple[str, Dict]]:
+        """Parse changed files, across processes when there are many"""
+        workers = min(self.build_workers, len(pending) // 64)
+        if workers <= 1:
+            return _parse_batch(str(root), pending)
+        batches = [pending[i::workers * 4] for i in range(workers * 4)]
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            return [item for batch in executor.map(_parse_batch, [str(root)] * len(batches), batches)
+                    for item in batch]
+
+    def _build(self, repo: str, commit: str, root: Path, base: Optional[SymbolIndex]) -> SymbolIndex:
+        previous = base.files if base else {}
+        files, pending = {}, []
+        for path, digest in self._file_hashes(root).items():
+            record = previous.get(path)
+            if record is not None and record["hash"] == digest:
+                files[path] = record
+            else:
+                pending.append((path, digest))
+        self.stats["files_reused"] += len(files)
+        self.stats["files_parsed"] += len(pending)
+        files.update(self._parse(root, pending))
+        return SymbolIndex(repo, commit, files)
+
+    def _load(self, path: Path) -> Optional[SymbolIndex]:
+        try:
+            return SymbolIndex.from_json(json.loads(path.read_text()))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable symbol index {path}: {e}")
+            return None
+
+    def _base_for(self, repo: str) -> Optional[SymbolIndex]:
+        """Most recent index of the same repository to build incrementally from"""
+        for index in reversed(self._indexes.values()):
+            if index.repo == repo:
+                return index
+        repo_dir = self._index_path(repo, "_").parent
+        candidates = sorted(repo_dir.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+        return self._load(candidates[0]) if candidates else None
+
+    def _remember(self, key: str, index: SymbolIndex):
+        self._indexes[key] = index
+        self._indexes.move_to_end(key)
+        while len(self._indexes) > self.max_in_memory:
+            self._indexes.popitem(last=False)
+
+    def _load_or_build(self, repo: str, commit: str, root: Path) -> SymbolIndex:
+        path = self._index_path(repo, commit)
+        index = self._load(path) if path.exists() else None
+        if index is not None:
+            self.stats["loads"] += 1
+            return index
+        base = self._base_for(repo)
+        logger.info(f"Building symbol index for {repo}@{commit}"
+                    + (f" from {base.commit}" if base is not None else ""))
+        index = self._build(repo, commit, root, base)
+        self.stats["builds"] += 1
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(index.to_json(), separators=(',', ':')))
+        os.replace(tmp_path, path)
+        return index
+
+    async def load_or_build(self, repo: str, commit: str, workspace: str) -> Optional[SymbolIndex]:
+        """Index of a repo snapshot, or None when the workspace is not local"""
+        key = f"{repo}@{commit}"
+        index = self._indexes.get(key)
+        if index is not None:
+            self.stats["hits"] += 1
+            self._indexes.move_to_end(key)
+            return index
+        root = Path(workspace)
+        if not root.is_dir():
+            return None
+
+        lock = self._build_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(key)
+            if index is None:
+                # Parsing a large repository takes seconds; keep the loop free
+                index = await asyncio.get_running_loop().run_in_executor(
+                    None, self._load_or_build, repo, commit, root
+                )
+                self._remember(key, index)
+        return index
@@ -0,0 +1,163 @@
+"""
+Background Queue for Task-Manager Bookkeeping
+
+``initProject``, ``addTask``, ``addSubtask`` and ``updateStatus`` record
+progress in ACF's task manager, but nothing on an instance's critical path
+reads their results. The queue takes these writes without waiting, sends
+them in submission order from a background task, and coalesces repeated
+status updates of the same task that have not been sent yet. A write that
+needs an earlier one's result (a subtask's ``parentId``) takes its
+``TaskRef`` as the parameter value.
+"""
+
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from loguru import logger
+
+from json_codec import tool_result
+
+
+class TaskRef:
+    """Handle to a queued call; as a parameter it stands for the id it created"""
+
+    __slots__ = ("tool", "params", "result", "error", "done")
+
+    def __init__(self, tool: str, params: Dict[str, Any]):
+        self.tool = tool
+        self.params = params
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.done = False
+
+    @property
+    def id(self) -> Any:
+        """``taskId`` of addTask, ``subtaskId`` of addSubtask, else ``id``"""
+        if not self.result:
+            return None
+        for key in ("taskId", "subtaskId", "id"):
+            if self.result.get(key) is not None:
+                return self.result[key]
+        return None
+
+
+def settle_task_refs(step: Dict[str, Any]):
+    """Replace the TaskRefs in a step result by what they resolved to
+
+    Once the queue is closed, ``result`` becomes the created task id (or
+    None) with an ``error`` if the call failed, and TaskRef params become
+    ids, so the step serializes as plain data.
+    """
+    ref = step.get("result")
+    if isinstance(ref, TaskRef):
+        step["result"] = ref.id
+        step["status"] = "complete" if ref.done and ref.error is None else "failed"
+        if ref.error is not None:
+            step["error"] = ref.error
+        elif not ref.done:
+            step["error"] = "dropped before it was sent"
+    params = step.get("params")
+    if isinstance(params, dict):
+        step["params"] = {
+            key: value.id if isinstance(value, TaskRef) else value for key, value in params.items()
+        }
+
+
+class TaskQueue:
+    """Per-instance, order-preserving background queue of task-manager writes"""
+
+    TOOLS = frozenset({"initProject", "addTask", "addSubtask", "updateStatus", "updateTask"})
+
+    # Writes to the same task id that replace each other while still queued
+    COALESCED = frozenset({"updateStatus", "updateTask"})
+
+    def __init__(self, acf_client, flush_timeout: float = 30.0):
+        self.acf = acf_client
+        self.flush_timeout = flush_timeout
+        self._pending: Deque[TaskRef] = deque()
+        self._worker: Optional[asyncio.Task] = None
+        self.stats = {"submitted": 0, "sent": 0, "coalesced": 0, "failed": 0, "dropped": 0}
+
+    @classmethod
+    def from_config(cls, acf_client, settings: Dict) -> "TaskQueue":
+        bookkeeping = settings.get('task_management', {}).get('bookkeeping', {})
+        return cls(acf_client, flush_timeout=bookkeeping.get('flush_timeout', 30.0))
+
+    def submit(self, tool: str, params: Dict[str, Any]) -> TaskRef:
+        """Queue a write and return immediately"""
+        self.stats["submitted"] += 1
+        if tool in self.COALESCED:
+            # The head of the queue may already be in flight
+            for queued in list(self._pending)[1:]:
+                if queued.tool == tool and self._same_task(queued.params.get('id'), params.get('id')):
+                    queued.params.update(params)
+                    self.stats["coalesced"] += 1
+                    return queued
+        ref = TaskRef(tool, dict(params))
+        self._pending.append(ref)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.ensure_future(self._drain())
+        return ref
+
+    @staticmethod
+    def _same_task(a: Any, b: Any) -> bool:
+        if isinstance(a, TaskRef) or isinstance(b, TaskRef):
+            return a is b
+        return a is not None and a == b
+
+    def _resolve(self, ref: TaskRef) -> Optional[Dict[str, Any]]:
+        """Replace TaskRef params with their ids; None if one of them failed"""
+        params = {}
+        for key, value in ref.params.items():
+            if isinstance(value, TaskRef):
+                if value.id is None:
+                    return None
+                value = value.id
+            params[key] = value
+        return params
+
+    async def _drain(self):
+        while self._pending:
+            ref = self._pending[0]
+            params = self._resolve(ref)
+            try:
+                if params is None:
+                    ref.error = "depends on a failed task-manager call"
+                    self.stats["dropped"] += 1
+                else:
+                    ref.result = tool_result(await self.acf.call_tool(ref.tool, params))
+                    if ref.result.get('success') is False:
+                        raise RuntimeError(ref.result.get('message') or f"{ref.tool} failed")
+                    self.stats["sent"] += 1
+            except Exception as e:
+                ref.error = str(e)
+                self.stats["failed"] += 1
+                logger.debug(f"Task-manager {ref.tool} failed: {e}")
+            finally:
+                ref.done = True
+                self._pending.popleft()
+
+    async def flush(self):
+        """Wait until every queued write has been sent"""
+        while self._worker is not None and not self._worker.done():
+            await asyncio.shield(self._worker)
+
+    async def close(self):
+        """Flush within ``flush_timeout``, dropping whatever is still queued
+
+        Called before the instance's session goes back to the pool, so no
+        write can land in the next instance's workspace.
+        """
+        try:
+            await asyncio.wait_for(self.flush(), self.flush_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Dropping {len(self._pending)} task-manager writes after {self.flush_timeout}s")
+        if self._worker is not None and not self._worker.done():
+            self.stats["dropped"] += len(self._pending)
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._pending.clear()
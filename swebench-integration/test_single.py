@@ -12,7 +12,6 @@ import sys
 from pathlib import Path
 
 import click
-from datasets import load_dataset
 from loguru import logger
 from rich.console import Console
 from rich.panel import Panel
@@ -20,12 +19,19 @@ from rich.syntax import Syntax
 
 # Import from main evaluation script
 sys.path.insert(0, str(Path(__file__).parent))
+from instance_store import InstanceStore
 from run_evaluation import ACFMCPClient, SWEBenchAgent
+from server_manager import ACFServerManager, ServerStartError
 
 console = Console()
 
 
-async def test_single_instance(instance_id: str, dataset_name: str = "princeton-nlp/SWE-bench_Lite", verbose: bool = False):
+async def test_single_instance(
+    instance_id: str,
+    dataset_name: str = "princeton-nlp/SWE-bench_Lite",
+    verbose: bool = False,
+    managed: bool = False,
+):
     """Test a single SWE-bench instance"""
     
     # Setup logging
@@ -36,14 +42,10 @@ async def test_single_instance(instance_id: str, dataset_name: str = "princeton-
     
     console.print(f"[bold]Testing instance: {instance_id}[/bold]")
     
-    # Load dataset and find instance
-    dataset = load_dataset(dataset_name, split='test')
-    instance = None
-    
-    for item in dataset:
-        if item['instance_id'] == instance_id:
-            instance = item
-            break
+    # Look the instance up in the local store (built on first use)
+    store = InstanceStore.open_or_build(dataset_name, 'test')
+    instance = store.get(instance_id)
+    store.close()
     
     if not instance:
         console.print(f"[red]Instance {instance_id} not found in {dataset_name}[/red]")
@@ -57,15 +59,29 @@ async def test_single_instance(instance_id: str, dataset_name: str = "princeton-
         title=f"Instance: {instance_id}"
     ))
     
+    # Start a private ACF server if requested
+    server = None
+    if managed:
+        server = ACFServerManager(count=1, log_dir="./logs/acf-servers")
+        try:
+            await server.start()
+        except ServerStartError as e:
+            console.print(f"[bold red]Failed to start ACF MCP server: {e}[/bold red]")
+            return
+        console.print(f"Started ACF MCP server on port {server.servers[0].port} in {server.stats()['max_startup_seconds']:.2f}s")
+    
     # Initialize ACF client and agent
-    acf_client = ACFMCPClient()
+    acf_client = ACFMCPClient(*server.next_endpoint()) if server else ACFMCPClient()
     agent = SWEBenchAgent(acf_client, strategy="advanced")
     
     # Connect to ACF server
     connected = await acf_client.connect()
     if not connected:
         console.print("[bold red]Failed to connect to ACF MCP server![/bold red]")
-        console.print("Please run: npm run start:mcp")
+        if server:
+            await server.close()
+        else:
+            console.print("Please run: npm run start:mcp (or pass --managed)")
         return
     
     console.print("[green]Connected to ACF MCP server[/green]")
@@ -81,6 +97,9 @@ async def test_single_instance(instance_id: str, dataset_name: str = "princeton-
         console.print("✓ Workspace setup: Success")
     except Exception as e:
         console.print(f"✗ Workspace setup: Failed - {e}")
+        await acf_client.close()
+        if server:
+            await server.close()
         return
     
     # Test file operations
@@ -123,6 +142,10 @@ async def test_single_instance(instance_id: str, dataset_name: str = "princeton-
     
     try:
         result = await agent.solve_instance(instance)
+        # A single patch is small enough to keep as text for display and saving
+        patch = result['model_patch']
+        result['model_patch'] = patch.read()
+        patch.close()
         
         # Display results
         console.print("\n[bold green]Solution Generated![/bold green]")
@@ -136,6 +159,8 @@ async def test_single_instance(instance_id: str, dataset_name: str = "princeton-
             console.print("\n[bold]Validation Results:[/bold]")
             validation = result['validation']
             console.print(f"Tests Pass: {'✓' if validation['tests_pass'] else '✗'}")
+            for test, outcome in validation.get('tests', {}).items():
+                console.print(f"  {outcome['outcome']:>8}  {outcome['duration']:7.2f}s  {test}")
             if validation.get('output'):
                 console.print(f"Output: {validation['output'][:500]}")
         
@@ -151,6 +176,8 @@ async def test_single_instance(instance_id: str, dataset_name: str = "princeton-
     
     # Cleanup
     await acf_client.close()
+    if server:
+        await server.close()
     console.print("\n[green]Test complete![/green]")
 
 
@@ -158,13 +185,14 @@ async def test_single_instance(instance_id: str, dataset_name: str = "princeton-
 @click.argument('instance_id')
 @click.option('--dataset', default='princeton-nlp/SWE-bench_Lite', help='Dataset name')
 @click.option('--verbose', '-v', is_flag=True, help='Enable verbose output')
-def main(instance_id, dataset, verbose):
+@click.option('--managed', is_flag=True, help='Start a private ACF MCP server on a free port')
+def main(instance_id, dataset, verbose, managed):
     """Test a single SWE-bench instance with ACF MCP
     
     Example:
         python test_single.py sympy__sympy-20590 --verbose
     """
-    asyncio.run(test_single_instance(instance_id, dataset, verbose))
+    asyncio.run(test_single_instance(instance_id, dataset, verbose, managed))
 
 
 if __name__ == "__main__":
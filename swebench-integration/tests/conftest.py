@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# The integration's modules are imported as top-level modules, as the
+# scripts in this directory do
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+from agent_strategies import AdvancedStrategy, ProblemType, ToolChain
+
+
+def envelope(payload):
+    """A tools/call response as ACF sends it"""
+    return {"jsonrpc": "2.0", "id": 1, "result": {"content": [{"type": "text", "text": json.dumps(payload)}]}}
+
+
+class EnvelopeClient:
+    def __init__(self, payloads):
+        self.payloads = payloads
+        self.calls = []
+
+    async def call_tool(self, tool_name, params, timeout=None):
+        self.calls.append((tool_name, params))
+        return envelope(self.payloads.get(tool_name, {"success": True}))
+
+
+INSTANCE = {
+    "instance_id": "demo__demo-1",
+    "repo": "demo/demo",
+    "base_commit": "abc123",
+    "problem_statement": "Refactor the parser",
+    "fail_to_pass": ["tests/test_parser.py::test_parse"],
+}
+
+
+def test_chain_binds_inputs_to_unwrapped_results():
+    client = EnvelopeClient({
+        "search_code": {
+            "success": True,
+            "matches": [
+                {"path": "demo/parser.py", "lineNumber": 3},
+                {"path": "demo/lexer.py", "lineNumber": 8},
+                {"path": "demo/parser.py", "lineNumber": 40},
+            ],
+        },
+    })
+    strategy = AdvancedStrategy(client, use_task_manager=False)
+    strategy.classify_problem = lambda instance: ProblemType.REFACTOR
+
+    result = asyncio.run(strategy.execute(INSTANCE))
+
+    params = {name: params for name, params in client.calls}
+    assert params["read_multiple_files"]["paths"] == ["demo/parser.py", "demo/lexer.py"]
+    assert params["get_file_info"]["path"] == "demo/parser.py"
+    search = next(step for step in result["steps"] if step.get("tool") == "search_code")
+    assert search["status"] == "success"
+    assert search["result"]["matches"][0]["path"] == "demo/parser.py"
+
+
+def test_unsuccessful_tool_result_marks_step_failed():
+    client = EnvelopeClient({"search_code": {"success": False, "message": "Path not found: demo/demo"}})
+    strategy = AdvancedStrategy(client, use_task_manager=False)
+    strategy.classify_problem = lambda instance: ProblemType.REFACTOR
+
+    result = asyncio.run(strategy.execute(INSTANCE))
+
+    search = next(step for step in result["steps"] if step.get("tool") == "search_code")
+    assert search["status"] == "failed"
+    assert "paths" not in dict(client.calls)["read_multiple_files"]
+
+
+def test_chains_run_serially_unless_they_opt_in():
+    assert ToolChain(name="custom", tools=[]).parallel is False
+    strategy = AdvancedStrategy(EnvelopeClient({}), use_task_manager=False)
+    assert all(strategy._get_tool_chain(problem_type).parallel for problem_type in ProblemType)
@@ -0,0 +1,44 @@
+from concurrency import AdaptiveConcurrency
+
+
+def controller():
+    return AdaptiveConcurrency(max_cpu_percent=None, min_samples=5, short_window=5, long_window=200)
+
+
+def latency_ratio(concurrency):
+    return concurrency.signals()["latency_ratio"]
+
+
+def test_queueing_shows_up_as_a_latency_gradient():
+    concurrency = controller()
+    for _ in range(100):
+        concurrency.observe("read_file", 0.01)
+    assert latency_ratio(concurrency) < 1.1
+
+    for _ in range(10):
+        concurrency.observe("read_file", 0.05)
+    assert latency_ratio(concurrency) > concurrency.latency_tolerance
+
+
+def test_baseline_recovers_after_congestion():
+    concurrency = controller()
+    for _ in range(2000):
+        concurrency.observe("search_code", 0.2)
+    for _ in range(50):
+        concurrency.observe("search_code", 0.02)
+    concurrency.signals()
+
+    # Back to fast calls, the baseline follows them down instead of
+    # hiding the next burst of queueing
+    _, baseline = concurrency._latency["search_code"]
+    assert baseline < 0.05
+    for _ in range(10):
+        concurrency.observe("search_code", 0.1)
+    assert latency_ratio(concurrency) > concurrency.latency_tolerance
+
+
+def test_test_commands_are_not_observed():
+    concurrency = controller()
+    for _ in range(20):
+        concurrency.observe("execute_command", 30.0)
+    assert latency_ratio(concurrency) is None
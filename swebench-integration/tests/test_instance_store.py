@@ -0,0 +1,38 @@
+import threading
+
+import datasets
+
+from instance_store import InstanceStore
+
+
+def test_concurrent_builds_do_not_collide(tmp_path, monkeypatch):
+    started = threading.Barrier(2)
+
+    def load_dataset(name, split, streaming):
+        started.wait(timeout=5)
+        for i in range(3):
+            yield {"instance_id": f"demo__demo-{i}", "repo": "demo/demo"}
+
+    monkeypatch.setattr(datasets, "load_dataset", load_dataset)
+    path = InstanceStore.store_path("demo/demo", store_dir=str(tmp_path))
+    errors = []
+
+    def build():
+        try:
+            InstanceStore.build("demo/demo", "test", path)
+        except Exception as e:
+            errors.append(e)
+
+    builders = [threading.Thread(target=build) for _ in range(2)]
+    for builder in builders:
+        builder.start()
+    for builder in builders:
+        builder.join()
+
+    assert errors == []
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]
+    store = InstanceStore(path)
+    try:
+        assert store.ids() == ["demo__demo-0", "demo__demo-1", "demo__demo-2"]
+    finally:
+        store.close()
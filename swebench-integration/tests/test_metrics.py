@@ -0,0 +1,25 @@
+import bisect
+import re
+
+from metrics import BUCKET_BOUNDS, MetricsRecorder
+
+
+def test_prometheus_histograms_emit_every_bucket_cumulatively():
+    recorder = MetricsRecorder()
+    for seconds in (0.002, 0.002, 0.5, 7200.0):
+        recorder.record_tool("read_file", seconds, 10, 100)
+
+    buckets = [
+        (le, int(count)) for le, count in re.findall(
+            r'^acf_tool_call_seconds_bucket\{tool="read_file",le="([^"]+)"\} (\d+)$',
+            recorder.prometheus_text(), re.MULTILINE,
+        )
+    ]
+
+    assert [le for le, _ in buckets] == [f"{bound:.6g}" for bound in BUCKET_BOUNDS] + ["+Inf"]
+    counts = [count for _, count in buckets]
+    assert counts == sorted(counts)
+    assert counts[0] == 0
+    half_second = bisect.bisect_left(BUCKET_BOUNDS, 0.5)
+    assert counts[half_second - 1:half_second + 1] == [2, 3]
+    assert counts[-2:] == [3, 4]
@@ -0,0 +1,28 @@
+import asyncio
+import os
+
+from resource_governor import ResourceGovernor
+
+
+def test_command_runs_under_limits_in_its_own_session(tmp_path):
+    governor = ResourceGovernor(memory_limit_mb=None, cpu_limit=1, timeout_seconds=30, max_open_files=64)
+
+    result = asyncio.run(governor.execute(
+        {"command": "ulimit -S -n; ulimit -c; ulimit -S -t; ps -o sid= -p $$; echo $PPID"}, str(tmp_path)
+    ))
+
+    assert result["success"], result["stderr"]
+    nofile, core, cpu, session, parent = result["stdout"].split()
+    assert (nofile, core, cpu) == ("64", "0", "30")
+    assert int(session) != os.getsid(0)
+    # The wrapper exec'd the shell in place rather than forking it
+    assert int(parent) == os.getpid()
+
+
+def test_timeout_kills_the_command(tmp_path):
+    governor = ResourceGovernor(memory_limit_mb=None, timeout_seconds=30, poll_interval=0.05)
+
+    result = asyncio.run(governor.execute({"command": "sleep 5", "timeout_ms": 200}, str(tmp_path)))
+
+    assert not result["success"]
+    assert result["resources"]["killed"] == "timeout"
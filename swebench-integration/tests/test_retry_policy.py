@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from retry_policy import RetryingClient, RetryPolicy
+
+
+class TimingOutClient:
+    """Times out on every call"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, tool_name, params, timeout=None):
+        self.calls.append(tool_name)
+        raise asyncio.TimeoutError(f"{tool_name} timed out")
+
+
+def test_only_idempotent_tools_are_retried():
+    client = TimingOutClient()
+    policy = RetryPolicy(max_attempts=3, base_delay=0, idempotent={"read_file"})
+    retrying = RetryingClient(client, policy)
+
+    for tool in ("read_file", "edit_block", "write_file", "create_file"):
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(retrying.call_tool(tool, {"path": "a.py"}))
+
+    assert client.calls == ["read_file"] * 3 + ["edit_block", "write_file", "create_file"]
+
+
+def test_tool_budgets_apply_within_the_allowlist():
+    policy = RetryPolicy(max_attempts=2, tool_attempts={"search_code": 4, "edit_block": 3}, idempotent={"search_code"})
+
+    assert policy.attempts("search_code") == 4
+    assert policy.attempts("edit_block") == 1
+    assert RetryPolicy(max_attempts=2).attempts("edit_block") == 2
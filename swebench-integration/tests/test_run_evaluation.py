@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+from run_evaluation import SWEBenchAgent
+
+
+def envelope(payload):
+    """A tools/call response as ACF sends it"""
+    return {"jsonrpc": "2.0", "id": 1, "result": {"content": [{"type": "text", "text": json.dumps(payload)}]}}
+
+
+FILES = {"/ws/pkg/a.py": "a = 1\n", "/ws/pkg/b.py": "b = 2\n"}
+
+
+class FileClient:
+    """Answers file reads with envelope-shaped responses"""
+
+    def __init__(self, batched):
+        self.batched = batched
+        self.calls = []
+
+    async def call_tool(self, tool_name, params, timeout=None):
+        self.calls.append((tool_name, params))
+        if tool_name == "read_multiple_files":
+            return envelope({"success": True, "results": [
+                {"path": path, "content": FILES[path], "success": True} if path in self.batched
+                else {"path": path, "success": False, "error": "EMFILE"}
+                for path in params["paths"]
+            ]})
+        if tool_name == "read_file":
+            if params["path"] in FILES:
+                return envelope({"success": True, "content": FILES[params["path"]]})
+            return envelope({"success": False, "message": f"File not found: {params['path']}"})
+        return envelope({"success": True})
+
+
+def test_read_files_unwraps_the_batch():
+    agent = SWEBenchAgent(FileClient(batched=set(FILES)))
+
+    assert asyncio.run(agent._read_files(list(FILES))) == FILES
+
+
+def test_implement_falls_back_to_read_file():
+    client = FileClient(batched={"/ws/pkg/a.py"})
+    agent = SWEBenchAgent(client)
+    seen = {}
+
+    async def apply_fix(content, instance, step):
+        seen[step["file"]] = content
+        return content
+
+    agent._apply_fix_to_content = apply_fix
+    plan = {"steps": [{"file": path, "action": "modify"} for path in [*FILES, "/ws/pkg/gone.py"]]}
+
+    asyncio.run(agent._implement_solution({"instance_id": "demo__demo-1"}, plan))
+
+    assert seen == FILES
+    assert [params["path"] for name, params in client.calls if name == "read_file"] == [
+        "/ws/pkg/b.py", "/ws/pkg/gone.py"
+    ]
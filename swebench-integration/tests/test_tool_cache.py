@@ -0,0 +1,33 @@
+import json
+
+from tool_cache import ToolResultCache
+
+
+def envelope(text):
+    return {"jsonrpc": "2.0", "id": 1, "result": {"content": [{"type": "text", "text": text}]}}
+
+
+def test_entries_are_sized_by_wire_length_or_payload_text():
+    cache = ToolResultCache(max_size_mb=1)
+    text = json.dumps({"success": True, "content": "x" * 1000})
+
+    cache.put("/ws", "read_file", {"path": "a.py"}, envelope(text), 0, size=5000)
+    cache.put("/ws", "read_file", {"path": "b.py"}, envelope(text), 0)
+
+    assert cache.report()["size_bytes"] == 5000 + len(text)
+
+
+def test_size_bound_evicts_least_recently_used():
+    cache = ToolResultCache(max_size_mb=1)
+    megabyte = 1024 * 1024
+
+    cache.put("/ws", "read_file", {"path": "a.py"}, envelope("a"), 0, size=megabyte // 2)
+    cache.put("/ws", "read_file", {"path": "b.py"}, envelope("b"), 0, size=megabyte // 2)
+    assert cache.get("/ws", "read_file", {"path": "a.py"})[0]
+    cache.put("/ws", "read_file", {"path": "c.py"}, envelope("c"), 0, size=megabyte // 2)
+    cache.put("/ws", "read_file", {"path": "huge.py"}, envelope("h"), 0, size=2 * megabyte)
+
+    assert cache.get("/ws", "read_file", {"path": "a.py"})[0]
+    assert not cache.get("/ws", "read_file", {"path": "b.py"})[0]
+    assert not cache.get("/ws", "read_file", {"path": "huge.py"})[0]
+    assert cache.stats["evictions"] == 1
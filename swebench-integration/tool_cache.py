@@ -0,0 +1,171 @@
+"""
+Client-side Cache for Read-only ACF Tool Results
+
+Read-only tools (read_file, search_code, tree, ...) are called over and over
+with identical arguments while an instance is being solved. This cache sits
+in front of ``ACFMCPClient.call_tool`` and answers repeats locally until a
+mutating call (edit_block, write_file, execute_command, ...) touches the
+same workspace.
+"""
+
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+
+class ToolResultCache:
+    """LRU cache of tool results with TTL and a byte-size bound
+
+    Entries are keyed by workspace, tool name and normalized arguments.
+    Each workspace has a generation counter that every mutating call bumps;
+    bumping drops the workspace's entries, and a result fetched under an
+    older generation is never stored, so a read racing an edit cannot
+    repopulate stale data.
+    """
+
+    # Tools whose results depend only on their arguments and the workspace files
+    CACHEABLE_TOOLS = frozenset({
+        "read_file", "read_multiple_files", "search_code", "tree",
+        "get_file_info", "list_directory", "search_files",
+    })
+
+    # Tools that never change workspace files. Task-manager tools only write
+    # ACF's own task store, which the code tools above never read.
+    NON_MUTATING_TOOLS = frozenset({
+        "list_allowed_directories", "get_filesystem_status", "get_config",
+        "read_output", "list_sessions", "list_processes", "file_watcher_status",
+        "show_algorithm_config", "initProject", "addTask", "addSubtask",
+        "listTasks", "updateStatus", "getNextTask", "updateTask", "removeTask",
+        "getContext", "generateTaskTable",
+    })
+
+    def __init__(self, max_size_mb: float = 1000, ttl_seconds: float = 3600):
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[Any, int, float]]" = OrderedDict()
+        self._workspace_keys: Dict[str, set] = {}
+        self._generations: Dict[str, int] = {}
+        self._size = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidations": 0}
+
+    @classmethod
+    def from_config(cls, settings: Dict) -> Optional["ToolResultCache"]:
+        """Create a cache from optimization.cache, or None when caching is disabled"""
+        cache = settings.get('optimization', {}).get('cache', {})
+        if not cache.get('enabled', False):
+            return None
+        return cls(
+            max_size_mb=cache.get('max_size_mb', 1000),
+            ttl_seconds=cache.get('ttl_seconds', 3600),
+        )
+
+    @staticmethod
+    def _key(workspace: str, tool_name: str, params: Dict) -> Tuple:
+        return (workspace, tool_name, json.dumps(params, sort_keys=True, separators=(',', ':'), default=str))
+
+    def is_cacheable(self, tool_name: str) -> bool:
+        return tool_name in self.CACHEABLE_TOOLS
+
+    def is_mutating(self, tool_name: str) -> bool:
+        return tool_name not in self.CACHEABLE_TOOLS and tool_name not in self.NON_MUTATING_TOOLS
+
+    def generation(self, workspace: str) -> int:
+        """Current state generation of a workspace"""
+        return self._generations.get(workspace, 0)
+
+    def get(self, workspace: str, tool_name: str, params: Dict) -> Tuple[bool, Any]:
+        """Look up a result; returns ``(hit, value)``
+
+        Cached values are shared between callers and must be treated as
+        read-only.
+        """
+        key = self._key(workspace, tool_name, params)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return False, None
+        value, _, stored_at = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            self._remove(key)
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return True, value
+
+    @staticmethod
+    def _payload_size(value: Any) -> int:
+        """Size of a response without a wire size: the text of its content items"""
+        result = value.get("result") if isinstance(value, dict) else None
+        content = result.get("content") if isinstance(result, dict) else None
+        if isinstance(content, list):
+            return sum(len(item.get("text") or '') for item in content if isinstance(item, dict))
+        return len(str(value))
+
+    def put(
+        self,
+        workspace: str,
+        tool_name: str,
+        params: Dict,
+        value: Any,
+        generation: int,
+        size: Optional[int] = None,
+    ):
+        """Store a result fetched while the workspace was at ``generation``
+
+        ``size`` is the response's length as received, when it came over
+        the wire; the value is never re-encoded just to be measured.
+        """
+        if generation != self.generation(workspace):
+            return
+        if isinstance(value, dict) and value.get("error"):
+            return
+        if size is None:
+            size = self._payload_size(value)
+        if size > self.max_size_bytes:
+            return
+
+        key = self._key(workspace, tool_name, params)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, size, time.monotonic())
+        self._workspace_keys.setdefault(workspace, set()).add(key)
+        self._size += size
+
+        while self._size > self.max_size_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+    def invalidate(self, workspace: str):
+        """Drop every cached result for a workspace and bump its generation"""
+        self._generations[workspace] = self.generation(workspace) + 1
+        keys = self._workspace_keys.pop(workspace, set())
+        for key in keys:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= entry[1]
+        if keys:
+            self.stats["invalidations"] += 1
+            logger.debug(f"Invalidated {len(keys)} cached tool results for {workspace or 'default workspace'}")
+
+    def _remove(self, key: Tuple):
+        _, size, _ = self._entries.pop(key)
+        self._size -= size
+        keys = self._workspace_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+
+    def report(self) -> Dict[str, Any]:
+        """Hit/miss statistics and current footprint"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "size_bytes": self._size,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+        }
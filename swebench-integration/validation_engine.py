@@ -0,0 +1,244 @@
+"""
+Test Validation Engine for SWE-bench Instances
+
+Runs every target test of an instance in a single pytest session (optionally
+sharded with pytest-xdist) through ACF's ``execute_command``, then reads the
+JUnit XML report back to get a structured outcome and duration per test.
+"""
+
+import json
+import re
+import shlex
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from impact_analysis import TestImpactAnalyzer
+from json_codec import tool_result
+
+
+def instance_tests(instance: Dict, field: str) -> List[str]:
+    """Read a FAIL_TO_PASS / PASS_TO_PASS list from an instance
+
+    SWE-bench stores these upper-case and JSON-encoded; older exports and
+    this repo's code use lower-case lists. Both forms are accepted.
+    """
+    value = instance.get(field.lower(), instance.get(field.upper()))
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = [value]
+    return list(value)
+
+
+def test_patch_files(instance: Dict) -> List[str]:
+    """Test files touched by the instance's test_patch"""
+    files = re.findall(r'^\+\+\+ b/(\S+)', instance.get('test_patch', '') or '', re.MULTILINE)
+    return list(dict.fromkeys(f for f in files if f.endswith('.py')))
+
+
+def junit_key(node_id: str) -> Tuple[str, str]:
+    """Map a pytest node id to the ``(classname, name)`` pair JUnit XML reports"""
+    parts = node_id.split('::')
+    module = parts[0][:-3] if parts[0].endswith('.py') else parts[0]
+    classname = '.'.join([module.replace('/', '.')] + parts[1:-1])
+    return classname, parts[-1]
+
+
+def command_output(result: Dict) -> str:
+    """Combined stdout and stderr of an unwrapped execute_command result"""
+    if 'stdout' in result or 'stderr' in result:
+        return (result.get('stdout') or '') + (result.get('stderr') or '')
+    return str(result.get('content') or result.get('output') or result.get('message') or '')
+
+
+class TestValidator:
+    """Run an instance's target tests in one pytest session and report per test"""
+
+    def __init__(
+        self,
+        acf_client,
+        timeout_ms: int = 600000,
+        workers: int = 0,
+        run_pass_to_pass: bool = False,
+        report_dir: str = ".acf",
+        output_limit: int = 20000,
+        impact: Optional[TestImpactAnalyzer] = None,
+    ):
+        self.acf = acf_client
+        self.impact = impact
+        self.timeout_ms = timeout_ms
+        self.workers = workers
+        self.run_pass_to_pass = run_pass_to_pass
+        self.report_dir = report_dir
+        self.output_limit = output_limit
+
+    @classmethod
+    def from_config(
+        cls, acf_client, settings: Dict, impact: Optional[TestImpactAnalyzer] = None
+    ) -> "TestValidator":
+        """Create a validator from the agent and swebench.docker sections of config.yaml
+
+        ``impact`` is the run's shared analyzer, so impact maps are built
+        once per snapshot rather than once per validator.
+        """
+        agent = settings.get('agent', {})
+        validation = agent.get('validation', {})
+        docker = settings.get('swebench', {}).get('docker', {})
+        return cls(
+            acf_client,
+            timeout_ms=docker.get('timeout_seconds', 600) * 1000,
+            workers=validation.get('workers', 0),
+            run_pass_to_pass=validation.get('run_pass_to_pass', False),
+            impact=impact,
+        )
+
+    def _selections(self, tests: List[str], instance: Dict) -> List[List[str]]:
+        """Turn test ids into pytest argument lists, one per session
+
+        Node ids (``path::name``) are passed through. Bare test names, as
+        used by e.g. sympy instances, are selected with ``-k`` within the
+        files touched by the instance's test_patch; since ``-k`` would also
+        filter explicit node ids, they get a second session in the same
+        command.
+        """
+        node_ids = [t for t in tests if '::' in t or t.endswith('.py')]
+        bare_names = [t for t in tests if t not in node_ids]
+        selections = []
+        if node_ids:
+            selections.append([shlex.quote(t) for t in node_ids])
+        if bare_names:
+            selections.append(
+                [shlex.quote(f) for f in test_patch_files(instance)]
+                + ["-k", shlex.quote(' or '.join(bare_names))]
+            )
+        return selections
+
+    def _command(self, selections: List[List[str]], report_paths: List[str], workers: int) -> str:
+        commands = [f"mkdir -p {shlex.quote(self.report_dir)}"]
+        for args, report_path in zip(selections, report_paths):
+            command = [
+                "python", "-m", "pytest", "-rA", "-q", "-p", "no:cacheprovider",
+                f"--junitxml={report_path}", "-o", "junit_family=xunit1",
+            ]
+            if workers:
+                command.extend(["-n", str(workers)])
+            commands.append(' '.join(command + args))
+        return '; '.join(commands)
+
+    @staticmethod
+    def parse_junit(xml_text: str) -> Dict[Tuple[str, str], Dict]:
+        """Parse per-test outcomes and durations out of a JUnit XML report"""
+        results = {}
+        root = ET.fromstring(xml_text)
+        for case in root.iter('testcase'):
+            outcome, message = "passed", None
+            for tag in ("failure", "error", "skipped"):
+                element = case.find(tag)
+                if element is not None:
+                    outcome = {"failure": "failed", "error": "error", "skipped": "skipped"}[tag]
+                    message = (element.get('message') or '')[:500]
+                    break
+            results[(case.get('classname', ''), case.get('name', ''))] = {
+                "outcome": outcome,
+                "duration": float(case.get('time') or 0.0),
+                "message": message,
+            }
+        return results
+
+    async def _run_session(self, selections: List[List[str]]) -> Tuple[Dict, Dict]:
+        """Run the pytest session(s) and return the command result and parsed reports"""
+        run_id = uuid.uuid4().hex[:8]
+        report_paths = [f"{self.report_dir}/pytest-{run_id}-{i}.xml" for i in range(len(selections))]
+        result = tool_result(await self.acf.call_tool("execute_command", {
+            "command": self._command(selections, report_paths, self.workers),
+            "timeout_ms": self.timeout_ms
+        }))
+        if self.workers and 'unrecognized arguments: -n' in command_output(result):
+            logger.info("pytest-xdist unavailable in workspace, running tests in one process")
+            result = tool_result(await self.acf.call_tool("execute_command", {
+                "command": self._command(selections, report_paths, 0),
+                "timeout_ms": self.timeout_ms
+            }))
+
+        reports = tool_result(await self.acf.call_tool("read_multiple_files", {"paths": report_paths}))
+        reported = {}
+        for report in reports.get('results') or []:
+            if report.get('content'):
+                reported.update(self.parse_junit(report['content']))
+        return result, reported
+
+    async def _impacted_only(self, instance: Dict, tests: List[str], changed_files: Iterable[str]) -> List[str]:
+        """Keep only the regression tests impacted by the changed files"""
+        impacted = await self.impact.select(self.acf, instance, changed_files)
+        if impacted is None:
+            return tests
+        names = {node_id.split('::')[-1] for node_id in impacted}
+        return [t for t in tests if t in impacted or t in names]
+
+    async def validate(self, instance: Dict, changed_files: Optional[Iterable[str]] = None) -> Dict:
+        """Run the instance's FAIL_TO_PASS (and optionally PASS_TO_PASS) tests
+
+        With incremental testing enabled and ``changed_files`` given, only
+        the PASS_TO_PASS tests impacted by those files are run.
+        """
+        groups = {"fail_to_pass": instance_tests(instance, 'fail_to_pass')}
+        if self.run_pass_to_pass:
+            pass_to_pass = instance_tests(instance, 'pass_to_pass')
+            if self.impact is not None and changed_files is not None:
+                selected = await self._impacted_only(instance, pass_to_pass, changed_files)
+                logger.debug(f"Incremental testing: {len(selected)}/{len(pass_to_pass)} PASS_TO_PASS tests impacted")
+                pass_to_pass = selected
+            groups["pass_to_pass"] = pass_to_pass
+        targets = [(test, group) for group, tests in groups.items() for test in tests]
+
+        validation = {
+            "tests_pass": False,
+            "error": None,
+            "output": "",
+            "tests": {},
+            "summary": {},
+            "duration": 0.0,
+        }
+        if not targets:
+            validation["error"] = "No target tests"
+            return validation
+
+        started = time.monotonic()
+        try:
+            result, reported = await self._run_session(
+                self._selections([test for test, _ in targets], instance)
+            )
+            validation["output"] = command_output(result)[-self.output_limit:]
+        except Exception as e:
+            validation["error"] = str(e)
+            logger.error(f"Validation failed: {e}")
+            return validation
+        finally:
+            validation["duration"] = time.monotonic() - started
+
+        by_name: Dict[str, List[Dict]] = {}
+        for (_, name), outcome in reported.items():
+            by_name.setdefault(name, []).append(outcome)
+
+        summary: Dict[str, int] = {}
+        for test, group in targets:
+            outcome = reported.get(junit_key(test))
+            if outcome is None and test in by_name and len(by_name[test]) == 1:
+                outcome = by_name[test][0]
+            outcome = dict(outcome) if outcome else {"outcome": "missing", "duration": 0.0, "message": None}
+            outcome["group"] = group
+            validation["tests"][test] = outcome
+            summary[outcome["outcome"]] = summary.get(outcome["outcome"], 0) + 1
+
+        validation["summary"] = summary
+        validation["tests_pass"] = all(t["outcome"] == "passed" for t in validation["tests"].values())
+        if not reported:
+            validation["error"] = "pytest produced no report"
+        return validation
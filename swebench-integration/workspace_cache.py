@@ -0,0 +1,301 @@
+"""
+Repository Snapshot Cache and Workspace Provisioning
+
+SWE-bench has hundreds of instances per repository, each needing the same
+repo at a nearby commit. Instead of a fresh clone per instance this module
+keeps one bare mirror per repo and one checked-out snapshot per base commit,
+then gives every instance its own workspace cloned from them:
+
+- ``reflink``: copy-on-write copy of the snapshot (btrfs, XFS, APFS), so
+  workspaces share disk blocks until a file is modified
+- ``clone``: ``git clone --shared`` from the mirror, checking out only the
+  working tree while objects stay in the mirror
+
+Hardlinked copies are deliberately not offered: ACF's write tools rewrite
+files in place, which would corrupt the shared snapshot.
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+
+class WorkspaceError(RuntimeError):
+    """Raised when a repository or workspace cannot be prepared"""
+
+
+class WorkspaceProvisioner:
+    """Provision per-instance workspaces from cached repository snapshots
+
+    Mirrors and snapshots are tracked in a small JSON manifest with their
+    size and last use, and evicted least-recently-used first whenever the
+    cache grows beyond ``max_size_mb``.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "./cache/repos",
+        workspace_root: str = "/tmp/swebench",
+        max_size_mb: int = 1000,
+        clone_mode: str = "auto",
+        remote_template: str = "https://github.com/{repo}.git",
+    ):
+        self.cache_dir = Path(cache_dir).resolve()
+        self.workspace_root = Path(workspace_root)
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.clone_mode = clone_mode
+        self.remote_template = remote_template
+
+        self._manifest_path = self.cache_dir / "manifest.json"
+        self._manifest: Dict[str, Dict] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._in_use: Dict[str, int] = {}
+        self._workspaces: Dict[str, list] = {}
+        self._reflink: Optional[bool] = None
+        self._load_manifest()
+
+    @classmethod
+    def from_config(cls, settings: Dict) -> "WorkspaceProvisioner":
+        """Create a provisioner from the swebench.docker and optimization.cache sections"""
+        docker = settings.get('swebench', {}).get('docker', {})
+        cache = settings.get('optimization', {}).get('cache', {})
+        return cls(
+            cache_dir=docker.get('cache_dir', './cache/repos'),
+            workspace_root=docker.get('workspace_root', '/tmp/swebench'),
+            max_size_mb=cache.get('max_size_mb', 1000),
+            clone_mode=docker.get('clone_mode', 'auto'),
+        )
+
+    # -- manifest -----------------------------------------------------------
+
+    def _load_manifest(self):
+        if self._manifest_path.exists():
+            try:
+                self._manifest = json.loads(self._manifest_path.read_text())
+            except ValueError:
+                logger.warning(f"Ignoring corrupt workspace cache manifest {self._manifest_path}")
+                self._manifest = {}
+
+    def _write_manifest(self, text: str):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._manifest_path.with_suffix('.tmp')
+        tmp_path.write_text(text)
+        os.replace(tmp_path, self._manifest_path)
+
+    async def _save_manifest(self):
+        # Serialized on the loop, so the write never sees a manifest mid-update
+        await self._in_thread(self._write_manifest, json.dumps(self._manifest, indent=2))
+
+    def _touch(self, path: Path, size: Optional[int] = None):
+        """Record a use of a cache entry (and its size, when newly created)"""
+        entry = self._manifest.setdefault(str(path), {"size": 0})
+        entry["last_used"] = time.time()
+        if size is not None:
+            entry["size"] = size
+
+    # -- helpers --------------------------------------------------------------
+
+    def _lock(self, key: str) -> asyncio.Lock:
+        if key not in self._locks:
+            self._locks[key] = asyncio.Lock()
+        return self._locks[key]
+
+    @staticmethod
+    async def _in_thread(func, *args):
+        """Run blocking filesystem work off the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def _run(self, *args: str, cwd: Optional[Path] = None):
+        """Run a command, raising WorkspaceError with its stderr on failure"""
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            cwd=str(cwd) if cwd else None,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        _, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise WorkspaceError(f"{' '.join(args)} failed: {stderr.decode(errors='replace').strip()}")
+
+    @staticmethod
+    def _dir_size(path: Path) -> int:
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    pass
+        return total
+
+    def _mirror_path(self, repo: str) -> Path:
+        return self.cache_dir / "mirrors" / f"{repo.replace('/', '__')}.git"
+
+    def _snapshot_path(self, repo: str, commit: str) -> Path:
+        return self.cache_dir / "snapshots" / repo.replace('/', '__') / commit
+
+    def _reflink_command(self, src: Path, dst: Path):
+        if sys.platform == 'darwin':
+            return ["cp", "-cR", str(src), str(dst)]
+        return ["cp", "-a", "--reflink=always", str(src), str(dst)]
+
+    async def _supports_reflink(self) -> bool:
+        """Probe once whether the cache filesystem can make reflink copies"""
+        if self._reflink is None:
+            probe_dir = self.cache_dir / ".reflink-probe"
+            probe_dir.mkdir(parents=True, exist_ok=True)
+            src = probe_dir / "src"
+            src.write_bytes(b"probe")
+            try:
+                await self._run(*self._reflink_command(src, probe_dir / "dst"))
+                self._reflink = True
+            except WorkspaceError:
+                self._reflink = False
+            finally:
+                shutil.rmtree(probe_dir, ignore_errors=True)
+            logger.info(f"Reflink workspace clones {'enabled' if self._reflink else 'unavailable'}")
+        return self._reflink
+
+    # -- mirrors and snapshots ------------------------------------------------
+
+    async def _ensure_mirror(self, repo: str, commit: str) -> Path:
+        """Make sure a bare mirror of ``repo`` exists and contains ``commit``"""
+        mirror = self._mirror_path(repo)
+        async with self._lock(str(mirror)):
+            if not mirror.exists():
+                logger.info(f"Mirroring {repo}")
+                mirror.parent.mkdir(parents=True, exist_ok=True)
+                tmp_mirror = mirror.with_name(mirror.name + '.tmp')
+                await self._in_thread(shutil.rmtree, tmp_mirror, True)
+                await self._run("git", "clone", "--mirror", "--quiet",
+                                self.remote_template.format(repo=repo), str(tmp_mirror))
+                os.replace(tmp_mirror, mirror)
+                self._touch(mirror, await self._in_thread(self._dir_size, mirror))
+            try:
+                await self._run("git", "--git-dir", str(mirror), "cat-file", "-e", f"{commit}^{{commit}}")
+            except WorkspaceError:
+                logger.info(f"Fetching {repo} for missing commit {commit[:12]}")
+                await self._run("git", "--git-dir", str(mirror), "fetch", "--quiet", "origin")
+                self._touch(mirror, await self._in_thread(self._dir_size, mirror))
+            self._touch(mirror)
+        return mirror
+
+    async def _clone_shared(self, mirror: Path, commit: str, target: Path):
+        """Check ``commit`` out into ``target``, borrowing objects from the mirror"""
+        await self._run("git", "clone", "--shared", "--no-checkout", "--quiet", str(mirror), str(target))
+        await self._run("git", "-C", str(target), "checkout", "--quiet", "--detach", commit)
+
+    async def _ensure_snapshot(self, repo: str, commit: str, mirror: Path) -> Path:
+        """Make sure a checked-out snapshot of ``repo`` at ``commit`` exists"""
+        snapshot = self._snapshot_path(repo, commit)
+        async with self._lock(str(snapshot)):
+            if not snapshot.exists():
+                snapshot.parent.mkdir(parents=True, exist_ok=True)
+                tmp_snapshot = snapshot.with_name(snapshot.name + '.tmp')
+                await self._in_thread(shutil.rmtree, tmp_snapshot, True)
+                await self._clone_shared(mirror, commit, tmp_snapshot)
+                os.replace(tmp_snapshot, snapshot)
+                self._touch(snapshot, await self._in_thread(self._dir_size, snapshot))
+            self._touch(snapshot)
+        return snapshot
+
+    # -- public API -----------------------------------------------------------
+
+    async def provision(self, instance: Dict) -> str:
+        """Create a fresh workspace for an instance at its base commit
+
+        Returns:
+            Absolute path of the instance's workspace
+        """
+        repo, commit = instance['repo'], instance['base_commit']
+        instance_id = instance['instance_id']
+        workspace = self.workspace_root / instance_id
+        started = time.monotonic()
+
+        if workspace.exists():
+            await self._in_thread(shutil.rmtree, workspace)
+        workspace.parent.mkdir(parents=True, exist_ok=True)
+
+        # Cache entries are held as soon as they exist, so a concurrent
+        # provision cannot evict them while they are being cloned from
+        held: List[str] = []
+
+        def hold(path: Path):
+            held.append(str(path))
+            self._in_use[str(path)] = self._in_use.get(str(path), 0) + 1
+
+        try:
+            hold(await self._ensure_mirror(repo, commit))
+            mirror = Path(held[0])
+            use_reflink = self.clone_mode == "reflink" or (
+                self.clone_mode == "auto" and await self._supports_reflink()
+            )
+            if use_reflink:
+                snapshot = await self._ensure_snapshot(repo, commit, mirror)
+                hold(snapshot)
+                await self._run(*self._reflink_command(snapshot, workspace))
+                mode = "reflink"
+            else:
+                await self._clone_shared(mirror, commit, workspace)
+                mode = "clone"
+        except BaseException:
+            for key in held:
+                self._in_use[key] = max(0, self._in_use.get(key, 0) - 1)
+            raise
+
+        self._workspaces[instance_id] = held
+        await self._save_manifest()
+        logger.debug(f"Provisioned {instance_id} ({mode}) in {time.monotonic() - started:.2f}s")
+
+        await self._evict()
+        return str(workspace)
+
+    async def release(self, instance_id: str, remove: bool = True):
+        """Release an instance's workspace, deleting it unless ``remove`` is False"""
+        for key in self._workspaces.pop(instance_id, []):
+            self._in_use[key] = max(0, self._in_use.get(key, 0) - 1)
+        if remove:
+            workspace = self.workspace_root / instance_id
+            await self._in_thread(shutil.rmtree, workspace, True)
+
+    async def _evict(self):
+        """Evict least-recently-used snapshots, then mirrors, down to the size bound"""
+        total = sum(entry.get("size", 0) for entry in self._manifest.values())
+        if total <= self.max_size_bytes:
+            return
+
+        # Snapshots are cheap to recreate from a mirror, so they go first
+        def eviction_key(item):
+            path, entry = item
+            return ("/mirrors/" in path, entry.get("last_used", 0))
+
+        for path, entry in sorted(self._manifest.items(), key=eviction_key):
+            if total <= self.max_size_bytes:
+                break
+            if path not in self._manifest or self._in_use.get(path):
+                continue
+            victims = [path]
+            if path.endswith('.git'):
+                # Snapshots borrow objects from their mirror and die with it
+                snapshot_dir = str(self.cache_dir / "snapshots" / Path(path).stem)
+                snapshots = [p for p in self._manifest if p.startswith(snapshot_dir + os.sep)]
+                if any(self._in_use.get(p) for p in snapshots):
+                    continue
+                # ... so the mirror goes last, and only if they all went
+                victims = snapshots + victims
+            for victim in victims:
+                async with self._lock(victim):
+                    # Taken by a provision while waiting for the lock
+                    if self._in_use.get(victim) or victim not in self._manifest:
+                        break
+                    logger.info(f"Evicting cached repository {victim}")
+                    await self._in_thread(shutil.rmtree, victim, True)
+                total -= self._manifest.pop(victim).get("size", 0)
+        await self._save_manifest()